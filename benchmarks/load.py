@@ -0,0 +1,225 @@
+"""End-to-end load benchmark of the worker against the local stub APIs.
+
+Registers a number of targets spread over the APIs, starts stub_server.py in a
+separate process and runs full refresh cycles (every process_* sweep at once)
+through the worker, its pooled HTTP client, quota and concurrency limits.
+Reports cycle times, requests, bytes and peak memory.
+
+    python benchmarks/load.py [--targets 100] [--cycles 5] [--apis ri4,rrd,...] [--latency 50] ...
+
+Stub options (latency, error and quota rates, payload sizes) are passed on to
+the server, see stub_server.py --help. The quotas of the worker are lifted unless
+--real-quota is given, so the cycles measure the worker and not the throttling.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import time
+import tracemalloc
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from custom_components.hasl3.const import (  # noqa: E402
+    CONF_QUOTA,
+    CONF_QUOTA_PER_MINUTE,
+    CONF_QUOTA_PER_MONTH,
+    CONF_QUOTA_TYPE_LIST,
+    CONF_HTTP_MAX_CONNECTIONS,
+    CONF_HTTP_MAX_KEEPALIVE,
+    CONF_HTTP_KEEPALIVE_EXPIRY,
+    DEFAULT_HTTP_MAX_CONNECTIONS,
+    DEFAULT_HTTP_MAX_KEEPALIVE,
+    DEFAULT_HTTP_KEEPALIVE_EXPIRY
+)
+from custom_components.hasl3.haslworker import HaslWorker  # noqa: E402
+from custom_components.hasl3.haslworker.geo import HASLArea  # noqa: E402
+
+from stub_server import FP_TYPES, parse_options, serve  # noqa: E402
+
+APIS = ['ri4', 'si2', 'tl2', 'rp3', 'rrd', 'rra', 'rrr', 'fp']
+
+
+class StubTransport(httpx.AsyncBaseTransport):
+    """Sends every request to the stub server, keeping path and query."""
+
+    def __init__(self, origin, limits):
+        self._origin = httpx.URL(origin)
+        self._transport = httpx.AsyncHTTPTransport(limits=limits)
+
+    async def handle_async_request(self, request):
+        request.url = request.url.copy_with(scheme=self._origin.scheme, host=self._origin.host, port=self._origin.port)
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def assert_targets(worker, apis, targets, keys):
+    """Register targets round robin over the APIs."""
+    for i in range(targets):
+        api = apis[i % len(apis)]
+        key = f"{api}key{i % keys}"
+        if api == 'ri4':
+            await worker.assert_ri4(key, 1000 + i)
+        elif api == 'si2':
+            await worker.assert_si2_stop(key, str(1000 + i))
+        elif api == 'tl2':
+            # One target per TL2 key
+            await worker.assert_tl2(f"tl2key{i}")
+        elif api == 'rp3':
+            await worker.assert_rp3(key, str(9000 + i), str(9001 + i))
+        elif api == 'rrd':
+            await worker.assert_rrd(key, 740000000 + i)
+        elif api == 'rra':
+            await worker.assert_rra(key, 740000000 + i)
+        elif api == 'rrr':
+            await worker.assert_rrr(key, str(740000000 + i), str(740000001 + i))
+        elif api == 'fp':
+            area = HASLArea(59.2 + (i % 30) * 0.01, 17.8 + (i % 50) * 0.01, 2000)
+            await worker.assert_fp(FP_TYPES[i % len(FP_TYPES)], f"bench{i}", area)
+
+
+def sweeps(worker, apis):
+    return [getattr(worker, f"process_{api}")() for api in apis]
+
+
+def results(worker, apis):
+    """Targets per API result after a cycle."""
+    counts = {}
+    for api in apis:
+        for state in getattr(worker.data, api).values():
+            result = state.get('api_result', 'Pending')
+            counts[result] = counts.get(result, 0) + 1
+    return counts
+
+
+def totals(stats):
+    apis = stats['apis'].values()
+    return {field: sum(api[field] for api in apis) for field in ('requests', 'bytes', 'errors', 'quota')}
+
+
+async def run(args, origin):
+    apis = [api for api in args.apis.split(',') if api]
+    worker = HaslWorker()
+    if not args.real_quota:
+        unlimited = {CONF_QUOTA_PER_MINUTE: 10 ** 9, CONF_QUOTA_PER_MONTH: 10 ** 12}
+        worker.configuration = {CONF_QUOTA: {quotatype: unlimited for quotatype in CONF_QUOTA_TYPE_LIST}}
+
+    # The worker client, with the connection pool of the configuration, pointed at the stub
+    worker.client = worker._create_client()
+    limits = httpx.Limits(
+        max_connections=worker.getconfig(CONF_HTTP_MAX_CONNECTIONS, DEFAULT_HTTP_MAX_CONNECTIONS),
+        max_keepalive_connections=worker.getconfig(CONF_HTTP_MAX_KEEPALIVE, DEFAULT_HTTP_MAX_KEEPALIVE),
+        keepalive_expiry=worker.getconfig(CONF_HTTP_KEEPALIVE_EXPIRY, DEFAULT_HTTP_KEEPALIVE_EXPIRY))
+    await worker.client.aclose()
+    worker.client._client = httpx.AsyncClient(transport=StubTransport(origin, limits))
+
+    await assert_targets(worker, apis, args.targets, args.keys)
+
+    async with httpx.AsyncClient(base_url=origin) as control:
+        await control.post('/_reset')
+        if args.tracemalloc:
+            tracemalloc.start()
+
+        cycles = []
+        for cycle in range(args.cycles):
+            before = totals((await control.get('/_stats')).json())
+            started = time.perf_counter()
+            await asyncio.gather(*sweeps(worker, apis))
+            seconds = time.perf_counter() - started
+            after = totals((await control.get('/_stats')).json())
+            cycles.append({'seconds': seconds, **{field: after[field] - before[field] for field in after}})
+            print(f"cycle {cycle + 1:>3}  {seconds * 1000:9.1f} ms  {cycles[-1]['requests']:>6} requests"
+                  f"  {cycles[-1]['bytes'] / 1024:9.1f} KiB  {cycles[-1]['errors']:>4} errors  {cycles[-1]['quota']:>4} quota")
+
+        traced = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+        tracemalloc.stop()
+        stats = (await control.get('/_stats')).json()
+
+    await worker.async_close_client()
+
+    times = sorted(cycle['seconds'] for cycle in cycles)
+    summary = {
+        'targets': args.targets,
+        'apis': apis,
+        'cycles': cycles,
+        'cycle_min': times[0],
+        'cycle_median': times[len(times) // 2],
+        'cycle_max': times[-1],
+        'requests': sum(cycle['requests'] for cycle in cycles),
+        'bytes': sum(cycle['bytes'] for cycle in cycles),
+        'results': results(worker, apis),
+        'server': stats['apis'],
+        'peak_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'peak_traced_kib': traced // 1024 if traced is not None else None,
+    }
+
+    print(f"\n{args.targets} targets over {', '.join(apis)}, {args.cycles} cycles")
+    print(f"cycle time       min {summary['cycle_min'] * 1000:.1f} ms, median {summary['cycle_median'] * 1000:.1f} ms,"
+          f" max {summary['cycle_max'] * 1000:.1f} ms")
+    print(f"requests         {summary['requests']} ({summary['requests'] / args.cycles:.1f} per cycle)")
+    print(f"bytes            {summary['bytes'] / 1024:.1f} KiB")
+    print(f"target results   {summary['results']}")
+    print(f"peak rss         {summary['peak_rss_kib'] / 1024:.1f} MiB")
+    if traced is not None:
+        print(f"peak traced      {summary['peak_traced_kib'] / 1024:.1f} MiB")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0], add_help=False)
+    parser.add_argument('--targets', type=int, default=100)
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--apis', default=','.join(APIS), help="comma separated, of " + ','.join(APIS))
+    parser.add_argument('--keys', type=int, default=2, help="API keys per API")
+    parser.add_argument('--real-quota', action='store_true', help="keep the default quotas of the worker")
+    parser.add_argument('--tracemalloc', action='store_true', help="trace Python allocations, slows the cycles down")
+    parser.add_argument('--json', help="also write the results to this file")
+    parser.add_argument('--verbose', action='store_true')
+    (args, rest) = parser.parse_known_args()
+    if '-h' in rest or '--help' in rest:
+        parser.print_help()
+        print("\nstub server options:")
+    (host, port, options) = parse_options(rest + ['--port', str(free_port())])
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.CRITICAL)
+
+    server = multiprocessing.Process(target=serve, args=(host, port, options), daemon=True)
+    server.start()
+    origin = f"http://{host}:{port}"
+    try:
+        for attempt in range(50):
+            try:
+                httpx.get(f"{origin}/_stats")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        else:
+            raise SystemExit("The stub server did not start")
+
+        summary = asyncio.run(run(args, origin))
+        if args.json:
+            with open(args.json, 'w') as output:
+                json.dump(summary, output, indent=2)
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
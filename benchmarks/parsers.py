@@ -0,0 +1,216 @@
+"""Micro-benchmarks of the worker parsing hot paths, with stored baselines.
+
+Times the per-target processing of RI4, RRD and RRA boards, RP3 and RRR trips,
+SI2 deviations and TL2 status, from the JSON response body to the stored data,
+for small, medium and huge payloads, as well as parseDepartureTime and
+getminutesdiff. The payloads are built by stub_server.py and handed to the real
+slapi/rrapi classes through a client returning a canned response.
+
+    python benchmarks/parsers.py [-k pattern] [--repeat 7]
+    python benchmarks/parsers.py --save benchmarks/baselines/parsers.json
+    python benchmarks/parsers.py --compare benchmarks/baselines/parsers.json [--threshold 10]
+
+--compare prints the change against the baseline per case and exits with 1 when
+any case got slower by more than the threshold (percent). Baselines are machine
+specific, save a new one before comparing on another machine.
+
+Timing uses timeit (best of --repeat runs) rather than pyperf or
+pytest-benchmark, so the script runs without extra dependencies. Run it on an
+otherwise idle machine, the numbers are noisy.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import sys
+import timeit
+
+from datetime import datetime, timedelta
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from custom_components.hasl3.haslworker import HaslWorker  # noqa: E402
+from custom_components.hasl3.slapi import (  # noqa: E402
+    slapi_ri4,
+    slapi_rp3
+)
+from custom_components.hasl3.rrapi import (  # noqa: E402
+    rrapi_rrd,
+    rrapi_rra,
+    rrapi_rrr
+)
+
+from stub_server import (  # noqa: E402
+    StubOptions,
+    ri4_payload,
+    rr_board,
+    rp3_payload,
+    rrr_payload,
+    si2_payload,
+    tl2_payload
+)
+
+# Board rows, trip passlist length and deviations of each payload size.
+SIZES = {
+    'small': StubOptions(board_rows=10, passlist=5, deviations=2),
+    'medium': StubOptions(board_rows=100, passlist=50, deviations=20),
+    'huge': StubOptions(board_rows=1000, passlist=500, deviations=200),
+}
+
+
+class CannedClient(object):
+    """Stands in for the pooled HTTP client, answering every request with the same body."""
+
+    def __init__(self, payload):
+        self._body = json.dumps(payload).encode()
+
+    async def get(self, url, **kwargs):
+        return httpx.Response(200, content=self._body, request=httpx.Request('GET', url))
+
+
+def board_cases(worker, loop, size, options):
+    ri4 = slapi_ri4(None, 60, client=CannedClient(ri4_payload(options)))
+    rrd = rrapi_rrd(None, 60, client=CannedClient(rr_board(options, 'Departure')))
+    rra = rrapi_rra(None, 60, client=CannedClient(rr_board(options, 'Arrival')))
+    rows = options.board_rows
+    loop.run_until_complete(worker.assert_ri4(None, size))
+    loop.run_until_complete(worker.assert_rrd(None, size))
+    loop.run_until_complete(worker.assert_rra(None, size))
+    return [
+        (f"ri4 board {size} ({rows} rows)", lambda: loop.run_until_complete(worker._process_ri4_stop(ri4, None, size))),
+        (f"rrd board {size} ({rows} rows)", lambda: loop.run_until_complete(worker._process_rrd_stop(rrd, None, size))),
+        (f"rra board {size} ({rows} rows)", lambda: loop.run_until_complete(worker._process_rra_stop(rra, None, size))),
+    ]
+
+
+def trip_cases(worker, loop, size, options):
+    rp3 = slapi_rp3(None, client=CannedClient(rp3_payload(options)))
+    rrr = rrapi_rrr(None, 60, client=CannedClient(rrr_payload(options)))
+    stops = options.passlist
+    loop.run_until_complete(worker.assert_rp3(None, size, 'to'))
+    loop.run_until_complete(worker.assert_rrr(None, size, 'to'))
+    return [
+        (f"rp3 trips {size} ({stops} stop legs)", lambda: loop.run_until_complete(worker._process_rp3_trip(rp3, None, f"{size}-to"))),
+        (f"rrr trips {size} ({stops} stop legs)", lambda: loop.run_until_complete(worker._process_rrr_trip(rrr, None, f"{size}-to"))),
+    ]
+
+
+def status_cases(worker, loop, size, options):
+    si2 = CannedClient(si2_payload(options))
+    datakey = f"stop_{size}"
+    loop.run_until_complete(worker.assert_si2_stop(None, size))
+    cases = [
+        (f"si2 deviations {size} ({options.deviations} rows)",
+         lambda: loop.run_until_complete(worker._process_si2_target(si2, None, datakey, size, ''))),
+    ]
+    if size == 'small':
+        # TL2 always lists the same six traffic types
+        tl2 = CannedClient(tl2_payload(options))
+        loop.run_until_complete(worker.assert_tl2(None))
+        cases.append(("tl2 status", lambda: loop.run_until_complete(worker._process_tl2_key(tl2, None))))
+    return cases
+
+
+def helper_cases(worker):
+    later = (datetime.now() + timedelta(minutes=17)).strftime('%Y-%m-%d %H:%M:%S')
+    earlier = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    displaytimes = ['Nu', '1 min', '12 min', '23:59', '07:05'] * 20
+    return [
+        ("parseDepartureTime (100 values)", lambda: [worker.parseDepartureTime(t) for t in displaytimes]),
+        ("getminutesdiff (100 pairs)", lambda: [worker.getminutesdiff(later, earlier) for i in range(100)]),
+    ]
+
+
+def cases(loop):
+    random.seed(0)
+    worker = HaslWorker()
+    result = []
+    for (size, options) in SIZES.items():
+        result += board_cases(worker, loop, size, options)
+        result += trip_cases(worker, loop, size, options)
+        result += status_cases(worker, loop, size, options)
+    result += helper_cases(worker)
+    return result
+
+
+def measure(function, repeat):
+    """Best time per call in seconds, calling often enough for runs of at least 0.2 seconds."""
+    timer = timeit.Timer(function)
+    (number, elapsed) = timer.autorange()
+    number = max(1, int(number * 0.2 / max(elapsed, 1e-9)))
+    return min(timer.repeat(number=number, repeat=repeat)) / number
+
+
+def format_time(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds * 1e6:9.2f} us"
+
+
+def compare(results, baseline, threshold, partial=False):
+    """Print the change of each case against the baseline, True if none regressed."""
+    passed = True
+    print(f"\n{'case':<40} {'baseline':>12} {'now':>12} {'change':>8}")
+    for (name, seconds) in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<40} {'-':>12} {format_time(seconds)} {'new':>8}")
+            continue
+        change = (seconds - before) / before * 100
+        verdict = ''
+        if change > threshold:
+            verdict = '  SLOWER'
+            passed = False
+        elif change < -threshold:
+            verdict = '  faster'
+        print(f"{name:<40} {format_time(before)} {format_time(seconds)} {change:+7.1f}%{verdict}")
+    for name in baseline['results']:
+        if name not in results and not partial:
+            print(f"{name:<40} {format_time(baseline['results'][name])} {'-':>12} {'gone':>8}")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-k', dest='pattern', help="only run cases matching this regular expression")
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--save', help="write the results as a baseline to this file")
+    parser.add_argument('--compare', help="compare the results with the baseline in this file")
+    parser.add_argument('--threshold', type=float, default=10, help="percent slower counted as a regression")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    results = {}
+    print(f"Python {platform.python_version()}, best of {args.repeat}")
+    for (name, function) in cases(loop):
+        if args.pattern and not re.search(args.pattern, name):
+            continue
+        results[name] = measure(function, args.repeat)
+        print(f"{name:<40} {format_time(results[name])}")
+    loop.close()
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'saved': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'results': results
+            }, output, indent=2)
+            output.write('\n')
+
+    if args.compare:
+        with open(args.compare) as baselinefile:
+            baseline = json.load(baselinefile)
+        if not compare(results, baseline, args.threshold, partial=bool(args.pattern)):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
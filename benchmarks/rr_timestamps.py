@@ -0,0 +1,110 @@
+"""Per-row cost of the Resrobot departure board timestamp handling.
+
+Compares the previous strptime based row handling with parse_rr_datetime on a
+500 row board, and times the whole RRD board processing in the worker.
+
+    python benchmarks/rr_timestamps.py [rows] [repeat]
+"""
+import asyncio
+import os
+import sys
+import timeit
+
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from homeassistant.util.dt import now  # noqa: E402
+
+from custom_components.hasl3.haslworker import HaslWorker  # noqa: E402
+from custom_components.hasl3.haslworker.timeparse import parse_rr_datetime  # noqa: E402
+
+
+def make_board(rows):
+    """A departure board spanning midnight, every other row with realtime data."""
+    base = datetime.now().replace(hour=23, minute=0, second=0, microsecond=0)
+    board = []
+    for i in range(rows):
+        scheduled = base + timedelta(minutes=i // 4)
+        row = {
+            "ProductAtStop": {"displayNumber": str(i % 12), "operator": "SL", "catOut": "BLT"},
+            "directionFlag": "1",
+            "direction": "Slussen",
+            "date": scheduled.strftime('%Y-%m-%d'),
+            "time": scheduled.strftime('%H:%M:%S'),
+        }
+        if i % 2:
+            realtime = scheduled + timedelta(minutes=2)
+            row["rtDate"] = realtime.strftime('%Y-%m-%d')
+            row["rtTime"] = realtime.strftime('%H:%M:%S')
+        board.append(row)
+    return board
+
+
+def legacy_rows(board):
+    """The row handling before parse_rr_datetime, kept for comparison."""
+    for value in board:
+        adjustedDateTime = now()
+        adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
+        if 'rtDate' in value and 'rtTime' in value:
+            diff = datetime.strptime(f'{value["rtDate"]} {value["rtTime"]}', '%Y-%m-%d %H:%M:%S') - adjustedDateTime
+            expected = datetime.strptime(f'{value["rtDate"]} {value["rtTime"]}', '%Y-%m-%d %H:%M:%S')
+        else:
+            diff = datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S') - adjustedDateTime
+            expected = datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S')
+        diff = round(diff.total_seconds() / 60)
+        departure = datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S')
+        (expected, departure, diff)
+
+
+def current_rows(board):
+    adjustedDateTime = now().replace(tzinfo=None)
+    for value in board:
+        scheduled = parse_rr_datetime(value["date"], value["time"])
+        if 'rtDate' in value and 'rtTime' in value:
+            expected = parse_rr_datetime(value["rtDate"], value["rtTime"])
+        else:
+            expected = scheduled
+        diff = round((expected - adjustedDateTime).total_seconds() / 60)
+        (expected, scheduled, diff)
+
+
+class BoardAPI(object):
+    def __init__(self, board):
+        self._board = board
+
+    async def request(self, stop):
+        return {"Departure": self._board}
+
+
+def worker_rows(worker, api, loop):
+    loop.run_until_complete(worker._process_rrd_stop(api, None, "bench"))
+
+
+def report(name, seconds, rows):
+    print(f"{name:<28} {seconds * 1e6 / rows:8.2f} us/row")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    board = make_board(rows)
+
+    # Both paths must agree before their timings mean anything
+    assert [parse_rr_datetime(v["date"], v["time"]) for v in board] == \
+        [datetime.strptime(f'{v["date"]} {v["time"]}', '%Y-%m-%d %H:%M:%S') for v in board]
+
+    worker = HaslWorker()
+    worker.data.rrd["bench"] = {"api_result": "Pending"}
+    api = BoardAPI(board)
+    loop = asyncio.new_event_loop()
+
+    print(f"{rows} row board, best of {repeat}")
+    report("strptime per row (before)", min(timeit.repeat(lambda: legacy_rows(board), number=1, repeat=repeat)), rows)
+    report("parse_rr_datetime", min(timeit.repeat(lambda: current_rows(board), number=1, repeat=repeat)), rows)
+    report("worker _process_rrd_stop", min(timeit.repeat(lambda: worker_rows(worker, api, loop), number=1, repeat=repeat)), rows)
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
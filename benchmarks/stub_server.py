@@ -0,0 +1,355 @@
+"""Local stand-in for the Trafiklab (SL) and Resrobot APIs.
+
+Serves RI4, SI2, TL2, PU1, RP3, FP and Resrobot departure, arrival, trip and
+location payloads shaped like the real ones, so the worker can be driven without
+touching the real endpoints or spending quota. Latency, error rates and quota
+responses (SL status 1006/1007, Resrobot API_QUOTA) are configurable, and the
+requests and bytes served are counted per API.
+
+    python benchmarks/stub_server.py [--port 8080] [--latency 50] [--error-rate 0.01] ...
+
+GET /_stats returns the counters as JSON and POST /_reset clears them. The path
+of a request picks the API, host and key are ignored, so every SL and Resrobot URL
+can be pointed at the server by swapping scheme, host and port, see load.py.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+RI4_TYPES = ['Metros', 'Buses', 'Trains', 'Trams', 'Ships']
+TL2_TYPES = ['metro', 'train', 'local', 'tram', 'bus', 'fer']
+RR_CATEGORIES = ['BLT', 'JLT', 'ULT', 'SLT', 'FLT']
+FP_TYPES = ['PT', 'RB', 'TVB', 'SB', 'LB', 'SpvC', 'TB1', 'TB2', 'TB3']
+
+
+class StubOptions(object):
+    """What the stub serves and how it misbehaves."""
+
+    def __init__(self, latency=0, jitter=0, error_rate=0, minute_quota_rate=0, month_quota_rate=0,
+                 board_rows=40, deviations=5, trips=3, passlist=20, fleet=300, regenerate=30, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.minute_quota_rate = minute_quota_rate
+        self.month_quota_rate = month_quota_rate
+        self.board_rows = board_rows
+        self.deviations = deviations
+        self.trips = trips
+        self.passlist = passlist
+        self.fleet = fleet
+        self.regenerate = regenerate
+        self.seed = seed
+
+
+def ri4_payload(options):
+    base = datetime.now().replace(microsecond=0)
+    boards = {traffictype: [] for traffictype in RI4_TYPES}
+    for i in range(options.board_rows):
+        traffictype = RI4_TYPES[i % 3]
+        expected = base + timedelta(minutes=i // 2, seconds=random.randint(0, 59))
+        minutes = (expected - base).seconds // 60
+        boards[traffictype].append({
+            "TransportMode": traffictype.upper()[:-1],
+            "LineNumber": str(10 + i % 12),
+            "Destination": f"Destination {i % 7}",
+            "JourneyDirection": 1 + i % 2,
+            "GroupOfLine": "Gröna linjen" if traffictype == 'Metros' else None,
+            "StopAreaName": "Slussen",
+            "StopAreaNumber": 1011,
+            "StopPointNumber": 1051,
+            "StopPointDesignation": str(1 + i % 4),
+            "TimeTabledDateTime": (expected - timedelta(minutes=i % 3)).strftime('%Y-%m-%dT%H:%M:%S'),
+            "ExpectedDateTime": expected.strftime('%Y-%m-%dT%H:%M:%S'),
+            "DisplayTime": "Nu" if minutes == 0 else f"{minutes} min",
+            "JourneyNumber": 10000 + i,
+            "Deviations": None,
+        })
+    return {"StatusCode": 0, "Message": None, "ExecutionTime": 12, "ResponseData": {
+        "LatestUpdate": base.strftime('%Y-%m-%dT%H:%M:%S'),
+        "DataAge": 10,
+        **boards,
+        "StopPointDeviations": []
+    }}
+
+
+def si2_payload(options):
+    base = datetime.now().replace(microsecond=0)
+    return {"StatusCode": 0, "Message": None, "ExecutionTime": 8, "ResponseData": [{
+        "Created": base.strftime('%Y-%m-%dT%H:%M:%S'),
+        "Updated": base.strftime('%Y-%m-%dT%H:%M:%S'),
+        "MainNews": i == 0,
+        "SortOrder": i + 1,
+        "Header": f"Deviation {i}",
+        "Details": "Replacement buses run between Slussen and Gullmarsplan due to track works. " * 3,
+        "Scope": "Tunnelbanans gröna linje",
+        "DevCaseGid": 9076001000000000 + i,
+        "DevMessageVersionNumber": 1,
+        "ScopeElements": "Tunnelbanans gröna linje 17, 18, 19",
+        "FromDateTime": (base - timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%S'),
+        "UpToDateTime": (base + timedelta(days=7)).strftime('%Y-%m-%dT%H:%M:%S'),
+    } for i in range(options.deviations)]}
+
+
+def tl2_payload(options):
+    return {"StatusCode": 0, "Message": None, "ExecutionTime": 5, "ResponseData": {"TrafficTypes": [{
+        "Id": i,
+        "Name": traffictype,
+        "Type": traffictype,
+        "StatusIcon": "EventGood" if i % 2 else "EventMinor",
+        "Expanded": False,
+        "HasPlannedEvent": False,
+        "Events": [{
+            "EventId": 100 * i + j,
+            "Message": "Delays due to an earlier signal fault.",
+            "Expanded": False,
+            "Planned": False,
+            "SortIndex": j,
+            "StatusIcon": "EventMinor",
+            "TrafficLine": str(10 + j),
+        } for j in range(i % 3)]
+    } for (i, traffictype) in enumerate(TL2_TYPES)]}}
+
+
+def pu1_payload(options):
+    return {"StatusCode": 0, "Message": None, "ExecutionTime": 3, "ResponseData": [{
+        "Name": f"Slussen {i} (Stockholm)",
+        "SiteId": str(9192 + i),
+        "Type": "Station",
+        "X": "18071860",
+        "Y": "59320284",
+    } for i in range(10)]}
+
+
+def legs(options, when, product):
+    result = []
+    for i in range(3):
+        start = when + timedelta(minutes=12 * i)
+        stops = [{
+            "name": f"Stop {i}.{j}",
+            "extId": str(740000000 + j),
+            "depTime": (start + timedelta(minutes=j)).strftime('%H:%M:%S'),
+            "depDate": start.strftime('%Y-%m-%d'),
+            "lon": 18.07 + j * 0.001,
+            "lat": 59.32 + j * 0.001,
+        } for j in range(options.passlist)]
+        result.append({
+            "Origin": {"name": f"Origin {i}", "date": start.strftime('%Y-%m-%d'), "time": start.strftime('%H:%M:%S')},
+            "Destination": {"name": f"Destination {i}", "date": start.strftime('%Y-%m-%d'),
+                            "time": (start + timedelta(minutes=10)).strftime('%H:%M:%S')},
+            "Stops": {"Stop": stops},
+            "Product": product(i),
+            "idx": str(i),
+            "name": f"Leg {i}",
+            "type": "WALK" if i == 1 else "JNY",
+            "direction": f"Direction {i}",
+            "directionFlag": "1",
+            "category": "BUS",
+        })
+    return result
+
+
+def rp3_payload(options):
+    base = datetime.now().replace(second=0, microsecond=0)
+    return {"Trip": [{
+        "LegList": {"Leg": legs(options, base + timedelta(minutes=5 * i),
+                                lambda leg: {"name": f"Buss {4 + leg}", "line": str(4 + leg), "catOut": "BUS"})},
+        "TariffResult": {"fareSetItem": [{"fareItem": [{"name": "Helt pris", "desc": "Reskassa", "price": 3900}]}]},
+        "duration": "PT36M",
+        "transferCount": 1,
+    } for i in range(options.trips)]}
+
+
+def rrr_payload(options):
+    base = datetime.now().replace(second=0, microsecond=0)
+    return {"Trip": [{
+        "LegList": {"Leg": legs(options, base + timedelta(minutes=5 * i),
+                                lambda leg: [{"name": f"Länstrafik - Buss {4 + leg}", "line": str(4 + leg), "catOut": "BLT"}])},
+        "duration": "PT36M",
+    } for i in range(options.trips)]}
+
+
+def rr_board(options, kind):
+    base = datetime.now().replace(second=0, microsecond=0)
+    rows = []
+    for i in range(options.board_rows):
+        scheduled = base + timedelta(minutes=i // 2)
+        category = RR_CATEGORIES[i % len(RR_CATEGORIES)]
+        row = {
+            "ProductAtStop": {"name": f"Länstrafik - Buss {1 + i % 12}", "displayNumber": str(1 + i % 12),
+                              "num": str(10000 + i), "operator": "Storstockholms Lokaltrafik", "catOut": category},
+            "JourneyDetailRef": {"ref": f"1|{10000 + i}|0|1|{base.strftime('%d%m%Y')}"},
+            "stop": "Slussen",
+            "stopExtId": "740000001",
+            "directionFlag": str(1 + i % 2),
+            "direction": f"Destination {i % 7}",
+            "origin": f"Origin {i % 7}",
+            "date": scheduled.strftime('%Y-%m-%d'),
+            "time": scheduled.strftime('%H:%M:%S'),
+        }
+        if i % 2:
+            realtime = scheduled + timedelta(minutes=random.randint(0, 3))
+            row["rtDate"] = realtime.strftime('%Y-%m-%d')
+            row["rtTime"] = realtime.strftime('%H:%M:%S')
+        rows.append(row)
+    return {kind: rows, "serverVersion": "2.45", "dialectVersion": "2.45"}
+
+
+def rr_location_payload(options):
+    return {"stopLocationOrCoordLocation": [{"StopLocation": {
+        "id": f"A=1@O=Slussen {i}@X=18071860@Y=59320284@",
+        "extId": str(740000001 + i),
+        "name": f"Slussen {i} (Stockholm kn)",
+        "lon": 18.07186,
+        "lat": 59.320284,
+    }} for i in range(10)]}
+
+
+def fp_payload(options, vehicletype):
+    # The API wraps its JSON document in a JSON string
+    return json.dumps(json.dumps({"TimeStamp": datetime.now().isoformat(), "Trips": [{
+        "TripId": 100000 + i,
+        "LineNumber": str(1 + i % 60),
+        "Latitude": 59.2 + random.random() * 0.3,
+        "Longitude": 17.8 + random.random() * 0.5,
+        "Bearing": random.randint(0, 359),
+        "Speed": random.randint(0, 80),
+        "TransportMode": vehicletype,
+        "Updated": datetime.now().isoformat(),
+    } for i in range(options.fleet)]}))
+
+
+# Path suffix, API name and payload builder of every endpoint.
+ENDPOINTS = [
+    ('realtimedeparturesV4.json', 'ri4', lambda options, request: ri4_payload(options)),
+    ('deviations.json', 'si2', lambda options, request: si2_payload(options)),
+    ('trafficsituation.json', 'tl2', lambda options, request: tl2_payload(options)),
+    ('typeahead.json', 'pu1', lambda options, request: pu1_payload(options)),
+    ('TravelplannerV3_1/trip.json', 'rp3', lambda options, request: rp3_payload(options)),
+    ('fordonspositioner/GetData', 'fp', lambda options, request: fp_payload(options, request.query.get('type', 'PT'))),
+    ('departureBoard', 'rrd', lambda options, request: rr_board(options, 'Departure')),
+    ('arrivalBoard', 'rra', lambda options, request: rr_board(options, 'Arrival')),
+    ('v2.1/trip', 'rrr', lambda options, request: rrr_payload(options)),
+    ('location.name', 'rrl', lambda options, request: rr_location_payload(options)),
+]
+
+RESROBOT_APIS = ('rrd', 'rra', 'rrr', 'rrl')
+
+# SL responses report how long the call took, so the body differs on every call like the real APIs.
+_execution_time = re.compile(r'"ExecutionTime": \d+')
+
+
+class StubServer(object):
+    """The stub APIs as an aiohttp application, with request counters."""
+
+    def __init__(self, options=None):
+        self.options = options or StubOptions()
+        self._payloads = {}
+        self._random = random.Random(self.options.seed)
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.stats = {}
+
+    def _count(self, api, outcome, size):
+        stats = self.stats.setdefault(api, {'requests': 0, 'bytes': 0, 'errors': 0, 'quota': 0})
+        stats['requests'] += 1
+        stats['bytes'] += size
+        if outcome != 'ok':
+            stats[outcome] += 1
+
+    def _payload(self, api, build, request):
+        """Encoded payload, rebuilt every regenerate seconds so timestamps move on."""
+        cachekey = (api, request.query.get('type'))
+        cached = self._payloads.get(cachekey)
+        if cached is None or time.monotonic() - cached[0] > self.options.regenerate:
+            body = build(self.options, request)
+            cached = (time.monotonic(), body if isinstance(body, str) else json.dumps(body))
+            self._payloads[cachekey] = cached
+        return cached[1]
+
+    def _quota_error(self, api, code):
+        if api in RESROBOT_APIS:
+            return {"errorCode": "API_QUOTA", "errorText": "Quota exceeded"}
+        return {"StatusCode": code, "Message": "Quota exceeded", "ExecutionTime": 0, "ResponseData": None}
+
+    async def handle(self, request):
+        path = request.path
+        for (suffix, api, build) in ENDPOINTS:
+            if path.endswith(suffix):
+                break
+        else:
+            return web.Response(status=404)
+
+        options = self.options
+        if options.latency or options.jitter:
+            await asyncio.sleep(max(0, options.latency + self._random.uniform(-options.jitter, options.jitter)) / 1000)
+
+        draw = self._random.random()
+        if draw < options.error_rate:
+            self._count(api, 'errors', 0)
+            return web.Response(status=503, text="Service Unavailable")
+        draw -= options.error_rate
+        if draw < options.minute_quota_rate + options.month_quota_rate:
+            code = 1006 if draw < options.minute_quota_rate else 1007
+            body = json.dumps(self._quota_error(api, code))
+            self._count(api, 'quota', len(body))
+            return web.Response(text=body, content_type="application/json")
+
+        body = self._payload(api, build, request)
+        if api not in RESROBOT_APIS:
+            body = _execution_time.sub(f'"ExecutionTime": {self._random.randint(1, 200)}', body, count=1)
+        self._count(api, 'ok', len(body))
+        return web.Response(text=body, content_type="application/json")
+
+    async def handle_stats(self, request):
+        return web.json_response({'uptime': time.monotonic() - self.started, 'apis': self.stats})
+
+    async def handle_reset(self, request):
+        self.reset()
+        return web.json_response({})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/_stats', self.handle_stats)
+        app.router.add_post('/_reset', self.handle_reset)
+        app.router.add_get('/{tail:.*}', self.handle)
+        return app
+
+
+def parse_options(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0, help="response delay in ms")
+    parser.add_argument('--jitter', type=float, default=0, help="random +/- ms added to the delay")
+    parser.add_argument('--error-rate', type=float, default=0, help="share of requests answered with HTTP 503")
+    parser.add_argument('--minute-quota-rate', type=float, default=0, help="share answered with quota error 1006")
+    parser.add_argument('--month-quota-rate', type=float, default=0, help="share answered with quota error 1007")
+    parser.add_argument('--board-rows', type=int, default=40, help="rows on departure and arrival boards")
+    parser.add_argument('--deviations', type=int, default=5)
+    parser.add_argument('--trips', type=int, default=3, help="trips in route planner results")
+    parser.add_argument('--passlist', type=int, default=20, help="stops in each trip leg")
+    parser.add_argument('--fleet', type=int, default=300, help="vehicles per FP vehicle type")
+    parser.add_argument('--regenerate', type=float, default=30, help="seconds between payload rebuilds")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    options = StubOptions(**{name: value for (name, value) in vars(args).items() if name not in ('host', 'port')})
+    return (args.host, args.port, options)
+
+
+def serve(host, port, options):
+    web.run_app(StubServer(options).app(), host=host, port=port, print=None)
+
+
+if __name__ == "__main__":
+    (host, port, options) = parse_options()
+    print(f"Serving stub APIs on http://{host}:{port}")
+    serve(host, port, options)
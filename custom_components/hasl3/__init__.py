@@ -2,9 +2,12 @@ import logging
 import jsonpickle
 import time
 import asyncio
+import voluptuous as vol
 
 from custom_components.hasl3.haslworker import HaslWorker
+from custom_components.hasl3.haslworker.profiler import PROFILE_SAMPLE
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
 from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import device_registry as dr
@@ -34,9 +37,15 @@ from custom_components.hasl3.rrapi import (
     rrapi_sl
 )
 
+from .config_schema import hasl_worker_config_schema
+
 logger = logging.getLogger(f"custom_components.{DOMAIN}.core")
 serviceLogger = logging.getLogger(f"custom_components.{DOMAIN}.services")
 
+CONFIG_SCHEMA = vol.Schema({
+    vol.Optional(DOMAIN): vol.Schema(hasl_worker_config_schema())
+}, extra=vol.ALLOW_EXTRA)
+
 
 async def async_setup(hass, config):
     """Set up HASL integration"""
@@ -77,6 +86,46 @@ async def async_setup(hass, config):
             hass.bus.fire(DOMAIN, {"source": "get_cache", "state": "error", "result": f"Exception occurred during execution: {str(e)}"})
             return True
 
+    @callback
+    async def get_sensor_data(service):
+        serviceLogger.debug("[get_sensor_data] Entered")
+        entity_id = service.data.get('entity_id')
+
+        try:
+            target = worker.getscheduler().target_of(entity_id)
+            if target is None:
+                raise ValueError(f"{entity_id} is not a HASL sensor")
+            dataDump = jsonpickle.dumps(worker.gettargetdata(target), unpicklable=False)
+            serviceLogger.debug("[get_sensor_data] Completed")
+            hass.bus.fire(DOMAIN, {"source": "get_sensor_data", "state": "success", "entity_id": entity_id, "result": dataDump})
+            return True
+        except Exception as e:
+            serviceLogger.debug("[get_sensor_data] Failed to get sensor data")
+            hass.bus.fire(DOMAIN, {"source": "get_sensor_data", "state": "error", "entity_id": entity_id, "result": f"Exception occurred during execution: {str(e)}"})
+            return True
+
+    @callback
+    async def profile(service):
+        serviceLogger.debug("[profile] Entered")
+        duration = service.data.get('duration', 30)
+        mode = service.data.get('mode', PROFILE_SAMPLE)
+        interval = service.data.get('interval', 10)
+        worker_only = service.data.get('worker_only', True)
+
+        async def run():
+            try:
+                outputfile = await worker.async_profile(float(duration), mode, float(interval) / 1000, worker_only)
+                serviceLogger.debug("[profile] Completed")
+                hass.bus.fire(DOMAIN, {"source": "profile", "state": "success", "result": outputfile})
+            except Exception as e:
+                serviceLogger.debug("[profile] Profiling failed")
+                hass.bus.fire(DOMAIN, {"source": "profile", "state": "error", "result": f"Exception occurred during execution: {str(e)}"})
+
+        # The session runs for a while, so answer with an event when it is done
+        serviceLogger.debug(f"[profile] Profiling for {duration} seconds in {mode} mode")
+        hass.async_create_task(run())
+        return True
+
     @callback
     async def sl_find_location(service):
         serviceLogger.debug("[sl_find_location] Entered")
@@ -171,6 +220,14 @@ async def async_setup(hass, config):
             get_cache(service)
             serviceLogger.debug("[eventListener] Dispatched to get_cache")
             return True
+        if command == "get_sensor_data":
+            get_sensor_data(service)
+            serviceLogger.debug("[eventListener] Dispatched to get_sensor_data")
+            return True
+        if command == "profile":
+            profile(service)
+            serviceLogger.debug("[eventListener] Dispatched to profile")
+            return True
         if command == "sl_find_location":
             sl_find_location(service)
             serviceLogger.debug("[eventListener] Dispatched to sl_find_location")
@@ -196,6 +253,7 @@ async def async_setup(hass, config):
             logger.debug("[setup] No worker present")
             worker = HaslWorker()
             worker.hass = hass
+            worker.configuration = config.get(DOMAIN, {})
             hass.data[DOMAIN] = {
                 "worker": worker
             }
@@ -204,10 +262,27 @@ async def async_setup(hass, config):
         logger.error("[setup] Could not get worker")
         return False
 
+    logger.debug("[setup] Loading cached data")
+    try:
+        await hass.data[DOMAIN]["worker"].async_load_cache()
+    except Exception as e:
+        logger.error(f"[setup] Could not load cached data: {str(e)}")
+
+    logger.debug("[setup] Starting refresh scheduler")
+    hass.data[DOMAIN]["worker"].getscheduler().start()
+
+    async def shutdown(event):
+        hass.data[DOMAIN]["worker"].getscheduler().stop()
+        await hass.data[DOMAIN]["worker"].async_close_client()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, shutdown)
+
     logger.debug("[setup] Registering services")
     try:
         hass.services.async_register(DOMAIN, 'dump_cache', dump_cache)
         hass.services.async_register(DOMAIN, 'get_cache', get_cache)
+        hass.services.async_register(DOMAIN, 'get_sensor_data', get_sensor_data)
+        hass.services.async_register(DOMAIN, 'profile', profile)
         hass.services.async_register(DOMAIN, 'sl_find_location', sl_find_location)
         hass.services.async_register(DOMAIN, 'rr_find_location', rr_find_location)
         hass.services.async_register(DOMAIN, 'sl_find_trip_pos', sl_find_trip_pos)
@@ -339,9 +414,9 @@ async def async_unload_entry(hass, entry):
     logger.debug("[unload_entry] Entered")
 
     try:
-
-        hass.async_add_job(hass.config_entries.async_forward_entry_unload(entry, "sensor"))
-        hass.async_add_job(hass.config_entries.async_forward_entry_unload(entry, "binary_sensor"))
+        # Wait for the entities to go, so none of them reads targets released below
+        await hass.config_entries.async_forward_entry_unload(entry, "sensor")
+        await hass.config_entries.async_forward_entry_unload(entry, "binary_sensor")
     except:
         logger.error("[unload_entry] Forward entry unload failed")
         return False
@@ -353,5 +428,18 @@ async def async_unload_entry(hass, entry):
         logger.error("[unload_entry] Worker deregistration failed")
         return False
 
+    try:
+        hass.data[DOMAIN]["worker"].release_instance(entry.entry_id)
+        logger.debug("[unload_entry] Released targets")
+    except Exception as e:
+        logger.error(f"[unload_entry] Releasing targets failed: {str(e)}")
+
+    try:
+        if hass.data[DOMAIN]["worker"].instances.count() == 0:
+            await hass.data[DOMAIN]["worker"].async_close_client()
+            logger.debug("[unload_entry] Closed HTTP client")
+    except Exception as e:
+        logger.error(f"[unload_entry] Closing HTTP client failed: {str(e)}")
+
     logger.debug("[unload_entry] Completed")
     return True
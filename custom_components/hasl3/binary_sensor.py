@@ -1,9 +1,10 @@
 """ SL Platform Sensor """
 import logging
 
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.device_registry import DeviceEntryType
-from homeassistant.util.dt import now
 
 from .const import (
     DOMAIN,
@@ -20,6 +21,7 @@ from .const import (
     CONF_INTEGRATION_TYPE,
     CONF_INTEGRATION_ID,
     CONF_SCAN_INTERVAL,
+    SIGNAL_HASL_UPDATED,
     CONF_TRANSPORT_MODE_LIST
 )
 
@@ -43,7 +45,7 @@ async def setup_hasl_sensor(hass, config):
     if config.data[CONF_INTEGRATION_TYPE] == SENSOR_STATUS:
         if not CONF_ANALOG_SENSORS in config.data:
             if CONF_TL2_KEY in config.data:
-                await hass.data[DOMAIN]["worker"].assert_tl2(config.data[CONF_TL2_KEY])
+                await hass.data[DOMAIN]["worker"].assert_tl2(config.data[CONF_TL2_KEY], config.entry_id)
                 for sensortype in CONF_TRANSPORT_MODE_LIST:
                     if sensortype in config.data and config.data[sensortype]:
                         logger.debug("[setup_binary_sensor] Setting up binary problem sensor..")
@@ -53,13 +55,6 @@ async def setup_hasl_sensor(hass, config):
                         except:
                             logger.debug("[setup_binary_sensor] Sensor setup failed")
 
-            logger.debug("[setup_binary_sensor] Force processing problem sensors..")
-            try:
-                await hass.data[DOMAIN]["worker"].process_tl2()
-                logger.debug("[setup_binary_sensor] Force processing completed successfully")
-            except:
-                logger.debug("[setup_binary_sensor] Force processing failed")
-
     return sensors
 
 
@@ -77,6 +72,36 @@ class HASLDevice(Entity):
             "entry_type": DeviceEntryType.SERVICE
         }
 
+    @property
+    def should_poll(self):
+        """No polling, the worker refresh scheduler pushes updates."""
+        return False
+
+    async def async_added_to_hass(self):
+        """Register the sensor target with the worker refresh scheduler."""
+        scheduler = self._worker.getscheduler()
+        (apitype, key, targetid) = self._target
+
+        self.async_on_remove(async_dispatcher_connect(self.hass, SIGNAL_HASL_UPDATED.format(apitype, targetid), self._async_worker_updated))
+
+        scheduler.register(self._target, self.entity_id, self._scan_interval, self._enabled_sensor)
+        self.async_on_remove(lambda: scheduler.unregister(self._target, self.entity_id))
+        self._update_from_worker()
+
+    async def async_update(self):
+        """Refresh the sensor target at once, e.g. through homeassistant.update_entity."""
+        logger.debug(f"[async_update] Refreshing {self._target}")
+        try:
+            await self._worker.refresh_target(self._target)
+        except:
+            logger.debug("[async_update] Error occurred during update")
+        self._update_from_worker()
+
+    @callback
+    def _async_worker_updated(self, *args):
+        self._update_from_worker()
+        self.async_write_ha_state()
+
 
 class HASLTrafficProblemSensor(HASLDevice):
     """Class to hold Sensor basic info."""
@@ -91,36 +116,17 @@ class HASLTrafficProblemSensor(HASLDevice):
         self._sensordata = []
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("tl2", config.data[CONF_TL2_KEY], config.data[CONF_TL2_KEY])
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-        if self._worker.data.tl2[self._config.data[CONF_TL2_KEY]]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.tl2[self._config.data[CONF_TL2_KEY]]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_tl2()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
-
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.tl2[self._config.data[CONF_TL2_KEY]]
-        logger.debug("[async_update] Completed")
 
     @property
     def name(self):
         """Return the name of the sensor."""
         return self._name
 
-    @property
-    def should_poll(self):
-        """No polling needed."""
-        return True
-
     @property
     def unique_id(self):
         return f"sl-{self._sensortype}-status-sensor-{self._config.data[CONF_INTEGRATION_ID]}"
@@ -141,7 +147,7 @@ class HASLTrafficProblemSensor(HASLDevice):
     @property
     def is_on(self):
         """Return the state of the sensor."""
-        if self._sensordata == []:
+        if self._sensordata == [] or "data" not in self._sensordata:
             return False
         else:
             if self._sensordata["data"][self._sensortype]["status"] == "Good":
@@ -152,7 +158,7 @@ class HASLTrafficProblemSensor(HASLDevice):
     @property
     def state(self):
         """Return the state of the sensor."""
-        if self._sensordata == []:
+        if self._sensordata == [] or "data" not in self._sensordata:
             return False
         else:
             if self._sensordata["data"][self._sensortype]["status"] == "Good":
@@ -186,7 +192,7 @@ class HASLTrafficProblemSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Ok"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
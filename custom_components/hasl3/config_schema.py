@@ -21,6 +21,9 @@ from .const import (
     CONF_FP_TB1,
     CONF_FP_TB2,
     CONF_FP_TB3,
+    CONF_FP_LATITUDE,
+    CONF_FP_LONGITUDE,
+    CONF_FP_RADIUS,
     CONF_SENSOR,
     CONF_SENSOR_PROPERTY,
     CONF_LINES,
@@ -41,7 +44,41 @@ from .const import (
     CONF_DIRECTION_LIST,
     CONF_DESTINATION,
     CONF_SOURCE,
-    CONF_RR_KEY
+    CONF_RR_KEY,
+    CONF_HTTP_MAX_CONNECTIONS,
+    CONF_HTTP_MAX_KEEPALIVE,
+    CONF_HTTP_KEEPALIVE_EXPIRY,
+    CONF_HTTP_TIMEOUT,
+    CONF_HTTP2,
+    CONF_MAX_CONCURRENT_PER_API,
+    CONF_MAX_CONCURRENT_PER_KEY,
+    CONF_HTTP_RETRIES,
+    CONF_HTTP_BACKOFF,
+    CONF_HTTP_BACKOFF_MAX,
+    CONF_CIRCUIT_THRESHOLD,
+    CONF_CIRCUIT_COOLDOWN,
+    DEFAULT_HTTP_MAX_CONNECTIONS,
+    DEFAULT_HTTP_MAX_KEEPALIVE,
+    DEFAULT_HTTP_KEEPALIVE_EXPIRY,
+    DEFAULT_HTTP_TIMEOUT,
+    DEFAULT_HTTP2,
+    DEFAULT_MAX_CONCURRENT_PER_API,
+    DEFAULT_MAX_CONCURRENT_PER_KEY,
+    DEFAULT_HTTP_RETRIES,
+    DEFAULT_HTTP_BACKOFF,
+    DEFAULT_HTTP_BACKOFF_MAX,
+    DEFAULT_CIRCUIT_THRESHOLD,
+    DEFAULT_CIRCUIT_COOLDOWN,
+    CONF_QUOTA,
+    CONF_QUOTA_PER_MINUTE,
+    CONF_QUOTA_PER_MONTH,
+    CONF_QUOTA_TYPE_LIST,
+    CONF_ATTRIBUTE_MAX_ITEMS,
+    CONF_ATTRIBUTE_MAX_BYTES,
+    CONF_ATTRIBUTE_FIELDS,
+    CONF_ATTRIBUTE_LIST_TYPES,
+    DEFAULT_ATTRIBUTE_MAX_ITEMS,
+    DEFAULT_ATTRIBUTE_MAX_BYTES
 )
 
 
@@ -121,7 +158,7 @@ def status_config_option_schema(options: dict = {}) -> dict:
 def vehiclelocation_config_option_schema(options: dict = {}) -> dict:
     """The schema used for train location service"""
     if not options:
-        options = {CONF_SCAN_INTERVAL: DEFAULT_SCAN_INTERVAL, CONF_SENSOR: "", CONF_FP_PT: False, CONF_FP_RB: False, CONF_FP_TVB: False, CONF_FP_SB: False, CONF_FP_LB: False, CONF_FP_SPVC: False, CONF_FP_TB1: False, CONF_FP_TB2: False, CONF_FP_TB3: False}
+        options = {CONF_SCAN_INTERVAL: DEFAULT_SCAN_INTERVAL, CONF_SENSOR: "", CONF_FP_PT: False, CONF_FP_RB: False, CONF_FP_TVB: False, CONF_FP_SB: False, CONF_FP_LB: False, CONF_FP_SPVC: False, CONF_FP_TB1: False, CONF_FP_TB2: False, CONF_FP_TB3: False, CONF_FP_LATITUDE: 0.0, CONF_FP_LONGITUDE: 0.0, CONF_FP_RADIUS: 0, CONF_LINES: ""}
     return {
         vol.Optional(CONF_FP_PT, default=options.get(CONF_FP_PT)): bool,
         vol.Optional(CONF_FP_RB, default=options.get(CONF_FP_RB)): bool,
@@ -132,6 +169,10 @@ def vehiclelocation_config_option_schema(options: dict = {}) -> dict:
         vol.Optional(CONF_FP_TB1, default=options.get(CONF_FP_TB1)): bool,
         vol.Optional(CONF_FP_TB2, default=options.get(CONF_FP_TB2)): bool,
         vol.Optional(CONF_FP_TB3, default=options.get(CONF_FP_TB3)): bool,
+        vol.Optional(CONF_FP_LATITUDE, default=options.get(CONF_FP_LATITUDE, 0.0)): vol.Coerce(float),
+        vol.Optional(CONF_FP_LONGITUDE, default=options.get(CONF_FP_LONGITUDE, 0.0)): vol.Coerce(float),
+        vol.Optional(CONF_FP_RADIUS, default=options.get(CONF_FP_RADIUS, 0)): vol.All(int, vol.Range(min=0)),
+        vol.Optional(CONF_LINES, default=options.get(CONF_LINES, "")): str,
         vol.Required(CONF_SCAN_INTERVAL, default=options.get(CONF_SCAN_INTERVAL)): int,
         vol.Optional(CONF_SENSOR, default=options.get(CONF_SENSOR)): str
     }
@@ -189,4 +230,43 @@ def rrroute_config_option_schema(options: dict = {}) -> dict:
         vol.Required(CONF_DESTINATION_ID, default=options.get(CONF_DESTINATION)): str,
         vol.Required(CONF_SCAN_INTERVAL, default=options.get(CONF_SCAN_INTERVAL)): int,
         vol.Optional(CONF_SENSOR, default=options.get(CONF_SENSOR)): str
-    }    
\ No newline at end of file
+    }
+
+
+def hasl_worker_config_schema() -> dict:
+    """Optional worker tuning from the hasl3 section of configuration.yaml."""
+    return {
+        vol.Optional(CONF_HTTP_MAX_CONNECTIONS, default=DEFAULT_HTTP_MAX_CONNECTIONS): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_HTTP_MAX_KEEPALIVE, default=DEFAULT_HTTP_MAX_KEEPALIVE): vol.All(int, vol.Range(min=0)),
+        vol.Optional(CONF_HTTP_KEEPALIVE_EXPIRY, default=DEFAULT_HTTP_KEEPALIVE_EXPIRY): vol.All(int, vol.Range(min=0)),
+        vol.Optional(CONF_HTTP_TIMEOUT, default=DEFAULT_HTTP_TIMEOUT): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_HTTP2, default=DEFAULT_HTTP2): bool,
+        vol.Optional(CONF_MAX_CONCURRENT_PER_API, default=DEFAULT_MAX_CONCURRENT_PER_API): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_MAX_CONCURRENT_PER_KEY, default=DEFAULT_MAX_CONCURRENT_PER_KEY): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_HTTP_RETRIES, default=DEFAULT_HTTP_RETRIES): vol.All(int, vol.Range(min=0)),
+        vol.Optional(CONF_HTTP_BACKOFF, default=DEFAULT_HTTP_BACKOFF): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_HTTP_BACKOFF_MAX, default=DEFAULT_HTTP_BACKOFF_MAX): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_CIRCUIT_THRESHOLD, default=DEFAULT_CIRCUIT_THRESHOLD): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_CIRCUIT_COOLDOWN, default=DEFAULT_CIRCUIT_COOLDOWN): vol.All(int, vol.Range(min=1)),
+        vol.Optional(CONF_QUOTA, default={}): vol.Schema(hasl_quota_config_schema()),
+        vol.Optional(CONF_ATTRIBUTE_MAX_ITEMS, default=DEFAULT_ATTRIBUTE_MAX_ITEMS): vol.All(int, vol.Range(min=0)),
+        vol.Optional(CONF_ATTRIBUTE_MAX_BYTES, default=DEFAULT_ATTRIBUTE_MAX_BYTES): vol.All(int, vol.Range(min=0)),
+        vol.Optional(CONF_ATTRIBUTE_FIELDS, default={}): vol.Schema(hasl_attribute_fields_config_schema())
+    }
+
+
+def hasl_attribute_fields_config_schema() -> dict:
+    """Fields to keep in the items of each list attribute, all fields if not given."""
+    return {
+        vol.Optional(listtype): [str] for listtype in CONF_ATTRIBUTE_LIST_TYPES
+    }
+
+
+def hasl_quota_config_schema() -> dict:
+    """Per API key budgets, defaults to the Trafiklab Brons level."""
+    return {
+        vol.Optional(quotatype): vol.Schema({
+            vol.Optional(CONF_QUOTA_PER_MINUTE): vol.All(int, vol.Range(min=1)),
+            vol.Optional(CONF_QUOTA_PER_MONTH): vol.All(int, vol.Range(min=1))
+        }) for quotatype in CONF_QUOTA_TYPE_LIST
+    }
@@ -41,6 +41,9 @@ CONF_FP_SPVC = 'fpspvc'
 CONF_FP_TB1 = 'fptb1'
 CONF_FP_TB2 = 'fptb2'
 CONF_FP_TB3 = 'fptb3'
+CONF_FP_LATITUDE = 'latitude'
+CONF_FP_LONGITUDE = 'longitude'
+CONF_FP_RADIUS = 'radius'
 CONF_ANALOG_SENSORS = 'analog'
 CONF_SENSOR = 'sensor'
 CONF_SENSOR_PROPERTY = 'property'
@@ -88,3 +91,66 @@ DEFAULT_SENSOR_PROPERTY = CONF_SENSOR_PROPERTY_MIN
 DEFAULT_INTEGRATION_TYPE = SENSOR_RRDEP
 DEFAULT_SCAN_INTERVAL = 300
 DEFAULT_TIMEWINDOW = 6
+
+CONF_HTTP_MAX_CONNECTIONS = 'http_max_connections'
+CONF_HTTP_MAX_KEEPALIVE = 'http_max_keepalive'
+CONF_HTTP_KEEPALIVE_EXPIRY = 'http_keepalive_expiry'
+CONF_HTTP_TIMEOUT = 'http_timeout'
+CONF_HTTP2 = 'http2'
+CONF_MAX_CONCURRENT_PER_API = 'max_concurrent_per_api'
+CONF_MAX_CONCURRENT_PER_KEY = 'max_concurrent_per_key'
+CONF_HTTP_RETRIES = 'http_retries'
+CONF_HTTP_BACKOFF = 'http_backoff'
+CONF_HTTP_BACKOFF_MAX = 'http_backoff_max'
+CONF_CIRCUIT_THRESHOLD = 'circuit_threshold'
+CONF_CIRCUIT_COOLDOWN = 'circuit_cooldown'
+
+DEFAULT_HTTP_MAX_CONNECTIONS = 20
+DEFAULT_HTTP_MAX_KEEPALIVE = 10
+DEFAULT_HTTP_KEEPALIVE_EXPIRY = 30
+DEFAULT_HTTP_TIMEOUT = 30
+DEFAULT_HTTP2 = True
+DEFAULT_MAX_CONCURRENT_PER_API = 8
+DEFAULT_MAX_CONCURRENT_PER_KEY = 4
+DEFAULT_HTTP_RETRIES = 2
+DEFAULT_HTTP_BACKOFF = 1
+DEFAULT_HTTP_BACKOFF_MAX = 10
+DEFAULT_CIRCUIT_THRESHOLD = 5
+DEFAULT_CIRCUIT_COOLDOWN = 60
+
+# Caps on the lists exported as sensor attributes, 0 for no limit
+CONF_ATTRIBUTE_MAX_ITEMS = 'attribute_max_items'
+CONF_ATTRIBUTE_MAX_BYTES = 'attribute_max_bytes'
+CONF_ATTRIBUTE_FIELDS = 'attribute_fields'
+CONF_ATTRIBUTE_LIST_TYPES = ['departures', 'arrivals', 'trips', 'vehicles']
+
+DEFAULT_ATTRIBUTE_MAX_ITEMS = 0
+# The recorder does not store attributes over 16 KiB, leave room for the other attributes
+DEFAULT_ATTRIBUTE_MAX_BYTES = 12288
+
+CONF_QUOTA = 'quota'
+CONF_QUOTA_PER_MINUTE = 'per_minute'
+CONF_QUOTA_PER_MONTH = 'per_month'
+CONF_QUOTA_TYPE_LIST = ['ri4', 'si2', 'tl2', 'rp3', 'rr']
+
+# Trafiklab "Brons" level budgets per API key
+DEFAULT_QUOTA = {
+    'ri4': {CONF_QUOTA_PER_MINUTE: 30, CONF_QUOTA_PER_MONTH: 10000},
+    'si2': {CONF_QUOTA_PER_MINUTE: 30, CONF_QUOTA_PER_MONTH: 10000},
+    'tl2': {CONF_QUOTA_PER_MINUTE: 30, CONF_QUOTA_PER_MONTH: 10000},
+    'rp3': {CONF_QUOTA_PER_MINUTE: 30, CONF_QUOTA_PER_MONTH: 10000},
+    'rr': {CONF_QUOTA_PER_MINUTE: 45, CONF_QUOTA_PER_MONTH: 30000}
+}
+
+# Dispatcher signal sent by the worker when a target has been refreshed, formatted with api type and target id
+SIGNAL_HASL_UPDATED = DOMAIN + "_updated_{}_{}"
+
+# Last-known API results kept in .storage between restarts, saved at most once per delay (seconds)
+STORAGE_KEY = DOMAIN + ".cache"
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 60
+
+# Monthly quota usage per API key kept in .storage, so restarts do not reset the budgets
+QUOTA_STORAGE_KEY = DOMAIN + ".quota"
+QUOTA_STORAGE_VERSION = 1
+QUOTA_STORAGE_SAVE_DELAY = 10
@@ -2,11 +2,15 @@ import logging
 import jsonpickle
 import isodate
 import time
+import asyncio
 
+from contextlib import asynccontextmanager
 from datetime import datetime
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.util.dt import now
 
 from custom_components.hasl3.slapi import (
+    SLAPI_Not_Modified,
     slapi_fp,
     slapi_tl2,
     slapi_ri4,
@@ -20,9 +24,113 @@ from custom_components.hasl3.rrapi import (
     rrapi_rrr
 )
 
+from custom_components.hasl3.const import (
+    CONF_HTTP_MAX_CONNECTIONS,
+    CONF_HTTP_MAX_KEEPALIVE,
+    CONF_HTTP_KEEPALIVE_EXPIRY,
+    CONF_HTTP_TIMEOUT,
+    CONF_HTTP2,
+    CONF_MAX_CONCURRENT_PER_API,
+    CONF_MAX_CONCURRENT_PER_KEY,
+    CONF_HTTP_RETRIES,
+    CONF_HTTP_BACKOFF,
+    CONF_HTTP_BACKOFF_MAX,
+    CONF_CIRCUIT_THRESHOLD,
+    CONF_CIRCUIT_COOLDOWN,
+    CONF_QUOTA,
+    CONF_ATTRIBUTE_MAX_ITEMS,
+    CONF_ATTRIBUTE_MAX_BYTES,
+    CONF_ATTRIBUTE_FIELDS,
+    DEFAULT_HTTP_MAX_CONNECTIONS,
+    DEFAULT_HTTP_MAX_KEEPALIVE,
+    DEFAULT_HTTP_KEEPALIVE_EXPIRY,
+    DEFAULT_HTTP_TIMEOUT,
+    DEFAULT_HTTP2,
+    DEFAULT_MAX_CONCURRENT_PER_API,
+    DEFAULT_MAX_CONCURRENT_PER_KEY,
+    DEFAULT_HTTP_RETRIES,
+    DEFAULT_HTTP_BACKOFF,
+    DEFAULT_HTTP_BACKOFF_MAX,
+    DEFAULT_CIRCUIT_THRESHOLD,
+    DEFAULT_CIRCUIT_COOLDOWN,
+    DEFAULT_ATTRIBUTE_MAX_ITEMS,
+    DEFAULT_ATTRIBUTE_MAX_BYTES,
+    SIGNAL_HASL_UPDATED
+)
+
+from .http import HASLHttpClient
+from .concurrency import (
+    HASLConcurrency,
+    gather_logged
+)
+from .scheduler import HASLScheduler
+from .quota import (
+    HASLQuota,
+    HASLQuotaStore
+)
+from .records import (
+    HASLDeparture,
+    HASLArrival,
+    board_changes,
+    sort_board
+)
+from .timeparse import parse_rr_datetime
+from .registry import HASLRegistry
+from .memory import HASLMemory
+from .cache import HASLCache
+from .attributes import HASLAttributeBudget
+from .stats import HASLApiStats
+from .profiler import (
+    HASLProfiler,
+    PROFILE_SAMPLE,
+    PROFILE_MAX_DURATION
+)
+from .geo import (
+    HASLArea,
+    HASLAreaIndex
+)
+
 
 logger = logging.getLogger("custom_components.hasl3.worker")
 
+RI4_ICONS = {
+    'Buses': 'mdi:bus',
+    'Trams': 'mdi:tram',
+    'Ships': 'mdi:ferry',
+    'Metros': 'mdi:subway-variant',
+    'Trains': 'mdi:train',
+}
+
+RR_ICONS = {
+    'BLT': 'mdi:bus',
+    'BXB': 'mdi:bus',
+    'ULT': 'mdi:subway-variant',
+    'JAX': 'mdi:train',
+    'JLT': 'mdi:train',
+    'JRE': 'mdi:train',
+    'JIC': 'mdi:train',
+    'JPT': 'mdi:train',
+    'JEX': 'mdi:train',
+    'SLT': 'mdi:tram',
+    'FLT': 'mdi:ferry',
+    'FUT': 'mdi:ferry'
+}
+
+TL2_STATUSES = {
+    'EventGood': 'Good',
+    'EventMinor': 'Minor',
+    'EventMajor': 'Closed',
+    'EventPlanned': 'Planned',
+}
+
+# Icon table used for HomeAssistant.
+TL2_STATUS_ICONS = {
+    'EventGood': 'mdi:check',
+    'EventMinor': 'mdi:clock-alert-outline',
+    'EventMajor': 'mdi:close',
+    'EventPlanned': 'mdi:triangle-outline'
+}
+
 
 class HASLStatus(object):
     """System Status."""
@@ -35,20 +143,32 @@ class HASLData(object):
     si2 = {}
     ri4 = {}
     rp3 = {}
-    rp3keys = {}
-    si2keys = {}
-    ri4keys = {}
+    rp3keys = HASLRegistry()
+    si2keys = HASLRegistry()
+    ri4keys = HASLRegistry()
     rrd = {}
     rra = {}
     rrr = {}
-    rrkeys = {}
+    rrdkeys = HASLRegistry()
+    rrakeys = HASLRegistry()
+    rrrkeys = HASLRegistry()
     fp = {}
+    tl2keys = HASLRegistry()
+    fpkeys = HASLRegistry()
+    fpareas = HASLRegistry()
+    memory = HASLMemory()
 
     def dump(self):
         return {
-            'si2keys': self.si2keys,
-            'ri4keys': self.ri4keys,
-            'rrkeys': self.rrkeys,
+            'memory': self.memory.dump(),
+            'si2keys': self.si2keys.dump(),
+            'ri4keys': self.ri4keys.dump(),
+            'rp3keys': self.rp3keys.dump(),
+            'rrdkeys': self.rrdkeys.dump(),
+            'rrakeys': self.rrakeys.dump(),
+            'rrrkeys': self.rrrkeys.dump(),
+            'tl2keys': self.tl2keys.dump(),
+            'fpkeys': self.fpkeys.dump(),
             'tl2': self.tl2,
             'si2': self.si2,
             'ri4': self.ri4,
@@ -64,6 +184,7 @@ class HASLInstances(object):
 
     instances = {}
     instanceCount = 0
+    targets = {}
 
     def add(self, id, updater):
         self.instances[id] = {
@@ -83,21 +204,237 @@ class HASLInstances(object):
     def count(self):
         return self.instanceCount
 
+    def claim(self, id, target):
+        """Record a target asserted by an instance, so it can be released on unload."""
+        if id is not None:
+            self.targets.setdefault(id, []).append(target)
+
+    def release(self, id):
+        """Forget the targets claimed by an instance and return them."""
+        return self.targets.pop(id, [])
+
 
 class HaslWorker(object):
     """HaslWorker."""
 
     hass = None
     configuration = None
+    client = None
+    concurrency = None
+    scheduler = None
+    quota = None
+    cache = None
+    attributebudget = None
+    stats = None
+    profiler = None
     status = HASLStatus()
     data = HASLData()
     instances = HASLInstances()
+    _client_lock = None
 
     @staticmethod
     def init(hass, configuration):
         """Return a initialized HaslWorker object."""
         return HaslWorker()
 
+    def getconfig(self, key, default):
+        if not self.configuration:
+            return default
+        return self.configuration.get(key, default)
+
+    def getconcurrency(self):
+        if self.concurrency is None:
+            self.concurrency = HASLConcurrency(
+                per_api=self.getconfig(CONF_MAX_CONCURRENT_PER_API, DEFAULT_MAX_CONCURRENT_PER_API),
+                per_key=self.getconfig(CONF_MAX_CONCURRENT_PER_KEY, DEFAULT_MAX_CONCURRENT_PER_KEY)
+            )
+        return self.concurrency
+
+    def getquota(self):
+        if self.quota is None:
+            self.quota = HASLQuota(self.getconfig(CONF_QUOTA, {}))
+        return self.quota
+
+    def getstats(self):
+        if self.stats is None:
+            self.stats = HASLApiStats()
+        return self.stats
+
+    @asynccontextmanager
+    async def apislot(self, apitype, key):
+        """Wait for quota and a concurrency slot before calling an API, counting the call.
+
+        Calls that share the response of an identical request in flight get their
+        quota back, only the request actually sent counts against the budgets.
+        """
+        await self.getquota().acquire(apitype, key)
+        async with self.getconcurrency().slot(apitype, key):
+            with self.getstats().call(apitype, key) as call:
+                try:
+                    yield
+                except Exception as e:
+                    if not call.shared:
+                        self.getquota().report(apitype, key, e)
+                    raise
+                finally:
+                    if call.shared:
+                        self.getquota().refund(apitype, key)
+
+    async def async_profile(self, duration, mode=PROFILE_SAMPLE, interval=0.01, worker_only=True):
+        """Profile the event loop for duration seconds and write the result to the config directory.
+
+        Returns the path of the file written, see HASLProfiler for the modes.
+        """
+        if self.profiler is not None:
+            raise RuntimeError("A profiling session is already running")
+
+        profiler = self.profiler = HASLProfiler(mode, interval, worker_only)
+        profiler.start()
+        try:
+            await asyncio.sleep(min(max(1, duration), PROFILE_MAX_DURATION))
+        finally:
+            profiler.stop()
+            self.profiler = None
+
+        outputfile = self.hass.config.path(f"hasl_profile_{time.strftime('%Y%m%d%H%M%S')}.{profiler.extension()}")
+        await self.hass.async_add_executor_job(profiler.write, outputfile)
+        return outputfile
+
+    def getattributebudget(self):
+        if self.attributebudget is None:
+            self.attributebudget = HASLAttributeBudget(
+                max_items=self.getconfig(CONF_ATTRIBUTE_MAX_ITEMS, DEFAULT_ATTRIBUTE_MAX_ITEMS),
+                max_bytes=self.getconfig(CONF_ATTRIBUTE_MAX_BYTES, DEFAULT_ATTRIBUTE_MAX_BYTES),
+                fields=self.getconfig(CONF_ATTRIBUTE_FIELDS, {})
+            )
+        return self.attributebudget
+
+    def getscheduler(self):
+        if self.scheduler is None:
+            self.scheduler = HASLScheduler(self)
+        return self.scheduler
+
+    def notify(self, apitype, targetid, changes=None):
+        """Tell the entities of a target that its data has been refreshed.
+
+        Boards pass the lines that changed since the last refresh, see board_changes,
+        and entities are not told about boards where no line changed.
+        """
+        self.data.memory.update(apitype, targetid, getattr(self.data, apitype).get(targetid))
+        if changes is not None and not changes:
+            logger.debug(f"[notify] No changes on {apitype} {targetid}")
+        elif self.hass is not None:
+            async_dispatcher_send(self.hass, SIGNAL_HASL_UPDATED.format(apitype, targetid), changes)
+        if self.cache is not None:
+            self.cache.schedule_save(self.data)
+
+    async def async_load_cache(self):
+        """Load the last-known results and the quota usage saved before the restart."""
+        self.cache = HASLCache(self.hass)
+        await self.cache.async_load()
+        await HASLQuotaStore(self.hass).async_load(self.getquota())
+
+    def restored(self, apitype, targetid):
+        """The last-known data of a target from the cache, None if there is none."""
+        if self.cache is None:
+            return None
+        return self.cache.restore(apitype, targetid)
+
+    def gettargetdata(self, target):
+        (apitype, key, targetid) = target
+        return getattr(self.data, apitype).get(targetid)
+
+    async def refresh_target(self, target):
+        """Refresh a scheduler target, i.e. a (api type, api key, target id) tuple."""
+        (apitype, key, targetid) = target
+
+        if apitype == "ri4":
+            await self.refresh_ri4(key, targetid)
+        elif apitype == "si2":
+            await self.refresh_si2(key, targetid)
+        elif apitype == "rp3":
+            await self.refresh_rp3(key, targetid)
+        elif apitype == "fp":
+            await self.refresh_fp(targetid)
+        elif apitype == "tl2":
+            await self.refresh_tl2(key)
+        elif apitype == "rrd":
+            await self.refresh_rrd(key, targetid)
+        elif apitype == "rra":
+            await self.refresh_rra(key, targetid)
+        elif apitype == "rrr":
+            await self.refresh_rrr(key, targetid)
+        else:
+            logger.error(f"[refresh_target] Unknown api type {apitype}")
+
+    def release(self, target):
+        """Drop a reference to a target, forgetting its data once nothing refers to it."""
+        (apitype, key, targetid) = target
+        if apitype == "fparea":
+            # Areas have no data of their own, the next refresh of the vehicle type drops their vehicles
+            self.data.fpareas.remove(key, targetid)
+            return
+
+        registry = getattr(self.data, f"{apitype}keys")
+        removed = registry.remove(key, targetid)
+        if removed and self.client is not None:
+            # Conditional requests remember the last response per target, see slapi_si2/slapi_tl2
+            self.client.forget(target)
+        if removed and not registry.referenced(targetid):
+            logger.debug(f"[release] {apitype} {targetid} is no longer used, dropping its data")
+            getattr(self.data, apitype).pop(targetid, None)
+            self.data.memory.remove(apitype, targetid)
+
+    def release_instance(self, id):
+        """Release every target claimed by an unloaded instance."""
+        targets = self.instances.release(id)
+        for target in targets:
+            self.release(target)
+        logger.debug(f"[release_instance] Released {len(targets)} targets of {id}")
+
+    def _create_client(self):
+        return HASLHttpClient(
+            max_connections=self.getconfig(CONF_HTTP_MAX_CONNECTIONS, DEFAULT_HTTP_MAX_CONNECTIONS),
+            max_keepalive=self.getconfig(CONF_HTTP_MAX_KEEPALIVE, DEFAULT_HTTP_MAX_KEEPALIVE),
+            keepalive_expiry=self.getconfig(CONF_HTTP_KEEPALIVE_EXPIRY, DEFAULT_HTTP_KEEPALIVE_EXPIRY),
+            timeout=self.getconfig(CONF_HTTP_TIMEOUT, DEFAULT_HTTP_TIMEOUT),
+            http2=self.getconfig(CONF_HTTP2, DEFAULT_HTTP2),
+            retries=self.getconfig(CONF_HTTP_RETRIES, DEFAULT_HTTP_RETRIES),
+            backoff=self.getconfig(CONF_HTTP_BACKOFF, DEFAULT_HTTP_BACKOFF),
+            backoff_max=self.getconfig(CONF_HTTP_BACKOFF_MAX, DEFAULT_HTTP_BACKOFF_MAX),
+            circuit_threshold=self.getconfig(CONF_CIRCUIT_THRESHOLD, DEFAULT_CIRCUIT_THRESHOLD),
+            circuit_cooldown=self.getconfig(CONF_CIRCUIT_COOLDOWN, DEFAULT_CIRCUIT_COOLDOWN)
+        )
+
+    def getclientlock(self):
+        # Created on first use so it binds to the running loop, not the one at import
+        if self._client_lock is None:
+            self._client_lock = asyncio.Lock()
+        return self._client_lock
+
+    async def async_get_client(self):
+        """Return the shared HTTP client, creating it on first use."""
+        async with self.getclientlock():
+            if self.client is None or self.client.is_closed:
+                logger.debug("[get_client] Creating pooled HTTP client")
+                # Loading the SSL context blocks, so build the client in the executor
+                self.client = await self.hass.async_add_executor_job(self._create_client)
+        return self.client
+
+    def getcircuitstatus(self):
+        """Circuit breaker state per API host, for system health."""
+        if self.client is None:
+            return {}
+        return {f"Circuit {host}": state for (host, state) in self.client.breaker.status().items()}
+
+    async def async_close_client(self):
+        """Close the shared HTTP client and its pooled connections."""
+        async with self.getclientlock():
+            if self.client is not None:
+                logger.debug("[close_client] Closing pooled HTTP client")
+                await self.client.aclose()
+                self.client = None
+
     def debugdump(self, data):
         logger.debug("[debug_dump] Entered")
 
@@ -136,36 +473,25 @@ class HaslWorker(object):
             logger.debug("[check_sensor_state] No sensor specified, will return default")
             return default
 
-    async def assert_rp3(self, key, source, destination):
+    async def assert_rp3(self, key, source, destination, owner=None):
         logger.debug("[assert_rp3] Entered")
 
         listvalue = f"{source}-{destination}"
-        if key not in self.data.rp3keys:
-            logger.debug("[assert_rp3] Registered key")
-            self.data.rp3keys[key] = {
-                "api_key": key,
-                "trips": ""
-            }
-        else:
-            logger.debug("[assert_rp3] Key already present")
-
-        currentvalue = self.data.rp3keys[key]['trips']
-        if currentvalue == "":
-            logger.debug("[assert_rp3] Creating trip key")
-            self.data.rp3keys[key]["trips"] = listvalue
+        if self.data.rp3keys.add(key, listvalue):
+            logger.debug("[assert_rp3] Registered trip")
         else:
-            logger.debug("[assert_rp3] Amending to trip key")
-            self.data.rp3keys[key]["trips"] = f"{currentvalue}|{listvalue}"
+            logger.debug("[assert_rp3] Trip already registered")
 
         if listvalue not in self.data.rp3:
             logger.debug("[assert_rp3] Creating default values")
-            self.data.rp3[listvalue] = {
+            self.data.rp3[listvalue] = self.restored("rp3", listvalue) or {
                 "api_type": "slapi-si2",
                 "api_lastrun": '1970-01-01 01:01:01',
                 "api_result": "Pending",
                 "trips": []
             }
 
+        self.instances.claim(owner, ("rp3", key, listvalue))
         logger.debug("[assert_rp3] Completed")
         return
 
@@ -194,143 +520,157 @@ class HaslWorker(object):
     async def process_rp3(self):
         logger.debug("[process_rp3] Entered")
 
-        for rp3key in list(self.data.rp3keys):
+        client = await self.async_get_client()
+        tasks = []
+        for (rp3key, trips) in self.data.rp3keys.items():
             logger.debug(f"[process_rp3] Processing key {rp3key}")
-            rp3data = self.data.rp3keys[rp3key]
-            api = slapi_rp3(rp3key)
-            for tripname in '|'.join(set(rp3data["trips"].split('|'))).split('|'):
-                logger.debug(f"[process_rp3] Processing trip {tripname}")
-                newdata = self.data.rp3[tripname]
-                positions = tripname.split('-')
+            api = slapi_rp3(rp3key, client=client)
+            for tripname in trips:
+                tasks.append(self._process_rp3_trip(api, rp3key, tripname))
 
-                try:
+        await gather_logged(tasks)
+        logger.debug("[process_rp3] Completed")
 
-                    apidata = {}
+    async def refresh_rp3(self, key, tripname):
+        """Refresh a single RP3 trip without sweeping every registered trip."""
+        logger.debug(f"[refresh_rp3] Refreshing trip {tripname}")
+        client = await self.async_get_client()
+        await self._process_rp3_trip(slapi_rp3(key, client=client), key, tripname)
 
-                    srcLocID = ''
-                    dstLocID = ''
-                    srcLocLat = ''
-                    srcLocLng = ''
-                    dstLocLat = ''
-                    dstLocLng = ''
+    async def _process_rp3_trip(self, api, rp3key, tripname):
+        logger.debug(f"[process_rp3] Processing trip {tripname}")
+        newdata = self.data.rp3[tripname]
+        positions = tripname.split('-')
 
-                    if "," in positions[0]:
-                        srcLoc = positions[0].split(',')
-                        srcLocLat = srcLoc[0]
-                        srcLocLng = srcLoc[1]
-                    else:
-                        srcLocID = positions[0]
+        try:
 
-                    if "," in positions[1]:
-                        dstLoc = positions[1].split(',')
-                        dstLocLat = dstLoc[0]
-                        dstLocLng = dstLoc[1]
+            apidata = {}
+
+            srcLocID = ''
+            dstLocID = ''
+            srcLocLat = ''
+            srcLocLng = ''
+            dstLocLat = ''
+            dstLocLng = ''
+
+            if "," in positions[0]:
+                srcLoc = positions[0].split(',')
+                srcLocLat = srcLoc[0]
+                srcLocLng = srcLoc[1]
+            else:
+                srcLocID = positions[0]
+
+            if "," in positions[1]:
+                dstLoc = positions[1].split(',')
+                dstLocLat = dstLoc[0]
+                dstLocLng = dstLoc[1]
+            else:
+                dstLocID = positions[1]
+
+            async with self.apislot("rp3", rp3key):
+                apidata = await api.request(srcLocID, dstLocID, srcLocLat, srcLocLng, dstLocLat, dstLocLng)
+            newdata['trips'] = []
+
+            # Parse every trip
+            for trip in apidata["Trip"]:
+                newtrip = {
+                    'fares': [],
+                    'legs': []
+                }
+
+                # Loop all fares and add
+                for fare in trip['TariffResult']['fareSetItem'][0]['fareItem']:
+                    newfare = {}
+                    newfare['name'] = fare['name']
+                    newfare['desc'] = fare['desc']
+                    newfare['price'] = int(fare['price']) / 100
+                    newtrip['fares'].append(newfare)
+
+                # Add legs to trips
+                for leg in trip['LegList']['Leg']:
+                    newleg = {}
+                    # Walking is done by humans.
+                    # And robots.
+                    # Robots are scary.
+                    if leg["type"] == "WALK":
+                        newleg['name'] = leg['name']
+                        newleg['line'] = 'Walk'
+                        newleg['direction'] = 'Walk'
+                        newleg['category'] = 'WALK'
                     else:
-                        dstLocID = positions[1]
-
-                    apidata = await api.request(srcLocID, dstLocID, srcLocLat, srcLocLng, dstLocLat, dstLocLng)
-                    newdata['trips'] = []
-
-                    # Parse every trip
-                    for trip in apidata["Trip"]:
-                        newtrip = {
-                            'fares': [],
-                            'legs': []
-                        }
-
-                        # Loop all fares and add
-                        for fare in trip['TariffResult']['fareSetItem'][0]['fareItem']:
-                            newfare = {}
-                            newfare['name'] = fare['name']
-                            newfare['desc'] = fare['desc']
-                            newfare['price'] = int(fare['price']) / 100
-                            newtrip['fares'].append(newfare)
-
-                        # Add legs to trips
-                        for leg in trip['LegList']['Leg']:
-                            newleg = {}
-                            # Walking is done by humans.
-                            # And robots.
-                            # Robots are scary.
-                            if leg["type"] == "WALK":
-                                newleg['name'] = leg['name']
-                                newleg['line'] = 'Walk'
-                                newleg['direction'] = 'Walk'
-                                newleg['category'] = 'WALK'
-                            else:
-                                newleg['name'] = leg['Product']['name']
-                                newleg['line'] = leg['Product']['line']
-                                newleg['direction'] = leg['direction']
-                                newleg['category'] = leg['category']
-                            newleg['from'] = leg['Origin']['name']
-                            newleg['to'] = leg['Destination']['name']
-                            newleg['time'] = f"{leg['Origin']['date']} {leg['Origin']['time']}"
-
-                            if leg.get('Stops'):
-                                if leg['Stops'].get('Stop', {}):
-                                    newleg['stops'] = []
-                                    for stop in leg.get('Stops', {}).get('Stop', {}):
-                                        newleg['stops'].append(stop)
-
-                            newtrip['legs'].append(newleg)
-
-                        # Make some shortcuts for data
-                        newtrip['first_leg'] = newtrip['legs'][0]['name']
-                        newtrip['time'] = newtrip['legs'][0]['time']
-                        newtrip['price'] = newtrip['fares'][0]['price']
-                        newtrip['duration'] = str(isodate.parse_duration(trip['duration']))
-                        newtrip['transfers'] = trip['transferCount']
-                        newdata['trips'].append(newtrip)
-
-                    # Add shortcuts to info in the first trip if it exists
-                    firstLegFirstTrip = next((x for x in newdata['trips'][0]['legs'] if x["category"] != "WALK"), [])
-                    lastLegLastTrip = next((x for x in reversed(newdata['trips'][0]['legs']) if x["category"] != "WALK"), [])
-                    newdata['transfers'] = sum(p["category"] != "WALK" for p in newdata['trips'][0]['legs']) - 1 or 0
-                    newdata['price'] = newdata['trips'][0]['price'] or ''
-                    newdata['time'] = newdata['trips'][0]['time'] or ''
-                    newdata['duration'] = newdata['trips'][0]['duration'] or ''
-                    newdata['from'] = newdata['trips'][0]['legs'][0]['from'] or ''
-                    newdata['to'] = newdata['trips'][0]['legs'][len(newdata['trips'][0]['legs']) - 1]['to'] or ''
-                    newdata['origin'] = {}
-                    newdata['origin']['leg'] = firstLegFirstTrip["name"] or ''
-                    newdata['origin']['line'] = firstLegFirstTrip["line"] or ''
-                    newdata['origin']['direction'] = firstLegFirstTrip["direction"] or ''
-                    newdata['origin']['category'] = firstLegFirstTrip["category"] or ''
-                    newdata['origin']['time'] = firstLegFirstTrip["time"] or ''
-                    newdata['origin']['from'] = firstLegFirstTrip["from"] or ''
-                    newdata['origin']['to'] = firstLegFirstTrip["to"] or ''
-                    newdata['destination'] = {}
-                    newdata['destination']['leg'] = lastLegLastTrip["name"] or ''
-                    newdata['destination']['line'] = lastLegLastTrip["line"] or ''
-                    newdata['destination']['direction'] = lastLegLastTrip["direction"] or ''
-                    newdata['destination']['category'] = lastLegLastTrip["category"] or ''
-                    newdata['destination']['time'] = lastLegLastTrip["time"] or ''
-                    newdata['destination']['from'] = lastLegLastTrip["from"] or ''
-                    newdata['destination']['to'] = lastLegLastTrip["to"] or ''
-
-                    newdata['attribution'] = "Stockholms Lokaltrafik"
-                    newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                    newdata['api_result'] = "Success"
-                except Exception as e:
-                    logger.debug(f"[process_rp3] Error occurred: {str(e)}")
-                    newdata['api_result'] = "Error"
-                    newdata['api_error'] = str(e)
-
-                newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                self.data.rp3[tripname] = newdata
-
-                logger.debug(f"[process_rp3] Completed trip {tripname}")
+                        newleg['name'] = leg['Product']['name']
+                        newleg['line'] = leg['Product']['line']
+                        newleg['direction'] = leg['direction']
+                        newleg['category'] = leg['category']
+                    newleg['from'] = leg['Origin']['name']
+                    newleg['to'] = leg['Destination']['name']
+                    newleg['time'] = f"{leg['Origin']['date']} {leg['Origin']['time']}"
+
+                    if leg.get('Stops'):
+                        if leg['Stops'].get('Stop', {}):
+                            newleg['stops'] = []
+                            for stop in leg.get('Stops', {}).get('Stop', {}):
+                                newleg['stops'].append(stop)
+
+                    newtrip['legs'].append(newleg)
+
+                # Make some shortcuts for data
+                newtrip['first_leg'] = newtrip['legs'][0]['name']
+                newtrip['time'] = newtrip['legs'][0]['time']
+                newtrip['price'] = newtrip['fares'][0]['price']
+                newtrip['duration'] = str(isodate.parse_duration(trip['duration']))
+                newtrip['transfers'] = trip['transferCount']
+                newdata['trips'].append(newtrip)
+
+            # Add shortcuts to info in the first trip if it exists
+            firstLegFirstTrip = next((x for x in newdata['trips'][0]['legs'] if x["category"] != "WALK"), [])
+            lastLegLastTrip = next((x for x in reversed(newdata['trips'][0]['legs']) if x["category"] != "WALK"), [])
+            newdata['transfers'] = sum(p["category"] != "WALK" for p in newdata['trips'][0]['legs']) - 1 or 0
+            newdata['price'] = newdata['trips'][0]['price'] or ''
+            newdata['time'] = newdata['trips'][0]['time'] or ''
+            newdata['duration'] = newdata['trips'][0]['duration'] or ''
+            newdata['from'] = newdata['trips'][0]['legs'][0]['from'] or ''
+            newdata['to'] = newdata['trips'][0]['legs'][len(newdata['trips'][0]['legs']) - 1]['to'] or ''
+            newdata['origin'] = {}
+            newdata['origin']['leg'] = firstLegFirstTrip["name"] or ''
+            newdata['origin']['line'] = firstLegFirstTrip["line"] or ''
+            newdata['origin']['direction'] = firstLegFirstTrip["direction"] or ''
+            newdata['origin']['category'] = firstLegFirstTrip["category"] or ''
+            newdata['origin']['time'] = firstLegFirstTrip["time"] or ''
+            newdata['origin']['from'] = firstLegFirstTrip["from"] or ''
+            newdata['origin']['to'] = firstLegFirstTrip["to"] or ''
+            newdata['destination'] = {}
+            newdata['destination']['leg'] = lastLegLastTrip["name"] or ''
+            newdata['destination']['line'] = lastLegLastTrip["line"] or ''
+            newdata['destination']['direction'] = lastLegLastTrip["direction"] or ''
+            newdata['destination']['category'] = lastLegLastTrip["category"] or ''
+            newdata['destination']['time'] = lastLegLastTrip["time"] or ''
+            newdata['destination']['from'] = lastLegLastTrip["from"] or ''
+            newdata['destination']['to'] = lastLegLastTrip["to"] or ''
+
+            newdata['attribution'] = "Stockholms Lokaltrafik"
+            newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
+            newdata['api_result'] = "Success"
+        except Exception as e:
+            logger.debug(f"[process_rp3] Error occurred: {str(e)}")
+            newdata['api_result'] = "Error"
+            newdata['api_error'] = str(e)
 
-            logger.debug(f"[process_rp3] Completed key {rp3key}")
+        newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
+        self.notify("rp3", tripname)
 
-        logger.debug("[process_rp3] Completed")
+        logger.debug(f"[process_rp3] Completed trip {tripname}")
 
-    async def assert_fp(self, traintype):
+    async def assert_fp(self, traintype, owner=None, area=None):
         logger.debug("[assert_fp] Entered")
 
+        # The vehicle location API is keyless, all types are held under None
+        area = area or HASLArea()
+        self.data.fpkeys.add(None, traintype)
+        self.data.fpareas.add(traintype, area)
         if traintype not in self.data.fp:
             logger.debug(f"[assert_fp] Registering {traintype}")
-            self.data.fp[traintype] = {
+            self.data.fp[traintype] = self.restored("fp", traintype) or {
                 "api_type": "slapi-fp1",
                 "api_lastrun": '1970-01-01 01:01:01',
                 "api_result": "Pending"
@@ -338,608 +678,586 @@ class HaslWorker(object):
         else:
             logger.debug(f"[assert_fp] {traintype} already registered")
 
+        self.instances.claim(owner, ("fp", None, traintype))
+        self.instances.claim(owner, ("fparea", traintype, area))
         logger.debug("[assert_fp] Completed")
         return
 
     async def process_fp(self, notarealarg=None):
-        logger.debug("[process_rp3] Entered")
+        logger.debug("[process_fp] Entered")
 
-        api = slapi_fp()
-        for traintype in list(self.data.fp):
-            logger.debug(f"[process_rp3] Processing {traintype}")
+        client = await self.async_get_client()
+        api = slapi_fp(client=client)
+        await gather_logged([self._process_fp_type(api, traintype) for traintype in list(self.data.fp)])
+        logger.debug("[process_fp] Completed")
 
-            newdata = self.data.fp[traintype]
-            try:
-                newdata['data'] = await api.request(traintype)
-                newdata['attribution'] = "Stockholms Lokaltrafik"
-                newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                newdata['api_result'] = "Success"
-                logger.debug(f"[process_rp3] Completed {traintype}")
-            except Exception as e:
-                newdata['api_result'] = "Error"
-                newdata['api_error'] = str(e)
-                logger.debug(f"[process_rp3] Error occurred for {traintype}: {str(e)}")
-
-            newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-            self.data.fp[traintype] = newdata
-        logger.debug("[process_rp3] Completed")
+    async def refresh_fp(self, traintype):
+        """Refresh a single vehicle type without sweeping every registered type."""
+        logger.debug(f"[refresh_fp] Refreshing {traintype}")
+        client = await self.async_get_client()
+        await self._process_fp_type(slapi_fp(client=client), traintype)
 
-    async def assert_si2_stop(self, key, stop):
-        await self.assert_si2(key, f"stop_{stop}", "stops", stop)
+    async def _process_fp_type(self, api, traintype):
+        logger.debug(f"[process_fp] Processing {traintype}")
 
-    async def assert_si2_line(self, key, line):
-        await self.assert_si2(key, f"line_{line}", "lines", line)
+        newdata = self.data.fp[traintype]
 
-    async def assert_si2(self, key, datakey, listkey, listvalue):
-        logger.debug("[assert_si2] Entered")
+        # Only keep the vehicles in the areas followed by the sensors, sorted into those areas while parsing
+        areas = self.data.fpareas.targets(traintype)
+        index = HASLAreaIndex(areas)
+        vehicles = {area.key: [] for area in areas}
 
-        if key not in self.data.si2keys:
-            logger.debug("[assert_si2] Registering key")
-            self.data.si2keys[key] = {
-                "api_key": key,
-                "stops": "",
-                "lines": ""
-            }
-        else:
-            logger.debug("[assert_si2] Key already present")
+        def followed(trip):
+            matches = index.match(trip)
+            for area in matches:
+                vehicles[area.key].append(trip)
+            return len(matches) > 0
+
+        try:
+            # The vehicle location API is keyless so all types share one slot pool
+            async with self.apislot("fp", None):
+                newdata['data'] = await api.request(traintype, followed)
+            newdata['areas'] = vehicles
+            newdata['attribution'] = "Stockholms Lokaltrafik"
+            newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
+            newdata['api_result'] = "Success"
+            logger.debug(f"[process_fp] Completed {traintype}")
+        except Exception as e:
+            newdata['api_result'] = "Error"
+            newdata['api_error'] = str(e)
+            logger.debug(f"[process_fp] Error occurred for {traintype}: {str(e)}")
+
+        newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
+        self.notify("fp", traintype)
+
+    async def assert_si2_stop(self, key, stop, owner=None):
+        await self.assert_si2(key, f"stop_{stop}", owner)
+
+    async def assert_si2_line(self, key, line, owner=None):
+        await self.assert_si2(key, f"line_{line}", owner)
+
+    async def assert_si2(self, key, datakey, owner=None):
+        logger.debug("[assert_si2] Entered")
 
-        if self.data.si2keys[key][listkey] == "":
-            logger.debug("[assert_si2] Creating trip key")
-            self.data.si2keys[key][listkey] = listvalue
+        if self.data.si2keys.add(key, datakey):
+            logger.debug(f"[assert_si2] Registered {datakey}")
         else:
-            logger.debug("[assert_si2] Appending to trip key")
-            self.data.si2keys[key][listkey] = f"{self.data.si2keys[key][listkey]},{listvalue}"
+            logger.debug(f"[assert_si2] {datakey} already registered")
 
         if datakey not in self.data.si2:
             logger.debug("[assert_si2] Creating default values")
-            self.data.si2[datakey] = {
+            self.data.si2[datakey] = self.restored("si2", datakey) or {
                 "api_type": "slapi-si2",
                 "api_lastrun": '1970-01-01 01:01:01',
                 "api_result": "Pending"
             }
 
+        self.instances.claim(owner, ("si2", key, datakey))
         logger.debug("[assert_si2] Completed")
         return
 
     async def process_si2(self, notarealarg=None):
         logger.debug("[process_si2] Entered")
 
-        for si2key in list(self.data.si2keys):
+        client = await self.async_get_client()
+        tasks = []
+        for (si2key, datakeys) in self.data.si2keys.items():
             logger.debug(f"[process_si2] Processing key {si2key}")
-            si2data = self.data.si2keys[si2key]
-            api = slapi_si2(si2key, 60)
-            for stop in ','.join(set(si2data["stops"].split(','))).split(','):
-                logger.debug(f"[process_si2] Processing stop {stop}")
-                newdata = self.data.si2[f"stop_{stop}"]
-                # TODO: CHECK FOR FRESHNESS TO NOT KILL OFF THE KEYS
+            for datakey in datakeys:
+                tasks.append(self._process_si2_datakey(client, si2key, datakey))
 
-                try:
-                    deviationdata = await api.request(stop, '')
-                    deviationdata = deviationdata['ResponseData']
-
-                    deviations = []
-                    for (idx, value) in enumerate(deviationdata):
-                        deviations.append({
-                            'updated': value['Updated'],
-                            'title': value['Header'],
-                            'fromDate': value['FromDateTime'],
-                            'toDate': value['UpToDateTime'],
-                            'details': value['Details'],
-                            'sortOrder': value['SortOrder'],
-                        })
-
-                    newdata['data'] = sorted(deviations,
-                                             key=lambda k: k['sortOrder'])
-                    newdata['attribution'] = "Stockholms Lokaltrafik"
-                    newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                    newdata['api_result'] = "Success"
-                    logger.debug(f"[process_si2] Processing stop {stop} completed")
-                except Exception as e:
-                    newdata['api_result'] = "Error"
-                    newdata['api_error'] = str(e)
-                    logger.debug(f"[process_si2] An error occurred during processing of stop {stop}")
-
-                newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                self.data.si2[f"stop_{stop}"] = newdata
-                logger.debug(
-                    f"[process_si2] Completed processing of stop {stop}")
+        await gather_logged(tasks)
+        logger.debug("[process_si2] Completed")
+        return
 
-            for line in ','.join(set(si2data["lines"].split(','))).split(','):
-                logger.debug(f"[process_si2] Processing line {line}")
-                newdata = self.data.si2[f"line_{line}"]
-                # TODO: CHECK FOR FRESHNESS TO NOT KILL OFF THE KEYS
+    async def refresh_si2(self, key, datakey):
+        """Refresh a single deviation key (stop_<id> or line_<id>)."""
+        logger.debug(f"[refresh_si2] Refreshing {datakey}")
+        client = await self.async_get_client()
+        await self._process_si2_datakey(client, key, datakey)
 
-                try:
-                    deviationdata = await api.request('', line)
-                    deviationdata = deviationdata['ResponseData']
-
-                    deviations = []
-                    for (idx, value) in enumerate(deviationdata):
-                        deviations.append({
-                            'updated': value['Updated'],
-                            'title': value['Header'],
-                            'fromDate': value['FromDateTime'],
-                            'toDate': value['UpToDateTime'],
-                            'details': value['Details'],
-                            'sortOrder': value['SortOrder'],
-                        })
-
-                    newdata['data'] = sorted(deviations, key=lambda k: k['sortOrder'])
-                    newdata['attribution'] = "Stockholms Lokaltrafik"
-                    newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                    newdata['api_result'] = "Success"
-                    logger.debug(f"[process_si2] Processing line {line} completed")
-                except Exception as e:
-                    newdata['api_result'] = "Error"
-                    newdata['api_error'] = str(e)
-                    logger.debug(f"[process_si2] An error occurred during processing of line {line}")
+    async def _process_si2_datakey(self, client, si2key, datakey):
+        kind, value = datakey.split('_', 1)
+        if kind == "stop":
+            await self._process_si2_target(client, si2key, datakey, value, '')
+        else:
+            await self._process_si2_target(client, si2key, datakey, '', value)
 
-                newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                self.data.si2[f"line_{line}"] = newdata
-                logger.debug(f"[process_si2] Completed processing of line {line}")
+    async def _process_si2_target(self, client, si2key, datakey, stop, line):
+        logger.debug(f"[process_si2] Processing {datakey}")
+        newdata = self.data.si2[datakey]
+        changed = True
 
-            logger.debug(f"[process_si2] Completed processing key {si2key}")
+        try:
+            # Deviations rarely change, skip parsing when the response is the same as last time
+            api = slapi_si2(si2key, 60, client=client, conditional=newdata['api_result'] == "Success",
+                            key=("si2", si2key, datakey))
+            async with self.apislot("si2", si2key):
+                deviationdata = await api.request(stop, line)
+            deviationdata = deviationdata['ResponseData']
+
+            deviations = []
+            for (idx, value) in enumerate(deviationdata):
+                deviations.append({
+                    'updated': value['Updated'],
+                    'title': value['Header'],
+                    'fromDate': value['FromDateTime'],
+                    'toDate': value['UpToDateTime'],
+                    'details': value['Details'],
+                    'sortOrder': value['SortOrder'],
+                })
+
+            newdata['data'] = sorted(deviations, key=lambda k: k['sortOrder'])
+            newdata['attribution'] = "Stockholms Lokaltrafik"
+            newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
+            newdata['api_result'] = "Success"
+            logger.debug(f"[process_si2] Processing {datakey} completed")
+        except SLAPI_Not_Modified:
+            changed = False
+            logger.debug(f"[process_si2] {datakey} is unchanged")
+        except Exception as e:
+            newdata['api_result'] = "Error"
+            newdata['api_error'] = str(e)
+            logger.debug(f"[process_si2] An error occurred during processing of {datakey}")
 
-        logger.debug("[process_si2] Completed")
-        return
+        newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
+        if changed:
+            self.notify("si2", datakey)
+        logger.debug(f"[process_si2] Completed processing of {datakey}")
 
-    async def assert_ri4(self, key, stop):
+    async def assert_ri4(self, key, stop, owner=None):
         logger.debug("[assert_ri4] Entered")
         stopkey = str(stop)
 
-        if key not in self.data.ri4keys:
-            logger.debug("[assert_ri4] Registering key and stop")
-            self.data.ri4keys[key] = {
-                "api_key": key,
-                "stops": stopkey
-            }
+        if self.data.ri4keys.add(key, stopkey):
+            logger.debug("[assert_ri4] Registered stop")
         else:
-            logger.debug("[assert_ri4] Adding stop to existing key")
-            self.data.ri4keys[key]["stops"] = f"{self.data.ri4keys[key]['stops']},{stopkey}"
+            logger.debug("[assert_ri4] Stop already registered")
 
-        if stop not in self.data.ri4:
+        if stopkey not in self.data.ri4:
             logger.debug("[assert_ri4] Creating default data")
-            self.data.ri4[stopkey] = {
+            self.data.ri4[stopkey] = self.restored("ri4", stopkey) or {
                 "api_type": "slapi-ri4",
                 "api_lastrun": '1970-01-01 01:01:01',
                 "api_result": "Pending"
             }
 
+        self.instances.claim(owner, ("ri4", key, stopkey))
         logger.debug("[assert_ri4] Completed")
         return
 
-    async def assert_rrd(self, key, stop):
+    async def assert_rrd(self, key, stop, owner=None):
         logger.debug("[assert_rrd] Entered")
         stopkey = str(stop)
 
-        if key not in self.data.rrkeys:
-            logger.debug("[assert_rrd] Registering key")
-            self.data.rrkeys[key] = {
-                "api_key": key
-            }
-
-        if 'deps' not in self.data.rrkeys[key]:
-            logger.debug("[assert_rrd] Registering deps key")
-            self.data.rrkeys[key]['deps'] = f"{stopkey}"
+        if self.data.rrdkeys.add(key, stopkey):
+            logger.debug("[assert_rrd] Registered stop")
         else:
-            logger.debug("[assert_rrd] Adding stop to existing deps key")
-            self.data.rrkeys[key]["deps"] = f"{self.data.rrkeys[key]['deps']},{stopkey}"
+            logger.debug("[assert_rrd] Stop already registered")
 
-        if stop not in self.data.rrd:
+        if stopkey not in self.data.rrd:
             logger.debug("[assert_rrd] Creating default data")
-            self.data.rrd[stopkey] = {
+            self.data.rrd[stopkey] = self.restored("rrd", stopkey) or {
                 "api_type": "rrapi-rrd",
                 "api_lastrun": '1970-01-01 01:01:01',
                 "api_result": "Pending"
             }
 
+        self.instances.claim(owner, ("rrd", key, stopkey))
         logger.debug("[assert_rrd] Completed")
         return     
 
-    async def assert_rra(self, key, stop):
+    async def assert_rra(self, key, stop, owner=None):
         logger.debug("[assert_rra] Entered")
         stopkey = str(stop)
 
-        if key not in self.data.rrkeys:
-            logger.debug("[assert_rra] Registering key")
-            self.data.rrkeys[key] = {
-                "api_key": key
-            }
-
-        if 'arrs' not in self.data.rrkeys[key]:
-            logger.debug("[assert_rra] Registering arrs key")
-            self.data.rrkeys[key]['arrs'] = f"{stopkey}"
+        if self.data.rrakeys.add(key, stopkey):
+            logger.debug("[assert_rra] Registered stop")
         else:
-            logger.debug("[assert_rra] Adding stop to existing arrs key")
-            self.data.rrkeys[key]["arrs"] = f"{self.data.rrkeys[key]['arrs']},{stopkey}"
+            logger.debug("[assert_rra] Stop already registered")
 
-        if stop not in self.data.rra:
+        if stopkey not in self.data.rra:
             logger.debug("[assert_rra] Creating default data")
-            self.data.rra[stopkey] = {
+            self.data.rra[stopkey] = self.restored("rra", stopkey) or {
                 "api_type": "rrapi-rra",
                 "api_lastrun": '1970-01-01 01:01:01',
                 "api_result": "Pending"
             }
 
+        self.instances.claim(owner, ("rra", key, stopkey))
         logger.debug("[assert_rra] Completed")
         return
 
-    async def assert_rrr(self, key, source, destination):
+    async def assert_rrr(self, key, source, destination, owner=None):
         logger.debug("[assert_rrr] Entered")
 
         listvalue = f"{source}-{destination}"
-        if key not in self.data.rrkeys:
-            logger.debug("[assert_rra] Registering key")
-            self.data.rrkeys[key] = {
-                "api_key": key
-            }
-
-        if 'trips' not in self.data.rrkeys[key]:
-            logger.debug("[assert_rra] Registering trips key")
-            self.data.rrkeys[key]['trips'] = ""
-
-        currentvalue = self.data.rrkeys[key]['trips']
-        if currentvalue == "":
-            logger.debug("[assert_rrr] Creating trip key")
-            self.data.rrkeys[key]["trips"] = listvalue
+        if self.data.rrrkeys.add(key, listvalue):
+            logger.debug("[assert_rrr] Registered trip")
         else:
-            logger.debug("[assert_rrr] Amending to trip key")
-            self.data.rrkeys[key]["trips"] = f"{currentvalue}|{listvalue}"
+            logger.debug("[assert_rrr] Trip already registered")
 
         if listvalue not in self.data.rrr:
             logger.debug("[assert_rrr] Creating default values")
-            self.data.rrr[listvalue] = {
+            self.data.rrr[listvalue] = self.restored("rrr", listvalue) or {
                 "api_type": "rrapi-rrr",
                 "api_lastrun": '1970-01-01 01:01:01',
                 "api_result": "Pending",
                 "trips": []
             }
 
-        logger.debug("[assert_rp3] Completed")
-        return      
+        self.instances.claim(owner, ("rrr", key, listvalue))
+        logger.debug("[assert_rrr] Completed")
+        return
 
     async def process_rrd(self, notarealarg=None):
         logger.debug("[process_rrd] Entered")
 
-        iconswitcher = {
-            'BLT': 'mdi:bus',
-            'BXB': 'mdi:bus',
-            'ULT': 'mdi:subway-variant',
-            'JAX': 'mdi:train',
-            'JLT': 'mdi:train',
-            'JRE': 'mdi:train',
-            'JIC': 'mdi:train',
-            'JPT': 'mdi:train',
-            'JEX': 'mdi:train',
-            'SLT': 'mdi:tram',
-            'FLT': 'mdi:ferry',
-            'FUT': 'mdi:ferry'
-        }
-
-        for rrkey in list(self.data.rrkeys):
+        client = await self.async_get_client()
+        tasks = []
+        for (rrkey, stops) in self.data.rrdkeys.items():
             logger.debug(f"[process_rrd] Processing key {rrkey}")
-            rrdata = self.data.rrkeys[rrkey]
-            api = rrapi_rrd(rrkey, 60)
-            for stop in ','.join(set(rrdata["deps"].split(','))).split(','):
-                logger.debug(f"[process_rrd] Processing stop {stop}")
-                newdata = self.data.rrd[stop]
-                # TODO: CHECK FOR FRESHNESS TO NOT KILL OFF THE KEYS
+            api = rrapi_rrd(rrkey, 60, client=client)
+            for stop in stops:
+                tasks.append(self._process_rrd_stop(api, rrkey, stop))
 
-                try:
-                    departures = []
-                    departuredata = await api.request(stop)
-                    departuredata = departuredata['Departure']
-
-                    for (idx, value) in enumerate(departuredata):
-
-                        adjustedDateTime = now()
-                        adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
-                        if 'rtDate' in value and 'rtTime' in value:
-                            diff = datetime.strptime(f'{value["rtDate"]} {value["rtTime"]}', '%Y-%m-%d %H:%M:%S') - adjustedDateTime
-                            expected = datetime.strptime(f'{value["rtDate"]} {value["rtTime"]}', '%Y-%m-%d %H:%M:%S')
-                        else:
-                            diff = datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S') - adjustedDateTime
-                            expected = datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S')
-                        diff = diff.total_seconds()
-                        diff = diff / 60
-                        diff = round(diff)
-
-                        departures.append({
-                            'line': value["ProductAtStop"]["displayNumber"],
-                            'direction': value["directionFlag"],
-                            'departure': datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S'),
-                            'destination': value["direction"],
-                            'time': diff,
-                            'operator': value["ProductAtStop"]["operator"],
-                            'expected': expected,
-                            'type': value["ProductAtStop"]["catOut"],
-                            'icon': iconswitcher.get(value["ProductAtStop"]["catOut"],'mdi:train-car'),
-                        })                    
-
-                    newdata['data'] = sorted(departures,
-                                                key=lambda k: k['time'])
-                    newdata['attribution'] = "Samtrafiken Resrobot"
-                    newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                    newdata['api_result'] = "Success"
-                    logger.debug(f"[process_rrd] Stop {stop} updated successfully")
+        await gather_logged(tasks)
+        logger.debug("[process_rrd] Completed")
+        return
 
-                except Exception as e:
-                    newdata['api_result'] = "Error"
-                    newdata['api_error'] = str(e)
-                    logger.debug(f"[process_rrd] Error occurred during update {stop}")
+    async def refresh_rrd(self, key, stop):
+        """Refresh a single departure board without sweeping every registered stop."""
+        logger.debug(f"[refresh_rrd] Refreshing stop {stop}")
+        client = await self.async_get_client()
+        await self._process_rrd_stop(rrapi_rrd(key, 60, client=client), key, str(stop))
+
+    async def _process_rrd_stop(self, api, rrkey, stop):
+        logger.debug(f"[process_rrd] Processing stop {stop}")
+        newdata = self.data.rrd[stop]
+        # TODO: CHECK FOR FRESHNESS TO NOT KILL OFF THE KEYS
+        previous = newdata.get('data') if newdata.get('api_result') == "Success" else None
+        changes = None
+
+        try:
+            departures = []
+            async with self.apislot("rrd", rrkey):
+                departuredata = await api.request(stop)
+            departuredata = departuredata['Departure']
+
+            # Parse each timestamp once and count minutes from one reference time per board
+            adjustedDateTime = now().replace(tzinfo=None)
+            for value in departuredata:
+
+                scheduled = parse_rr_datetime(value["date"], value["time"])
+                if 'rtDate' in value and 'rtTime' in value:
+                    expected = parse_rr_datetime(value["rtDate"], value["rtTime"])
+                else:
+                    expected = scheduled
+                diff = round((expected - adjustedDateTime).total_seconds() / 60)
+
+                departures.append(HASLDeparture(
+                    line=value["ProductAtStop"]["displayNumber"],
+                    direction=value["directionFlag"],
+                    departure=scheduled,
+                    destination=value["direction"],
+                    time=diff,
+                    operator=value["ProductAtStop"]["operator"],
+                    expected=expected,
+                    type=value["ProductAtStop"]["catOut"],
+                    icon=RR_ICONS.get(value["ProductAtStop"]["catOut"],'mdi:train-car'),
+                    journey=value["ProductAtStop"].get("num"),
+                ))
+
+            if previous is not None:
+                changes = board_changes(previous, departures)
+            sort_board(newdata, departures)
+            newdata['attribution'] = "Samtrafiken Resrobot"
+            newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
+            newdata['api_result'] = "Success"
+            logger.debug(f"[process_rrd] Stop {stop} updated successfully")
 
+        except Exception as e:
+            newdata['api_result'] = "Error"
+            newdata['api_error'] = str(e)
+            logger.debug(f"[process_rrd] Error occurred during update {stop}")
 
-                newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                self.data.rrd[stop] = newdata
-                logger.debug(f"[process_rrd] Completed stop {stop}")
 
-            logger.debug(f"[process_rrd] Completed key {rrkey}")
- 
-        logger.debug("[process_rrd] Completed")
-        return      
+        newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
+        self.notify("rrd", stop, changes)
+        logger.debug(f"[process_rrd] Completed stop {stop}")
 
     async def process_rra(self, notarealarg=None):
         logger.debug("[process_rra] Entered")
 
-        iconswitcher = {
-            'BLT': 'mdi:bus',
-            'BXB': 'mdi:bus',
-            'ULT': 'mdi:subway-variant',
-            'JAX': 'mdi:train',
-            'JLT': 'mdi:train',
-            'JRE': 'mdi:train',
-            'JIC': 'mdi:train',
-            'JPT': 'mdi:train',
-            'JEX': 'mdi:train',
-            'SLT': 'mdi:tram',
-            'FLT': 'mdi:ferry',
-            'FUT': 'mdi:ferry'
-        }
-
-        for rrkey in list(self.data.rrkeys):
+        client = await self.async_get_client()
+        tasks = []
+        for (rrkey, stops) in self.data.rrakeys.items():
             logger.debug(f"[process_rra] Processing key {rrkey}")
-            rrdata = self.data.rrkeys[rrkey]
-            api = rrapi_rra(rrkey, 60)
-            for stop in ','.join(set(rrdata["arrs"].split(','))).split(','):
-                logger.debug(f"[process_rra] Processing stop {stop}")
-                newdata = self.data.rra[stop]
-                # TODO: CHECK FOR FRESHNESS TO NOT KILL OFF THE KEYS
+            api = rrapi_rra(rrkey, 60, client=client)
+            for stop in stops:
+                tasks.append(self._process_rra_stop(api, rrkey, stop))
 
-                try:
-                    arrivals = []
-                    arrivaldata = await api.request(stop)
-                    arrivaldata = arrivaldata['Arrival']
-
-                    logger.error(arrivaldata)
-
-                    for (idx, value) in enumerate(arrivaldata):
-
-                        adjustedDateTime = now()
-                        adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
-                        if 'rtDate' in value and 'rtTime' in value:
-                            diff = datetime.strptime(f'{value["rtDate"]} {value["rtTime"]}', '%Y-%m-%d %H:%M:%S') - adjustedDateTime
-                            expected = datetime.strptime(f'{value["rtDate"]} {value["rtTime"]}', '%Y-%m-%d %H:%M:%S')
-                        else:
-                            diff = datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S') - adjustedDateTime
-                            expected = datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S')
-                        diff = diff.total_seconds()
-                        diff = diff / 60
-                        diff = round(diff)
-
-                        arrivals.append({
-                            'line': value["ProductAtStop"]["displayNumber"],
-                            'arrival': datetime.strptime(f'{value["date"]} {value["time"]}', '%Y-%m-%d %H:%M:%S'),
-                            'origin': value["origin"],
-                            'time': diff,
-                            'operator': value["ProductAtStop"]["operator"],
-                            'expected': expected,
-                            'type': value["ProductAtStop"]["catOut"],
-                            'icon': iconswitcher.get(value["ProductAtStop"]["catOut"],'mdi:train-car'),
-                        })                    
-
-                    newdata['data'] = sorted(arrivals,
-                                                key=lambda k: k['time'])
-                    newdata['attribution'] = "Samtrafiken Resrobot"
-                    newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                    newdata['api_result'] = "Success"
-                    logger.debug(f"[process_rra] Stop {stop} updated successfully")
+        await gather_logged(tasks)
+        logger.debug("[process_rra] Completed")
+        return
 
-                except Exception as e:
-                    newdata['api_result'] = "Error"
-                    newdata['api_error'] = str(e)
-                    logger.debug(f"[process_rra] Error occurred during update {stop}")
+    async def refresh_rra(self, key, stop):
+        """Refresh a single arrival board without sweeping every registered stop."""
+        logger.debug(f"[refresh_rra] Refreshing stop {stop}")
+        client = await self.async_get_client()
+        await self._process_rra_stop(rrapi_rra(key, 60, client=client), key, str(stop))
 
+    async def _process_rra_stop(self, api, rrkey, stop):
+        logger.debug(f"[process_rra] Processing stop {stop}")
+        newdata = self.data.rra[stop]
+        # TODO: CHECK FOR FRESHNESS TO NOT KILL OFF THE KEYS
+        previous = newdata.get('data') if newdata.get('api_result') == "Success" else None
+        changes = None
 
-                newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                self.data.rra[stop] = newdata
-                logger.debug(f"[process_rra] Completed stop {stop}")
+        try:
+            arrivals = []
+            async with self.apislot("rra", rrkey):
+                arrivaldata = await api.request(stop)
+            arrivaldata = arrivaldata['Arrival']
+
+            # Parse each timestamp once and count minutes from one reference time per board
+            adjustedDateTime = now().replace(tzinfo=None)
+            for value in arrivaldata:
+
+                scheduled = parse_rr_datetime(value["date"], value["time"])
+                if 'rtDate' in value and 'rtTime' in value:
+                    expected = parse_rr_datetime(value["rtDate"], value["rtTime"])
+                else:
+                    expected = scheduled
+                diff = round((expected - adjustedDateTime).total_seconds() / 60)
+
+                arrivals.append(HASLArrival(
+                    line=value["ProductAtStop"]["displayNumber"],
+                    arrival=scheduled,
+                    origin=value["origin"],
+                    time=diff,
+                    operator=value["ProductAtStop"]["operator"],
+                    expected=expected,
+                    type=value["ProductAtStop"]["catOut"],
+                    icon=RR_ICONS.get(value["ProductAtStop"]["catOut"],'mdi:train-car'),
+                    journey=value["ProductAtStop"].get("num"),
+                ))
+
+            if previous is not None:
+                changes = board_changes(previous, arrivals)
+            sort_board(newdata, arrivals)
+            newdata['attribution'] = "Samtrafiken Resrobot"
+            newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
+            newdata['api_result'] = "Success"
+            logger.debug(f"[process_rra] Stop {stop} updated successfully")
+
+        except Exception as e:
+            newdata['api_result'] = "Error"
+            newdata['api_error'] = str(e)
+            logger.debug(f"[process_rra] Error occurred during update {stop}")
 
-            logger.debug(f"[process_rra] Completed key {rrkey}")
- 
-        logger.debug("[process_rra] Completed")
-        return 
+
+        newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
+        self.notify("rra", stop, changes)
+        logger.debug(f"[process_rra] Completed stop {stop}")
 
     async def process_rrr(self):
         logger.debug("[process_rrr] Entered")
 
-        for rrkey in list(self.data.rrkeys):
+        client = await self.async_get_client()
+        tasks = []
+        for (rrkey, trips) in self.data.rrrkeys.items():
             logger.debug(f"[process_rrr] Processing key {rrkey}")
-            rrdata = self.data.rrkeys[rrkey]
-            api = rrapi_rrr(rrkey)
-            for tripname in '|'.join(set(rrdata["trips"].split('|'))).split('|'):
-                logger.debug(f"[process_rrr] Processing trip {tripname}")
-                newdata = self.data.rrr[tripname]
-                positions = tripname.split('-')
+            api = rrapi_rrr(rrkey, client=client)
+            for tripname in trips:
+                tasks.append(self._process_rrr_trip(api, rrkey, tripname))
 
-                try:
+        await gather_logged(tasks)
+        logger.debug("[process_rrr] Completed")
 
-                    apidata = {}
-                    srcLocID = positions[0]
-                    dstLocID = positions[1]
-
-                    apidata = await api.request(srcLocID, dstLocID)
-                    newdata['trips'] = []
-
-                    #Parse every trip
-                    for trip in apidata["Trip"]:
-                        newtrip = {
-                            'legs': []
-                        }
-                    
-                        # Add legs to trips
-                        for leg in trip['LegList']['Leg']:
-                            newleg = {}
-                            # Walking is done by humans.
-                            # And robots.
-                            # Robots are scary.
-                            newleg['line'] = leg['Product'][0]['line'] if leg["type"] != "WALK" else "Walk"
-                            newleg['direction'] = leg['directionFlag'] if leg["type"] != "WALK" else "Walk"
-                            newleg['category'] = leg['type']
-                            newleg['name'] = leg['Product'][0]['name']
-                            newleg['from'] = leg['Origin']['name']
-                            newleg['to'] = leg['Destination']['name']
-                            newleg['time'] = f"{leg['Origin']['date']} {leg['Origin']['time']}"
-                    
-                            if leg.get('Stops'):
-                                if leg['Stops'].get('Stop', {}):
-                                    newleg['stops'] = []
-                                    for stop in leg.get('Stops', {}).get('Stop', {}):
-                                        newleg['stops'].append(stop)
-                    
-                            newtrip['legs'].append(newleg)
-                    
-                        # Make some shortcuts for data
-                        newtrip['first_leg'] = newtrip['legs'][0]['name']
-                        newtrip['time'] = newtrip['legs'][0]['time']
-                        newtrip['duration'] = str(isodate.parse_duration(trip['duration']))
-                        newdata['trips'].append(newtrip)
-
-                    # Add shortcuts to info in the first trip if it exists
-                    firstLegFirstTrip = next((x for x in newdata['trips'][0]['legs'] if x["category"] != "WALK"), [])
-                    lastLegLastTrip = next((x for x in reversed(newdata['trips'][0]['legs']) if x["category"] != "WALK"), [])
-                    newdata['transfers'] = sum(p["category"] != "WALK" for p in newdata['trips'][0]['legs']) - 1 or 0
-                    #newdata['price'] = newdata['trips'][0]['price'] or ''
-                    newdata['time'] = newdata['trips'][0]['time'] or ''
-                    newdata['duration'] = newdata['trips'][0]['duration'] or ''
-                    newdata['from'] = newdata['trips'][0]['legs'][0]['from'] or ''
-                    newdata['to'] = newdata['trips'][0]['legs'][len(newdata['trips'][0]['legs']) - 1]['to'] or ''
-                    newdata['origin'] = {}
-                    newdata['origin']['leg'] = firstLegFirstTrip["name"] or ''
-                    newdata['origin']['line'] = firstLegFirstTrip["line"] or ''
-                    newdata['origin']['direction'] = firstLegFirstTrip["direction"] or ''
-                    newdata['origin']['category'] = firstLegFirstTrip["category"] or ''
-                    newdata['origin']['time'] = firstLegFirstTrip["time"] or ''
-                    newdata['origin']['from'] = firstLegFirstTrip["from"] or ''
-                    newdata['origin']['to'] = firstLegFirstTrip["to"] or ''
-                    newdata['destination'] = {}
-                    newdata['destination']['leg'] = lastLegLastTrip["name"] or ''
-                    newdata['destination']['line'] = lastLegLastTrip["line"] or ''
-                    newdata['destination']['direction'] = lastLegLastTrip["direction"] or ''
-                    newdata['destination']['category'] = lastLegLastTrip["category"] or ''
-                    newdata['destination']['time'] = lastLegLastTrip["time"] or ''
-                    newdata['destination']['from'] = lastLegLastTrip["from"] or ''
-                    newdata['destination']['to'] = lastLegLastTrip["to"] or ''
-
-                    newdata['attribution'] = "Samtrafiken Resrobot"
-                    newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                    newdata['api_result'] = "Success"
-                except Exception as e:
-                    logger.debug(f"[process_rrr] Error occuredA: {str(e)}")
-                    newdata['api_result'] = "Error"
-                    newdata['api_error'] = str(e)
+    async def refresh_rrr(self, key, tripname):
+        """Refresh a single Resrobot trip without sweeping every registered trip."""
+        logger.debug(f"[refresh_rrr] Refreshing trip {tripname}")
+        client = await self.async_get_client()
+        await self._process_rrr_trip(rrapi_rrr(key, client=client), key, tripname)
 
-                newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                self.data.rrr[tripname] = newdata
+    async def _process_rrr_trip(self, api, rrkey, tripname):
+        logger.debug(f"[process_rrr] Processing trip {tripname}")
+        newdata = self.data.rrr[tripname]
+        positions = tripname.split('-')
 
-                logger.debug(f"[process_rrr] Completed trip {tripname}")
+        try:
+
+            apidata = {}
+            srcLocID = positions[0]
+            dstLocID = positions[1]
+
+            async with self.apislot("rrr", rrkey):
+                apidata = await api.request(srcLocID, dstLocID)
+            newdata['trips'] = []
+
+            #Parse every trip
+            for trip in apidata["Trip"]:
+                newtrip = {
+                    'legs': []
+                }
+
+                # Add legs to trips
+                for leg in trip['LegList']['Leg']:
+                    newleg = {}
+                    # Walking is done by humans.
+                    # And robots.
+                    # Robots are scary.
+                    newleg['line'] = leg['Product'][0]['line'] if leg["type"] != "WALK" else "Walk"
+                    newleg['direction'] = leg['directionFlag'] if leg["type"] != "WALK" else "Walk"
+                    newleg['category'] = leg['type']
+                    newleg['name'] = leg['Product'][0]['name']
+                    newleg['from'] = leg['Origin']['name']
+                    newleg['to'] = leg['Destination']['name']
+                    newleg['time'] = f"{leg['Origin']['date']} {leg['Origin']['time']}"
+
+                    if leg.get('Stops'):
+                        if leg['Stops'].get('Stop', {}):
+                            newleg['stops'] = []
+                            for stop in leg.get('Stops', {}).get('Stop', {}):
+                                newleg['stops'].append(stop)
+
+                    newtrip['legs'].append(newleg)
+
+                # Make some shortcuts for data
+                newtrip['first_leg'] = newtrip['legs'][0]['name']
+                newtrip['time'] = newtrip['legs'][0]['time']
+                newtrip['duration'] = str(isodate.parse_duration(trip['duration']))
+                newdata['trips'].append(newtrip)
+
+            # Add shortcuts to info in the first trip if it exists
+            firstLegFirstTrip = next((x for x in newdata['trips'][0]['legs'] if x["category"] != "WALK"), [])
+            lastLegLastTrip = next((x for x in reversed(newdata['trips'][0]['legs']) if x["category"] != "WALK"), [])
+            newdata['transfers'] = sum(p["category"] != "WALK" for p in newdata['trips'][0]['legs']) - 1 or 0
+            #newdata['price'] = newdata['trips'][0]['price'] or ''
+            newdata['time'] = newdata['trips'][0]['time'] or ''
+            newdata['duration'] = newdata['trips'][0]['duration'] or ''
+            newdata['from'] = newdata['trips'][0]['legs'][0]['from'] or ''
+            newdata['to'] = newdata['trips'][0]['legs'][len(newdata['trips'][0]['legs']) - 1]['to'] or ''
+            newdata['origin'] = {}
+            newdata['origin']['leg'] = firstLegFirstTrip["name"] or ''
+            newdata['origin']['line'] = firstLegFirstTrip["line"] or ''
+            newdata['origin']['direction'] = firstLegFirstTrip["direction"] or ''
+            newdata['origin']['category'] = firstLegFirstTrip["category"] or ''
+            newdata['origin']['time'] = firstLegFirstTrip["time"] or ''
+            newdata['origin']['from'] = firstLegFirstTrip["from"] or ''
+            newdata['origin']['to'] = firstLegFirstTrip["to"] or ''
+            newdata['destination'] = {}
+            newdata['destination']['leg'] = lastLegLastTrip["name"] or ''
+            newdata['destination']['line'] = lastLegLastTrip["line"] or ''
+            newdata['destination']['direction'] = lastLegLastTrip["direction"] or ''
+            newdata['destination']['category'] = lastLegLastTrip["category"] or ''
+            newdata['destination']['time'] = lastLegLastTrip["time"] or ''
+            newdata['destination']['from'] = lastLegLastTrip["from"] or ''
+            newdata['destination']['to'] = lastLegLastTrip["to"] or ''
+
+            newdata['attribution'] = "Samtrafiken Resrobot"
+            newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
+            newdata['api_result'] = "Success"
+        except Exception as e:
+            logger.debug(f"[process_rrr] Error occuredA: {str(e)}")
+            newdata['api_result'] = "Error"
+            newdata['api_error'] = str(e)
 
-            logger.debug(f"[process_rrr] Completed key {rrkey}")
+        newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
+        self.notify("rrr", tripname)
 
-        logger.debug("[process_rrr] Completed")
+        logger.debug(f"[process_rrr] Completed trip {tripname}")
 
 
     async def process_ri4(self, notarealarg=None):
         logger.debug("[process_ri4] Entered")
 
-        iconswitcher = {
-            'Buses': 'mdi:bus',
-            'Trams': 'mdi:tram',
-            'Ships': 'mdi:ferry',
-            'Metros': 'mdi:subway-variant',
-            'Trains': 'mdi:train',
-        }
-
-        for ri4key in list(self.data.ri4keys):
+        client = await self.async_get_client()
+        tasks = []
+        for (ri4key, stops) in self.data.ri4keys.items():
             logger.debug(f"[process_ri4] Processing key {ri4key}")
-            ri4data = self.data.ri4keys[ri4key]
-            api = slapi_ri4(ri4key, 60)
-            for stop in ','.join(set(ri4data["stops"].split(','))).split(','):
-                logger.debug(f"[process_ri4] Processing stop {stop}")
-                newdata = self.data.ri4[stop]
-                # TODO: CHECK FOR FRESHNESS TO NOT KILL OFF THE KEYS
+            api = slapi_ri4(ri4key, 60, client=client)
+            for stop in stops:
+                tasks.append(self._process_ri4_stop(api, ri4key, stop))
 
-                try:
-                    departures = []
-                    departuredata = await api.request(stop)
-                    departuredata = departuredata['ResponseData']
-
-                    for (i, traffictype) in enumerate(['Metros',
-                                                       'Buses',
-                                                       'Trains',
-                                                       'Trams',
-                                                       'Ships']):
-
-                        for (idx, value) in enumerate(
-                                departuredata[traffictype]):
-                            direction = value['JourneyDirection'] or 0
-                            displaytime = value['DisplayTime'] or ''
-                            destination = value['Destination'] or ''
-                            linenumber = value['LineNumber'] or ''
-                            expected = value['ExpectedDateTime'] or ''
-                            groupofline = value['GroupOfLine'] or ''
-                            icon = iconswitcher.get(traffictype,
-                                                    'mdi:train-car')
-                            diff = self.parseDepartureTime(displaytime)
-                            departures.append({
-                                'line': linenumber,
-                                'direction': direction,
-                                'departure': displaytime,
-                                'destination': destination,
-                                'time': diff,
-                                'expected': datetime.strptime(
-                                    expected, '%Y-%m-%dT%H:%M:%S'
-                                ),
-                                'type': traffictype,
-                                'groupofline': groupofline,
-                                'icon': icon,
-                            })
-
-                    newdata['data'] = sorted(departures,
-                                             key=lambda k: k['time'])
-                    newdata['attribution'] = "Stockholms Lokaltrafik"
-                    newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                    newdata['api_result'] = "Success"
-                    logger.debug(f"[process_ri4] Stop {stop} updated successfully")
-                except Exception as e:
-                    newdata['api_result'] = "Error"
-                    newdata['api_error'] = str(e)
-                    logger.debug(f"[process_ri4] Error occurred during update {stop}")
+        await gather_logged(tasks)
+        logger.debug("[process_ri4] Completed")
+        return
 
-                newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                self.data.ri4[stop] = newdata
-                logger.debug(f"[process_ri4] Completed stop {stop}")
+    async def refresh_ri4(self, key, stop):
+        """Refresh a single departure board without sweeping every registered stop."""
+        logger.debug(f"[refresh_ri4] Refreshing stop {stop}")
+        client = await self.async_get_client()
+        await self._process_ri4_stop(slapi_ri4(key, 60, client=client), key, str(stop))
 
-            logger.debug(f"[process_ri4] Completed key {ri4key}")
+    async def _process_ri4_stop(self, api, ri4key, stop):
+        logger.debug(f"[process_ri4] Processing stop {stop}")
+        newdata = self.data.ri4[stop]
+        # TODO: CHECK FOR FRESHNESS TO NOT KILL OFF THE KEYS
+        previous = newdata.get('data') if newdata.get('api_result') == "Success" else None
+        changes = None
 
-        logger.debug("[process_ri4] Completed")
-        return
+        try:
+            departures = []
+            async with self.apislot("ri4", ri4key):
+                departuredata = await api.request(stop)
+            departuredata = departuredata['ResponseData']
+
+            for (i, traffictype) in enumerate(['Metros',
+                                               'Buses',
+                                               'Trains',
+                                               'Trams',
+                                               'Ships']):
+
+                for (idx, value) in enumerate(
+                        departuredata[traffictype]):
+                    direction = value['JourneyDirection'] or 0
+                    displaytime = value['DisplayTime'] or ''
+                    destination = value['Destination'] or ''
+                    linenumber = value['LineNumber'] or ''
+                    expected = value['ExpectedDateTime'] or ''
+                    groupofline = value['GroupOfLine'] or ''
+                    icon = RI4_ICONS.get(traffictype, 'mdi:train-car')
+                    diff = self.parseDepartureTime(displaytime)
+                    departures.append(HASLDeparture(
+                        line=linenumber,
+                        direction=direction,
+                        departure=displaytime,
+                        destination=destination,
+                        time=diff,
+                        expected=datetime.strptime(
+                            expected, '%Y-%m-%dT%H:%M:%S'
+                        ),
+                        type=traffictype,
+                        groupofline=groupofline,
+                        icon=icon,
+                        journey=value.get('JourneyNumber'),
+                    ))
+
+            if previous is not None:
+                changes = board_changes(previous, departures)
+            sort_board(newdata, departures)
+            newdata['attribution'] = "Stockholms Lokaltrafik"
+            newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
+            newdata['api_result'] = "Success"
+            logger.debug(f"[process_ri4] Stop {stop} updated successfully")
+        except Exception as e:
+            newdata['api_result'] = "Error"
+            newdata['api_error'] = str(e)
+            logger.debug(f"[process_ri4] Error occurred during update {stop}")
+
+        newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
+        self.notify("ri4", stop, changes)
+        logger.debug(f"[process_ri4] Completed stop {stop}")
 
-    async def assert_tl2(self, key):
+    async def assert_tl2(self, key, owner=None):
         logger.debug("[assert_tl2] Entered")
 
+        self.data.tl2keys.add(key, key)
         if key not in self.data.tl2:
             logger.debug("[assert_tl2] Registering key")
-            self.data.tl2[key] = {
+            self.data.tl2[key] = self.restored("tl2", key) or {
                 "api_type": "slapi-tl2",
                 "api_lastrun": '1970-01-01 01:01:01',
                 "api_result": "Pending"
@@ -947,68 +1265,69 @@ class HaslWorker(object):
         else:
             logger.debug("[assert_tl2] Key already present")
 
+        self.instances.claim(owner, ("tl2", key, key))
         logger.debug("[assert_tl2] Completed")
         return
 
     async def process_tl2(self, notarealarg=None):
         logger.debug("[process_tl2] Entered")
 
-        for tl2key in list(self.data.tl2):
-            logger.debug(f"[process_tl2] Processing {tl2key}")
+        client = await self.async_get_client()
+        await gather_logged([self._process_tl2_key(client, tl2key) for tl2key in list(self.data.tl2)])
+        logger.debug("[process_tl2] Completed")
+        return
 
-            newdata = self.data.tl2[tl2key]
+    async def refresh_tl2(self, key):
+        """Refresh the traffic status for a single key."""
+        logger.debug(f"[refresh_tl2] Refreshing {key}")
+        client = await self.async_get_client()
+        await self._process_tl2_key(client, key)
 
-            statuses = {
-                'EventGood': 'Good',
-                'EventMinor': 'Minor',
-                'EventMajor': 'Closed',
-                'EventPlanned': 'Planned',
-            }
+    async def _process_tl2_key(self, client, tl2key):
+        logger.debug(f"[process_tl2] Processing {tl2key}")
 
-            # Icon table used for HomeAssistant.
-            statusIcons = {
-                'EventGood': 'mdi:check',
-                'EventMinor': 'mdi:clock-alert-outline',
-                'EventMajor': 'mdi:close',
-                'EventPlanned': 'mdi:triangle-outline'
-            }
+        newdata = self.data.tl2[tl2key]
+        changed = True
 
-            try:
-
-                api = slapi_tl2(tl2key)
+        try:
+            # The traffic status rarely changes, skip parsing when the response is the same as last time
+            api = slapi_tl2(tl2key, client=client, conditional=newdata['api_result'] == "Success",
+                            key=("tl2", tl2key, tl2key))
+            async with self.apislot("tl2", tl2key):
                 apidata = await api.request()
-                apidata = apidata['ResponseData']['TrafficTypes']
-
-                responselist = {}
-                for response in apidata:
-                    statustype = ('ferry' if response['Type'] == 'fer' else response['Type'])
-
-                    for event in response['Events']:
-                        event['Status'] = statuses.get(event['StatusIcon'])
-                        event['StatusIcon'] = \
-                            statusIcons.get(event['StatusIcon'])
-
-                    responsedata = {
-                        'status': statuses.get(response['StatusIcon']),
-                        'status_icon': statusIcons.get(response['StatusIcon']),
-                        'events': response['Events']
-                    }
-                    responselist[statustype] = responsedata
-
-                # Attribution and update sensor data.
-                newdata['data'] = responselist
-                newdata['attribution'] = "Stockholms Lokaltrafik"
-                newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
-                newdata['api_result'] = "Success"
-                logger.debug(f"[process_tl2] Update of {tl2key} succeeded")
-            except Exception as e:
-                newdata['api_result'] = "Error"
-                newdata['api_error'] = str(e)
-                logger.debug(f"[process_tl2] Update of {tl2key} failed")
-
-            newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
-            self.data.tl2[tl2key] = newdata
-            logger.debug(f"[process_tl2] Completed {tl2key}")
-
-        logger.debug("[process_tl2] Completed")
-        return
+            apidata = apidata['ResponseData']['TrafficTypes']
+
+            responselist = {}
+            for response in apidata:
+                statustype = ('ferry' if response['Type'] == 'fer' else response['Type'])
+
+                for event in response['Events']:
+                    event['Status'] = TL2_STATUSES.get(event['StatusIcon'])
+                    event['StatusIcon'] = \
+                        TL2_STATUS_ICONS.get(event['StatusIcon'])
+
+                responsedata = {
+                    'status': TL2_STATUSES.get(response['StatusIcon']),
+                    'status_icon': TL2_STATUS_ICONS.get(response['StatusIcon']),
+                    'events': response['Events']
+                }
+                responselist[statustype] = responsedata
+
+            # Attribution and update sensor data.
+            newdata['data'] = responselist
+            newdata['attribution'] = "Stockholms Lokaltrafik"
+            newdata['last_updated'] = now().strftime('%Y-%m-%d %H:%M:%S')
+            newdata['api_result'] = "Success"
+            logger.debug(f"[process_tl2] Update of {tl2key} succeeded")
+        except SLAPI_Not_Modified:
+            changed = False
+            logger.debug(f"[process_tl2] {tl2key} is unchanged")
+        except Exception as e:
+            newdata['api_result'] = "Error"
+            newdata['api_error'] = str(e)
+            logger.debug(f"[process_tl2] Update of {tl2key} failed")
+
+        newdata['api_lastrun'] = now().strftime('%Y-%m-%d %H:%M:%S')
+        if changed:
+            self.notify("tl2", tl2key)
+        logger.debug(f"[process_tl2] Completed {tl2key}")
@@ -0,0 +1,44 @@
+import json
+
+
+def item_size(item):
+    """Bytes an attribute item takes when serialized, roughly as the recorder stores it."""
+    return len(json.dumps(item, default=str, separators=(',', ':')))
+
+
+class HASLAttributeBudget(object):
+    """Caps on the lists (departures, trips, ...) exported as sensor attributes.
+
+    Every state write puts the attributes on the event bus and in the recorder, so
+    large boards are cut to at most max_items and max_bytes, keeping only the
+    configured fields of each item. A cap of 0 means no limit. The full data is
+    still available through the get_sensor_data service.
+    """
+
+    def __init__(self, max_items=0, max_bytes=0, fields=None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.fields = {listtype: tuple(names) for (listtype, names) in (fields or {}).items() if names}
+
+    def apply(self, listtype, items):
+        """The items within budget and whether any were cut."""
+        names = self.fields.get(listtype)
+        if names:
+            items = [{name: item[name] for name in names if name in item} for item in items]
+
+        truncated = False
+        if self.max_items and len(items) > self.max_items:
+            items = items[:self.max_items]
+            truncated = True
+
+        if self.max_bytes:
+            # Two bytes for the brackets, one for each separating comma
+            used = 2
+            for (count, item) in enumerate(items):
+                used += item_size(item) + (1 if count else 0)
+                if used > self.max_bytes:
+                    items = items[:count]
+                    truncated = True
+                    break
+
+        return (items, truncated)
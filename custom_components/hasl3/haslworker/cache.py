@@ -0,0 +1,102 @@
+import logging
+
+from datetime import datetime
+from homeassistant.helpers.storage import Store
+
+from custom_components.hasl3.const import (
+    STORAGE_KEY,
+    STORAGE_VERSION,
+    STORAGE_SAVE_DELAY
+)
+
+from .records import (
+    HASLDeparture,
+    HASLArrival,
+    sort_board
+)
+
+logger = logging.getLogger("custom_components.hasl3.worker.cache")
+
+# The stores of HASLData that are cached.
+CACHED_STORES = ('ri4', 'si2', 'tl2', 'rp3', 'rrd', 'rra', 'rrr', 'fp')
+
+# Boards of records, with the record fields holding timestamps.
+CACHED_BOARDS = {
+    'ri4': (HASLDeparture, ('expected',)),
+    'rrd': (HASLDeparture, ('departure', 'expected')),
+    'rra': (HASLArrival, ('arrival', 'expected')),
+}
+
+# Kept on the boards but derived from other data, so not worth saving.
+DERIVED_FIELDS = ('expected', 'deviations')
+
+
+def snapshot_record(record, timestamps):
+    state = record.as_dict()
+    for field in timestamps:
+        if isinstance(state.get(field), datetime):
+            state[field] = state[field].isoformat()
+    return state
+
+
+def restore_record(recordtype, state, timestamps):
+    for field in timestamps:
+        if state.get(field) is not None:
+            state[field] = datetime.fromisoformat(state[field])
+    return recordtype(**state)
+
+
+def snapshot(data):
+    """The successful results in HASLData as plain JSON types."""
+    result = {}
+    for apitype in CACHED_STORES:
+        targets = {}
+        for (targetid, state) in getattr(data, apitype).items():
+            if state.get('api_result') != "Success":
+                continue
+
+            state = {field: value for (field, value) in state.items() if field not in DERIVED_FIELDS}
+            if apitype in CACHED_BOARDS:
+                timestamps = CACHED_BOARDS[apitype][1]
+                state['data'] = [snapshot_record(record, timestamps) for record in state.get('data', [])]
+            targets[targetid] = state
+        result[apitype] = targets
+    return result
+
+
+class HASLCache(object):
+    """Last-known results of every target, kept in .storage for warm restarts.
+
+    Saves are debounced by the Store helper. Restored results are handed out to the
+    worker asserts one target at a time, so targets no longer configured stay gone.
+    """
+
+    def __init__(self, hass):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._restored = {}
+
+    async def async_load(self):
+        try:
+            self._restored = await self._store.async_load() or {}
+        except Exception as e:
+            logger.warning(f"[cache] Could not load cached data: {str(e)}")
+            self._restored = {}
+        logger.debug(f"[cache] Loaded {sum(len(targets) for targets in self._restored.values())} cached targets")
+
+    def restore(self, apitype, targetid):
+        """The cached data of a target, or None."""
+        state = self._restored.get(apitype, {}).pop(targetid, None)
+        if state is None or apitype not in CACHED_BOARDS:
+            return state
+
+        (recordtype, timestamps) = CACHED_BOARDS[apitype]
+        try:
+            records = [restore_record(recordtype, record, timestamps) for record in state.get('data', [])]
+        except (TypeError, ValueError) as e:
+            logger.debug(f"[cache] Ignoring cached {apitype} {targetid}: {str(e)}")
+            return None
+        sort_board(state, records)
+        return state
+
+    def schedule_save(self, data):
+        self._store.async_delay_save(lambda: snapshot(data), STORAGE_SAVE_DELAY)
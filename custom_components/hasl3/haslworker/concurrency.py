@@ -0,0 +1,52 @@
+import asyncio
+import logging
+
+from contextlib import asynccontextmanager
+
+from custom_components.hasl3.const import (
+    DEFAULT_MAX_CONCURRENT_PER_API,
+    DEFAULT_MAX_CONCURRENT_PER_KEY
+)
+
+logger = logging.getLogger("custom_components.hasl3.worker.concurrency")
+
+
+class HASLConcurrency(object):
+    """Bounds the number of in-flight requests per API type and per API key."""
+
+    def __init__(self,
+                 per_api=DEFAULT_MAX_CONCURRENT_PER_API,
+                 per_key=DEFAULT_MAX_CONCURRENT_PER_KEY):
+        self._per_api = per_api
+        self._per_key = per_key
+        self._api_semaphores = {}
+        self._key_semaphores = {}
+
+    def _get_semaphore(self, store, name, limit):
+        if name not in store:
+            store[name] = asyncio.Semaphore(limit)
+        return store[name]
+
+    @asynccontextmanager
+    async def slot(self, apitype, key):
+        """Wait for a free slot for both the API type and the API key."""
+        apisem = self._get_semaphore(self._api_semaphores, apitype, self._per_api)
+        keysem = self._get_semaphore(self._key_semaphores, (apitype, key), self._per_key)
+
+        # Always acquire in the same order (api, then key) to avoid deadlocks
+        async with apisem:
+            async with keysem:
+                yield
+
+
+async def gather_logged(tasks):
+    """Run per-target coroutines concurrently, logging anything they let escape.
+
+    This does not bound anything itself, the refreshes are limited per API type and
+    key by HASLConcurrency.slot, which every API call goes through, see apislot.
+    """
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error(f"[gather_logged] Unhandled error in refresh: {str(result)}")
+    return results
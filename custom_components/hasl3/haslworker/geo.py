@@ -0,0 +1,143 @@
+import math
+
+from custom_components.hasl3.const import (
+    CONF_FP_LATITUDE,
+    CONF_FP_LONGITUDE,
+    CONF_FP_RADIUS,
+    CONF_LINES
+)
+
+EARTH_RADIUS = 6371000
+
+# Grid cell size in degrees, roughly 1.1 km north-south and 0.6 km east-west around Stockholm.
+GRID_CELL = 0.01
+
+# Areas covering more cells than this are tested for every vehicle instead of indexed.
+MAX_GRID_CELLS = 10000
+
+
+def trip_position(trip):
+    try:
+        return (float(trip['Latitude']), float(trip['Longitude']))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def trip_line(trip):
+    # Accept both spellings of the line field
+    return str(trip.get('LineNumber', trip.get('Line', '')))
+
+
+def distance(lat1, lon1, lat2, lon2):
+    """Great circle distance in meters."""
+    (phi1, phi2) = (math.radians(lat1), math.radians(lat2))
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def grid_cell(lat, lon):
+    return (math.floor(lat / GRID_CELL), math.floor(lon / GRID_CELL))
+
+
+class HASLArea(object):
+    """The part of a fleet a vehicle location sensor follows.
+
+    Vehicles within radius meters of a point and on one of the lines. A radius of 0
+    means any position and no lines means any line, so the default is the whole fleet.
+    """
+
+    __slots__ = ('latitude', 'longitude', 'radius', 'lines', 'key', 'bounds')
+
+    def __init__(self, latitude=0, longitude=0, radius=0, lines=()):
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
+        self.radius = max(0, float(radius))
+        self.lines = frozenset(line.strip() for line in map(str, lines) if line.strip())
+        self.key = f"{self.latitude:.5f},{self.longitude:.5f},{self.radius:.0f},{'|'.join(sorted(self.lines))}"
+
+        if self.radius > 0:
+            # Bounding box of the circle, used to rule out vehicles before measuring
+            dlat = math.degrees(self.radius / EARTH_RADIUS)
+            dlon = dlat / max(math.cos(math.radians(self.latitude)), 0.01)
+            self.bounds = (self.latitude - dlat, self.longitude - dlon, self.latitude + dlat, self.longitude + dlon)
+        else:
+            self.bounds = None
+
+    def __eq__(self, other):
+        return isinstance(other, HASLArea) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"HASLArea({self.key})"
+
+    def contains(self, trip, position=None):
+        if self.lines and trip_line(trip) not in self.lines:
+            return False
+        if self.bounds is None:
+            return True
+
+        position = position or trip_position(trip)
+        if position is None:
+            return False
+
+        (lat, lon) = position
+        (south, west, north, east) = self.bounds
+        if not (south <= lat <= north and west <= lon <= east):
+            return False
+        return distance(self.latitude, self.longitude, lat, lon) <= self.radius
+
+    def cells(self):
+        """The grid cells overlapping the bounding box, None if there are too many to index."""
+        if self.bounds is None:
+            return None
+
+        (south, west, north, east) = self.bounds
+        (row1, col1) = grid_cell(south, west)
+        (row2, col2) = grid_cell(north, east)
+        if (row2 - row1 + 1) * (col2 - col1 + 1) > MAX_GRID_CELLS:
+            return None
+        return [(row, col) for row in range(row1, row2 + 1) for col in range(col1, col2 + 1)]
+
+
+def area_from_config(data):
+    """The area configured for a vehicle location entry."""
+    return HASLArea(
+        latitude=data.get(CONF_FP_LATITUDE) or 0,
+        longitude=data.get(CONF_FP_LONGITUDE) or 0,
+        radius=data.get(CONF_FP_RADIUS) or 0,
+        lines=(data.get(CONF_LINES) or '').split(',')
+    )
+
+
+class HASLAreaIndex(object):
+    """Grid index over the areas followed for a vehicle type.
+
+    Built for every refresh, it finds the areas a vehicle is in by looking up its grid
+    cell instead of testing the vehicle against every area.
+    """
+
+    def __init__(self, areas):
+        self._grid = {}
+        self._unindexed = []
+        for area in areas:
+            cells = area.cells()
+            if cells is None:
+                self._unindexed.append(area)
+                continue
+            for cell in cells:
+                self._grid.setdefault(cell, []).append(area)
+
+    def match(self, trip):
+        """The areas trip is in."""
+        areas = [area for area in self._unindexed if area.contains(trip)]
+        if self._grid:
+            position = trip_position(trip)
+            if position is not None:
+                for area in self._grid.get(grid_cell(*position), ()):
+                    if area.contains(trip, position):
+                        areas.append(area)
+        return areas
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import logging
+import importlib.util
+import re
+import httpx
+
+from custom_components.hasl3.const import (
+    DEFAULT_HTTP_MAX_CONNECTIONS,
+    DEFAULT_HTTP_MAX_KEEPALIVE,
+    DEFAULT_HTTP_KEEPALIVE_EXPIRY,
+    DEFAULT_HTTP_TIMEOUT,
+    DEFAULT_HTTP2,
+    DEFAULT_HTTP_RETRIES,
+    DEFAULT_HTTP_BACKOFF,
+    DEFAULT_HTTP_BACKOFF_MAX,
+    DEFAULT_CIRCUIT_THRESHOLD,
+    DEFAULT_CIRCUIT_COOLDOWN
+)
+
+from .stats import (
+    count_bytes,
+    share_call
+)
+from .retry import (
+    RETRY_STATUSES,
+    HASLCircuitBreaker,
+    backoff_delay
+)
+
+logger = logging.getLogger("custom_components.hasl3.worker.http")
+
+# Members of an SL response that change on every call although the payload does not.
+_volatile = re.compile(rb'"ExecutionTime"\s*:\s*[-+.\deE]*')
+
+
+def payload_digest(content):
+    """Hash of a response body, leaving out the members that change on every call."""
+    return hashlib.blake2b(_volatile.sub(b'', content), digest_size=16).digest()
+
+
+async def fetch(client, url, timeout, user_agent, key=None, conditional=False):
+    """GET using the shared client if one was given, else a one-shot client."""
+    if client is not None:
+        return await client.get(url,
+                                headers={"User-agent": user_agent},
+                                follow_redirects=True,
+                                timeout=timeout,
+                                key=key,
+                                conditional=conditional)
+
+    async with httpx.AsyncClient() as client:
+        return await client.get(url,
+                                headers={"User-agent": user_agent},
+                                follow_redirects=True,
+                                timeout=timeout)
+
+
+class HASLHttpClient(object):
+    """Long-lived pooled HTTP client shared by all API calls of the worker."""
+
+    def __init__(self,
+                 max_connections=DEFAULT_HTTP_MAX_CONNECTIONS,
+                 max_keepalive=DEFAULT_HTTP_MAX_KEEPALIVE,
+                 keepalive_expiry=DEFAULT_HTTP_KEEPALIVE_EXPIRY,
+                 timeout=DEFAULT_HTTP_TIMEOUT,
+                 http2=DEFAULT_HTTP2,
+                 retries=DEFAULT_HTTP_RETRIES,
+                 backoff=DEFAULT_HTTP_BACKOFF,
+                 backoff_max=DEFAULT_HTTP_BACKOFF_MAX,
+                 circuit_threshold=DEFAULT_CIRCUIT_THRESHOLD,
+                 circuit_cooldown=DEFAULT_CIRCUIT_COOLDOWN):
+
+        # HTTP/2 needs the optional h2 package, fall back to HTTP/1.1 keep-alive
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.debug("[http_client] h2 is not installed, using HTTP/1.1")
+
+        self._inflight = {}
+        self._validators = {}
+        self._retries = retries
+        self._backoff = backoff
+        self._backoff_max = backoff_max
+        self.breaker = HASLCircuitBreaker(circuit_threshold, circuit_cooldown)
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive,
+                                keepalive_expiry=keepalive_expiry)
+        )
+
+    @property
+    def is_closed(self):
+        return self._client.is_closed
+
+    async def get(self, url, headers=None, follow_redirects=True, timeout=None, key=None, conditional=False):
+        """GET an URL, sharing the response with identical requests already in flight.
+
+        Callers asking for the same key (defaults to the full URL, i.e. API, key and
+        parameters) while a request is outstanding await that request instead of
+        issuing their own. Each caller gets the same response and parses it itself,
+        and joining callers mark their API call as shared, see share_call.
+
+        Conditional requests return a 304 response when the payload is the same as
+        the last one fetched for the key, see _conditional_get.
+        """
+        key = key or url
+        flightkey = (key, conditional)
+
+        inflight = self._inflight.get(flightkey)
+        if inflight is not None:
+            logger.debug("[http_client] Joining in-flight request")
+            share_call()
+            return await asyncio.shield(inflight)
+
+        inflight = asyncio.ensure_future(self._conditional_get(url, headers, follow_redirects, timeout, key, conditional))
+        self._inflight[flightkey] = inflight
+        inflight.add_done_callback(lambda future: self._request_done(flightkey, future))
+        return await asyncio.shield(inflight)
+
+    def _request_done(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the outcome as retrieved in case every waiter was cancelled
+        if not future.cancelled():
+            future.exception()
+
+    async def _conditional_get(self, url, headers, follow_redirects, timeout, key, conditional):
+        """GET, remembering the validators of the response for the key of conditional requests.
+
+        Conditional requests send If-None-Match/If-Modified-Since when the API gave
+        an ETag or Last-Modified, and otherwise compare a hash of the body with the
+        last one, see payload_digest, so unchanged payloads come back as 304 either way.
+        """
+        validators = self._validators.get(key) if conditional else None
+
+        if validators is not None:
+            headers = dict(headers or {})
+            if validators['etag']:
+                headers['If-None-Match'] = validators['etag']
+            if validators['last_modified']:
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        resp = await self._get(url, headers, follow_redirects, timeout)
+        count_bytes(len(resp.content))
+
+        if resp.status_code != 200 or not conditional:
+            return resp
+
+        digest = payload_digest(resp.content)
+        self._validators[key] = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'digest': digest
+        }
+
+        if validators is not None and validators['digest'] == digest:
+            logger.debug("[http_client] Response body unchanged")
+            return httpx.Response(304, headers=resp.headers, request=resp.request)
+
+        return resp
+
+    def forget(self, key):
+        """Drop the validators remembered for a key, e.g. when its target is released."""
+        self._validators.pop(key, None)
+
+    async def _get(self, url, headers, follow_redirects, timeout):
+        """GET with retries on timeouts, dropped connections and 5xx responses.
+
+        API level errors come back as normal responses and are never retried. Once a
+        host has failed repeatedly its circuit opens and requests fail at once.
+        """
+        host = httpx.URL(url).host
+        self.breaker.check(host)
+
+        try:
+            return await self._attempts(host, url, headers, follow_redirects, timeout)
+        except asyncio.CancelledError:
+            self.breaker.abandoned(host)
+            raise
+
+    async def _attempts(self, host, url, headers, follow_redirects, timeout):
+        attempt = 0
+        while True:
+            try:
+                resp = await self._send(url, headers, follow_redirects, timeout)
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                if attempt >= self._retries:
+                    self.breaker.failure(host)
+                    raise
+                logger.debug(f"[http_client] Attempt {attempt + 1} to {host} failed: {type(e).__name__}")
+            except Exception:
+                # Not worth retrying, e.g. too many redirects or an undecodable response
+                self.breaker.failure(host)
+                raise
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    self.breaker.success(host)
+                    return resp
+                if attempt >= self._retries:
+                    self.breaker.failure(host)
+                    return resp
+                logger.debug(f"[http_client] Attempt {attempt + 1} to {host} returned {resp.status_code}")
+
+            await asyncio.sleep(backoff_delay(attempt, self._backoff, self._backoff_max))
+            attempt += 1
+
+    async def _send(self, url, headers, follow_redirects, timeout):
+        if timeout is None:
+            return await self._client.get(url,
+                                          headers=headers,
+                                          follow_redirects=follow_redirects)
+        return await self._client.get(url,
+                                      headers=headers,
+                                      follow_redirects=follow_redirects,
+                                      timeout=timeout)
+
+    async def aclose(self):
+        if not self._client.is_closed:
+            await self._client.aclose()
+            logger.debug("[http_client] Closed")
@@ -0,0 +1,98 @@
+# The list under which each store keeps the items of a target.
+ITEM_FIELDS = {
+    'rp3': 'trips',
+    'rrr': 'trips',
+}
+
+# Approximate bytes held by the state of a target and by each of its items, measured by
+# walking typical states (benchmarks/stub_server.py payloads) with sys.getsizeof. Trips
+# are sized by their legs and stops, which make up most of them.
+TARGET_BYTES = 550
+ITEM_BYTES = {
+    'ri4': 265,
+    'rrd': 290,
+    'rra': 270,
+    'si2': 850,
+    'tl2': 980,
+    'fp': 1000,
+}
+LEG_BYTES = 1250
+STOP_BYTES = 560
+
+
+def count_items(apitype, state):
+    items = state.get(ITEM_FIELDS.get(apitype, 'data'))
+    if isinstance(items, (list, dict)):
+        return len(items)
+    return 0
+
+
+def approximate_size(apitype, state, items):
+    """Approximate bytes held by the state of a target, without walking its data."""
+    if apitype not in ITEM_FIELDS:
+        return TARGET_BYTES + items * ITEM_BYTES.get(apitype, 0)
+
+    legs = 0
+    stops = 0
+    for trip in state.get('trips') or ():
+        for leg in trip.get('legs') or ():
+            legs += 1
+            stops += len(leg.get('stops') or ())
+    return TARGET_BYTES + legs * LEG_BYTES + stops * STOP_BYTES
+
+
+class HASLMemory(object):
+    """Approximate memory held by the stores of HASLData, kept up to date per target.
+
+    The size of a target is estimated from its item count when the worker writes its
+    data, and the totals per store are kept running, so reading them, e.g. for system
+    health, costs nothing however large the stores are.
+    """
+
+    def __init__(self):
+        self._targets = {}
+        self._stores = {}
+
+    def update(self, apitype, targetid, state):
+        """Account for the data just written for a target."""
+        self.remove(apitype, targetid)
+        if state is None:
+            return
+
+        items = count_items(apitype, state)
+        size = approximate_size(apitype, state, items)
+        self._targets[(apitype, targetid)] = (size, items)
+        store = self._stores.setdefault(apitype, [0, 0, 0])
+        store[0] += size
+        store[1] += items
+        store[2] += 1
+
+    def remove(self, apitype, targetid):
+        """Stop accounting for a target whose data was dropped."""
+        previous = self._targets.pop((apitype, targetid), None)
+        if previous is None:
+            return
+
+        store = self._stores[apitype]
+        store[0] -= previous[0]
+        store[1] -= previous[1]
+        store[2] -= 1
+        if store[2] == 0:
+            del self._stores[apitype]
+
+    def total(self):
+        return sum(store[0] for store in self._stores.values())
+
+    def status(self):
+        """Size per store, for system health."""
+        return {
+            f"Memory {apitype}": f"{targets} targets, {items} items, {size} bytes"
+            for (apitype, (size, items, targets)) in sorted(self._stores.items())
+        }
+
+    def dump(self):
+        """Size and items per target."""
+        result = {}
+        for ((apitype, targetid), (size, items)) in self._targets.items():
+            result.setdefault(apitype, {})[targetid] = {'bytes': size, 'items': items}
+        return result
@@ -0,0 +1,124 @@
+import cProfile
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger("custom_components.hasl3.worker.profiler")
+
+PROFILE_SAMPLE = 'sample'
+PROFILE_CPROFILE = 'cprofile'
+PROFILE_MODES = [PROFILE_SAMPLE, PROFILE_CPROFILE]
+
+# Longest profiling session and sampling interval range allowed, keeping the overhead bounded.
+PROFILE_MAX_DURATION = 600
+PROFILE_MIN_INTERVAL = 0.001
+PROFILE_MAX_INTERVAL = 1
+
+# Module prefix of the frames that make a sample part of a refresh.
+WORKER_MODULES = "custom_components.hasl3"
+
+
+def frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def collapse(frame):
+    """The stack of a frame, outermost first, as names joined by semicolons."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+class HASLSampler(object):
+    """Sampling profiler for the event loop thread.
+
+    A daemon thread looks at the stack of the loop thread every interval seconds and
+    counts the distinct stacks, in collapsed-stack format for flame graph tools. The
+    loop thread itself does no extra work, so the overhead stays low and bounded by
+    the interval. With worker_only, only stacks inside the integration are kept.
+    """
+
+    def __init__(self, thread_id, interval=0.01, worker_only=True):
+        self._thread_id = thread_id
+        self._interval = min(max(PROFILE_MIN_INTERVAL, interval), PROFILE_MAX_INTERVAL)
+        self._worker_only = worker_only
+        self._stop = threading.Event()
+        self._thread = None
+        self.stacks = {}
+        self.samples = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="hasl3-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Tell the sampling thread to stop, without waiting for it."""
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            stack = collapse(frame)
+            del frame
+            if self._worker_only and WORKER_MODULES not in stack:
+                continue
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def write(self, path):
+        # Let a sample still being taken finish before reading the stacks
+        if self._thread is not None:
+            self._thread.join()
+        with open(path, 'w') as output:
+            for (stack, count) in sorted(self.stacks.items(), key=lambda item: -item[1]):
+                output.write(f"{stack} {count}\n")
+
+
+class HASLProfiler(object):
+    """A profiling session of the event loop thread, for one of PROFILE_MODES.
+
+    Start and stop it from the event loop, neither blocks. The result is written by
+    write(), which waits for the sampling thread and does file I/O, so it belongs in
+    the executor.
+    """
+
+    def __init__(self, mode=PROFILE_SAMPLE, interval=0.01, worker_only=True):
+        self.mode = mode
+        self._interval = interval
+        self._worker_only = worker_only
+        self._session = None
+        self._started = None
+        self.elapsed = 0
+
+    def start(self):
+        self._started = time.monotonic()
+        if self.mode == PROFILE_CPROFILE:
+            self._session = cProfile.Profile()
+            self._session.enable()
+        else:
+            self._session = HASLSampler(threading.get_ident(), self._interval, self._worker_only)
+            self._session.start()
+        logger.debug(f"[profiler] Started {self.mode} profiling")
+
+    def stop(self):
+        if self.mode == PROFILE_CPROFILE:
+            self._session.disable()
+        else:
+            self._session.stop()
+        self.elapsed = time.monotonic() - self._started
+        logger.debug(f"[profiler] Stopped {self.mode} profiling after {self.elapsed:.1f}s")
+
+    def extension(self):
+        return "pstats" if self.mode == PROFILE_CPROFILE else "collapsed.txt"
+
+    def write(self, path):
+        if self.mode == PROFILE_CPROFILE:
+            self._session.dump_stats(path)
+        else:
+            self._session.write(path)
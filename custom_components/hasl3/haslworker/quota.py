@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import time
+
+from homeassistant.helpers.storage import Store
+from homeassistant.util.dt import now
+
+from custom_components.hasl3.const import (
+    CONF_QUOTA_PER_MINUTE,
+    CONF_QUOTA_PER_MONTH,
+    DEFAULT_QUOTA,
+    QUOTA_STORAGE_KEY,
+    QUOTA_STORAGE_VERSION,
+    QUOTA_STORAGE_SAVE_DELAY
+)
+
+from .retry import HASLCircuitOpen
+
+logger = logging.getLogger("custom_components.hasl3.worker.quota")
+
+# The Resrobot APIs share one key and one budget, FP needs no key and is not metered.
+QUOTA_TYPES = {
+    'ri4': 'ri4',
+    'si2': 'si2',
+    'tl2': 'tl2',
+    'rp3': 'rp3',
+    'rrd': 'rr',
+    'rra': 'rr',
+    'rrr': 'rr'
+}
+
+# SLAPI status codes for exhausted quotas.
+QUOTA_MINUTE_EXCEEDED = 1006
+QUOTA_MONTH_EXCEEDED = 1007
+
+
+class HASLQuotaExceeded(Exception):
+    """The monthly budget for an API key is spent."""
+    def __init__(self, quotatype, key):
+        self.quotatype = quotatype
+        self.key = key
+
+    def __str__(self):
+        return f"Monthly quota exhausted for {self.quotatype} key {mask_key(self.key)}"
+
+
+def mask_key(key):
+    return f"...{str(key)[-4:]}"
+
+
+def month_seconds_left():
+    """Seconds until the budgets roll over at the start of next month."""
+    rightnow = now()
+    if rightnow.month == 12:
+        rollover = rightnow.replace(year=rightnow.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    else:
+        rollover = rightnow.replace(month=rightnow.month + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    return max(1, (rollover - rightnow).total_seconds())
+
+
+class HASLTokenBucket(object):
+    """Token bucket refilled continuously at the per-minute budget."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        rightnow = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (rightnow - self.updated) * self.capacity / 60)
+        self.updated = rightnow
+
+    def take(self):
+        """Take a token, returning 0 or the seconds to wait until one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) * 60 / self.capacity
+
+    def give_back(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def drain(self):
+        self.tokens = 0
+        self.updated = time.monotonic()
+
+
+class HASLQuota(object):
+    """Per API key budgets, throttling requests per minute and planning the monthly budget.
+
+    The monthly usage can be saved and restored, see HASLQuotaStore, and listener is
+    called whenever it changes.
+    """
+
+    def __init__(self, budgets=None):
+        self._budgets = {}
+        for quotatype in DEFAULT_QUOTA:
+            self._budgets[quotatype] = {**DEFAULT_QUOTA[quotatype], **((budgets or {}).get(quotatype) or {})}
+        self._buckets = {}
+        self._usage = {}
+        self.listener = None
+
+    def _changed(self):
+        if self.listener is not None:
+            self.listener()
+
+    def snapshot(self):
+        """The monthly usage per key as plain JSON types."""
+        return [{'type': name[0], 'key': name[1], **usage} for (name, usage) in self._usage.items()]
+
+    def restore(self, snapshot):
+        """Take over the monthly usage saved by snapshot, usage of past months is dropped on use."""
+        for usage in snapshot or []:
+            try:
+                self._usage[(usage['type'], usage['key'])] = {
+                    'month': usage['month'],
+                    'used': int(usage['used']),
+                    'exhausted': bool(usage['exhausted'])
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                logger.debug(f"[restore] Ignoring saved quota usage: {str(e)}")
+
+    def name(self, apitype, key):
+        """The budget a request is counted against, None if it is not metered."""
+        quotatype = QUOTA_TYPES.get(apitype)
+        if quotatype is None or not key:
+            return None
+        return (quotatype, key)
+
+    def _bucket(self, name):
+        if name not in self._buckets:
+            self._buckets[name] = HASLTokenBucket(self._budgets[name[0]][CONF_QUOTA_PER_MINUTE])
+        return self._buckets[name]
+
+    def _month_usage(self, name):
+        month = now().strftime('%Y-%m')
+        usage = self._usage.get(name)
+        if usage is None or usage['month'] != month:
+            usage = self._usage[name] = {'month': month, 'used': 0, 'exhausted': False}
+        return usage
+
+    def remaining(self, name):
+        usage = self._month_usage(name)
+        if usage['exhausted']:
+            return 0
+        return max(0, self._budgets[name[0]][CONF_QUOTA_PER_MONTH] - usage['used'])
+
+    def available(self, apitype, key):
+        name = self.name(apitype, key)
+        return name is None or self.remaining(name) > 0
+
+    def stretch(self, name, demand):
+        """Factor to stretch refresh intervals by so that demand (requests per second) fits the rest of the month."""
+        if name is None or demand <= 0:
+            return 1
+        allowed = self.remaining(name) / month_seconds_left()
+        if allowed <= 0:
+            return 1
+        return max(1, demand / allowed)
+
+    async def acquire(self, apitype, key):
+        """Wait for a token in the per-minute budget and count the request against the month."""
+        name = self.name(apitype, key)
+        if name is None:
+            return
+
+        if self.remaining(name) <= 0:
+            raise HASLQuotaExceeded(name[0], key)
+
+        bucket = self._bucket(name)
+        delay = bucket.take()
+        while delay > 0:
+            logger.debug(f"[acquire] Per-minute quota for {name[0]} used up, waiting {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = bucket.take()
+
+        self._month_usage(name)['used'] += 1
+        self._changed()
+
+    def refund(self, apitype, key):
+        """Give back a request that was never sent, e.g. one that shared the response of another."""
+        name = self.name(apitype, key)
+        if name is None:
+            return
+
+        self._bucket(name).give_back()
+        self._month_usage(name)['used'] -= 1
+        self._changed()
+
+    def report(self, apitype, key, error):
+        """Sync the budgets with quota errors returned by the API."""
+        name = self.name(apitype, key)
+        if name is None:
+            return
+
+        if isinstance(error.__cause__, HASLCircuitOpen):
+            # The request never left, so it does not count against the budget
+            self.refund(apitype, key)
+            return
+
+        code = getattr(error, 'code', None)
+        if code == QUOTA_MINUTE_EXCEEDED:
+            logger.warning(f"[report] API reports per-minute quota exceeded for {name[0]} key {mask_key(key)}")
+            self._bucket(name).drain()
+        elif code == QUOTA_MONTH_EXCEEDED:
+            logger.warning(f"[report] API reports monthly quota exceeded for {name[0]} key {mask_key(key)}")
+            self._month_usage(name)['exhausted'] = True
+            self._changed()
+
+    def status(self, demand=None):
+        """Budget state per key, for system health."""
+        status = {}
+        for name in sorted(self._usage, key=str):
+            usage = self._month_usage(name)
+            budget = self._budgets[name[0]]
+            text = f"{usage['used']}/{budget[CONF_QUOTA_PER_MONTH]} this month"
+            if self.remaining(name) <= 0:
+                text += ", exhausted"
+            else:
+                text += f", intervals x{self.stretch(name, (demand or {}).get(name, 0)):.1f}"
+            status[f"Quota {name[0]} {mask_key(name[1])}"] = text
+        return status
+
+
+class HASLQuotaStore(object):
+    """The monthly usage of a HASLQuota, kept in .storage across restarts.
+
+    Changes are saved at most QUOTA_STORAGE_SAVE_DELAY seconds after the first one
+    since the last save. Delayed saves of the Store helper restart their delay on
+    every call, so only one is scheduled at a time, or a steady stream of requests
+    would hold the save off until Home Assistant stops.
+    """
+
+    def __init__(self, hass):
+        self._store = Store(hass, QUOTA_STORAGE_VERSION, QUOTA_STORAGE_KEY)
+        self._scheduled = False
+
+    async def async_load(self, quota):
+        """Restore the saved usage into quota and save it again whenever it changes."""
+        try:
+            quota.restore(await self._store.async_load())
+        except Exception as e:
+            logger.warning(f"[quota] Could not load saved quota usage: {str(e)}")
+        quota.listener = lambda: self._schedule_save(quota)
+
+    def _schedule_save(self, quota):
+        if self._scheduled:
+            return
+        self._scheduled = True
+        self._store.async_delay_save(lambda: self._snapshot(quota), QUOTA_STORAGE_SAVE_DELAY)
+
+    def _snapshot(self, quota):
+        self._scheduled = False
+        return quota.snapshot()
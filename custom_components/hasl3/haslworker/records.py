@@ -0,0 +1,126 @@
+from bisect import bisect_right
+from operator import attrgetter
+from sys import intern
+
+
+def _intern(value):
+    """Share the few distinct line, type, icon etc. strings between records."""
+    return intern(value) if isinstance(value, str) else value
+
+
+class HASLDeparture(object):
+    """A departure on a SL (RI4) or Resrobot departure board.
+
+    Kept as a slotted record in the worker store, sensors turn it into a dict with
+    as_dict() when exporting attributes.
+    """
+
+    __slots__ = ('line', 'direction', 'departure', 'destination', 'time',
+                 'expected', 'type', 'icon', 'groupofline', 'operator', 'journey')
+
+    def __init__(self, line, direction, departure, destination, time, expected, type, icon,
+                 groupofline=None, operator=None, journey=None):
+        self.line = _intern(line)
+        self.direction = direction
+        self.departure = _intern(departure)
+        self.destination = _intern(destination)
+        self.time = time
+        self.expected = expected
+        self.type = _intern(type)
+        self.icon = _intern(icon)
+        self.groupofline = _intern(groupofline)
+        self.operator = _intern(operator)
+        self.journey = journey
+
+    def as_dict(self):
+        result = {
+            'line': self.line,
+            'direction': self.direction,
+            'departure': self.departure,
+            'destination': self.destination,
+            'time': self.time,
+            'expected': self.expected,
+            'type': self.type,
+            'icon': self.icon,
+        }
+        if self.groupofline is not None:
+            result['groupofline'] = self.groupofline
+        if self.operator is not None:
+            result['operator'] = self.operator
+        if self.journey is not None:
+            result['journey'] = self.journey
+        return result
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+
+class HASLArrival(object):
+    """An arrival on a Resrobot arrival board."""
+
+    __slots__ = ('line', 'arrival', 'origin', 'time', 'operator',
+                 'expected', 'type', 'icon', 'journey')
+
+    def __init__(self, line, arrival, origin, time, operator, expected, type, icon, journey=None):
+        self.line = _intern(line)
+        self.arrival = arrival
+        self.origin = _intern(origin)
+        self.time = time
+        self.operator = _intern(operator)
+        self.expected = expected
+        self.type = _intern(type)
+        self.icon = _intern(icon)
+        self.journey = journey
+
+    def as_dict(self):
+        result = {
+            'line': self.line,
+            'arrival': self.arrival,
+            'origin': self.origin,
+            'time': self.time,
+            'operator': self.operator,
+            'expected': self.expected,
+            'type': self.type,
+            'icon': self.icon,
+        }
+        if self.journey is not None:
+            result['journey'] = self.journey
+        return result
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        for slot in self.__slots__:
+            setattr(self, slot, state.get(slot))
+
+
+def sort_board(newdata, records):
+    """Store records on a board sorted on expected time, with the index used by next_record."""
+    records.sort(key=attrgetter('expected'))
+    newdata['data'] = records
+    newdata['expected'] = [record.expected for record in records]
+
+
+def board_key(record):
+    """Everything a row on a board shows in the sensor attributes, line first."""
+    return tuple(getattr(record, slot) for slot in record.__slots__)
+
+
+def board_changes(previous, records):
+    """The lines with rows added, removed or changed in any field between two boards."""
+    old = {board_key(record) for record in previous}
+    new = {board_key(record) for record in records}
+    return frozenset(key[0] for key in old ^ new)
+
+
+def next_record(board, moment):
+    """The first record on a board expected after moment, in O(log n)."""
+    position = bisect_right(board['expected'], moment)
+    if position < len(board['data']):
+        return board['data'][position]
+    return None
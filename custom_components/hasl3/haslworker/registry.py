@@ -0,0 +1,50 @@
+class HASLRegistry(object):
+    """The targets (stops, lines, trips) subscribed to per API key.
+
+    Every assert adds a reference to a target, a target is only held once per key
+    however often it is asserted.
+    """
+
+    def __init__(self):
+        self._keys = {}
+
+    def add(self, key, target):
+        """Add a reference to target under key, True if the target is new to the key."""
+        targets = self._keys.setdefault(key, {})
+        targets[target] = targets.get(target, 0) + 1
+        return targets[target] == 1
+
+    def remove(self, key, target):
+        """Drop a reference to target under key, True if that was the last one."""
+        targets = self._keys.get(key)
+        if not targets or target not in targets:
+            return False
+
+        targets[target] -= 1
+        if targets[target] > 0:
+            return False
+
+        del targets[target]
+        if not targets:
+            del self._keys[key]
+        return True
+
+    def referenced(self, target):
+        """True if any key still holds a reference to target."""
+        return any(target in targets for targets in self._keys.values())
+
+    def targets(self, key):
+        return list(self._keys.get(key, ()))
+
+    def items(self):
+        """(key, targets) pairs, copied so that asserts during a refresh sweep are safe."""
+        return [(key, list(targets)) for (key, targets) in self._keys.items()]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return sum(len(targets) for targets in self._keys.values())
+
+    def dump(self):
+        return {key: dict(targets) for (key, targets) in self._keys.items()}
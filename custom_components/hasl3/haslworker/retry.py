@@ -0,0 +1,106 @@
+import logging
+import random
+import time
+
+from custom_components.hasl3.const import (
+    DEFAULT_HTTP_BACKOFF,
+    DEFAULT_HTTP_BACKOFF_MAX,
+    DEFAULT_CIRCUIT_THRESHOLD,
+    DEFAULT_CIRCUIT_COOLDOWN
+)
+
+logger = logging.getLogger("custom_components.hasl3.worker.retry")
+
+# HTTP statuses worth another attempt, the API answered but could not serve us right now.
+RETRY_STATUSES = (500, 502, 503, 504)
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half-open'
+
+
+class HASLCircuitOpen(Exception):
+    """Requests to a host are suspended after repeated failures."""
+    def __init__(self, host, retry_in):
+        self.host = host
+        self.retry_in = retry_in
+
+    def __str__(self):
+        return f"Circuit open for {self.host}, next attempt in {self.retry_in:.0f}s"
+
+
+def backoff_delay(attempt, base=DEFAULT_HTTP_BACKOFF, cap=DEFAULT_HTTP_BACKOFF_MAX):
+    """Exponential backoff with full jitter for the given (zero based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class HASLCircuitBreaker(object):
+    """Per host circuit breaker.
+
+    After threshold consecutive failed requests the circuit opens and requests fail
+    at once for cooldown seconds. Then a single trial request is let through, closing
+    the circuit on success or opening it again, with twice the cooldown, on failure.
+    """
+
+    def __init__(self, threshold=DEFAULT_CIRCUIT_THRESHOLD, cooldown=DEFAULT_CIRCUIT_COOLDOWN):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._hosts = {}
+
+    def _host(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = {
+                'state': CIRCUIT_CLOSED,
+                'failures': 0,
+                'opened': 0,
+                'cooldown': self._cooldown
+            }
+        return self._hosts[host]
+
+    def check(self, host):
+        """Raise HASLCircuitOpen unless a request to host may go ahead."""
+        circuit = self._host(host)
+        if circuit['state'] == CIRCUIT_CLOSED:
+            return
+
+        retry_in = circuit['opened'] + circuit['cooldown'] - time.monotonic()
+        if circuit['state'] == CIRCUIT_OPEN and retry_in <= 0:
+            logger.debug(f"[circuit_breaker] Trying {host} again")
+            circuit['state'] = CIRCUIT_HALF_OPEN
+            return
+
+        raise HASLCircuitOpen(host, max(0, retry_in))
+
+    def success(self, host):
+        circuit = self._host(host)
+        if circuit['state'] != CIRCUIT_CLOSED:
+            logger.info(f"[circuit_breaker] {host} is back, closing circuit")
+        circuit['state'] = CIRCUIT_CLOSED
+        circuit['failures'] = 0
+        circuit['cooldown'] = self._cooldown
+
+    def failure(self, host):
+        circuit = self._host(host)
+        circuit['failures'] += 1
+
+        if circuit['state'] == CIRCUIT_HALF_OPEN:
+            circuit['cooldown'] = min(circuit['cooldown'] * 2, self._cooldown * 16)
+        elif circuit['failures'] < self._threshold:
+            return
+
+        logger.warning(f"[circuit_breaker] {circuit['failures']} failed requests to {host}, pausing requests for {circuit['cooldown']}s")
+        circuit['state'] = CIRCUIT_OPEN
+        circuit['opened'] = time.monotonic()
+
+    def abandoned(self, host):
+        """A request to host ended without an outcome, e.g. it was cancelled.
+
+        A trial request of a half-open circuit is let through again at the next check.
+        """
+        circuit = self._host(host)
+        if circuit['state'] == CIRCUIT_HALF_OPEN:
+            circuit['state'] = CIRCUIT_OPEN
+            circuit['opened'] = time.monotonic() - circuit['cooldown']
+
+    def status(self):
+        return {host: circuit['state'] for (host, circuit) in self._hosts.items()}
@@ -0,0 +1,193 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from homeassistant.util.dt import now
+
+from custom_components.hasl3.const import (
+    STATE_ON
+)
+
+logger = logging.getLogger("custom_components.hasl3.worker.scheduler")
+
+
+class HASLScheduler(object):
+    """Central refresh scheduler for all targets registered by sensors.
+
+    A target is a tuple of (api type, api key, target id), e.g. ("ri4", key, "9192")
+    or ("si2", key, "line_17"). Each sensor registers its target together with its
+    scan interval and optional enable sensor, and the scheduler keeps a priority
+    queue of (next_due, target) that a single task works through. Sensors register
+    when they are added, so the first fetch of every target also happens here, in
+    the background, and not while the platforms are set up.
+
+    Intervals are stretched when the combined demand on an API key would not fit
+    the rest of its monthly quota, see HASLQuota.stretch.
+    """
+
+    def __init__(self, worker):
+        self._worker = worker
+        self._targets = {}
+        self._queue = []
+        self._sequence = itertools.count()
+        self._running = set()
+        self._demand = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            logger.debug("[scheduler] Starting")
+            self._task = self._worker.hass.loop.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            logger.debug("[scheduler] Stopping")
+            self._task.cancel()
+            self._task = None
+
+    def register(self, target, owner, interval, sensor=None):
+        """Register an owner (entity) of a target, the target is due at once."""
+        logger.debug(f"[scheduler] Registering {owner} for {target}")
+        entry = self._targets.setdefault(target, {"owners": {}, "next_due": None})
+        entry["owners"][owner] = (interval, sensor)
+        self._update_demand()
+        self._schedule(target, time.monotonic())
+
+    def unregister(self, target, owner):
+        entry = self._targets.get(target)
+        if entry is None:
+            return
+
+        logger.debug(f"[scheduler] Unregistering {owner} from {target}")
+        entry["owners"].pop(owner, None)
+        if not entry["owners"]:
+            # Queued entries for the target are skipped once it is gone
+            del self._targets[target]
+        self._update_demand()
+
+    def count(self):
+        return len(self._targets)
+
+    def target_of(self, owner):
+        """The target an owner (entity) is registered for, None if it is not registered."""
+        for (target, entry) in self._targets.items():
+            if owner in entry["owners"]:
+                return target
+        return None
+
+    def demand(self):
+        """Requests per second asked of each quota at the configured scan intervals."""
+        return self._demand
+
+    def _update_demand(self):
+        quota = self._worker.getquota()
+        demand = {}
+        for (target, entry) in self._targets.items():
+            name = quota.name(target[0], target[1])
+            if name is not None:
+                demand[name] = demand.get(name, 0) + 1 / self._base_interval(entry)
+        self._demand = demand
+
+    def _schedule(self, target, due):
+        self._targets[target]["next_due"] = due
+        heapq.heappush(self._queue, (due, next(self._sequence), target))
+        self._wakeup.set()
+
+    def _base_interval(self, entry):
+        return max(1, min(interval for (interval, sensor) in entry["owners"].values()))
+
+    def _interval(self, target, entry):
+        quota = self._worker.getquota()
+        name = quota.name(target[0], target[1])
+        return self._base_interval(entry) * quota.stretch(name, self._demand.get(name, 0))
+
+    def _enabled(self, entry):
+        for (interval, sensor) in entry["owners"].values():
+            if self._worker.checksensorstate(sensor, STATE_ON):
+                return True
+        return False
+
+    def _pending(self, target):
+        data = self._worker.gettargetdata(target)
+        return not data or data.get("api_result", "Pending") == "Pending"
+
+    def _remaining(self, target, interval):
+        """Seconds until the stored data for a target goes stale, 0 if it already is."""
+        if self._pending(target):
+            return 0
+
+        data = self._worker.gettargetdata(target)
+        try:
+            age = self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), data["api_lastrun"])
+        except Exception:
+            return 0
+
+        return max(0, interval - age)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+
+            if not self._queue:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._queue[0][0] - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            (due, sequence, target) = heapq.heappop(self._queue)
+            entry = self._targets.get(target)
+            if entry is None or entry["next_due"] != due:
+                continue
+
+            self._dispatch(target, entry)
+
+    def _dispatch(self, target, entry):
+        interval = self._interval(target, entry)
+        rightnow = time.monotonic()
+
+        if target in self._running:
+            self._schedule(target, rightnow + interval)
+            return
+
+        if not self._worker.getquota().available(target[0], target[1]):
+            logger.debug(f"[scheduler] Quota exhausted for {target}, skipping")
+            self._schedule(target, rightnow + interval)
+            return
+
+        # Targets are always fetched once, so sensors have data even with refresh disabled
+        if not self._enabled(entry) and not self._pending(target):
+            logger.debug(f"[scheduler] Refresh disabled for {target}, skipping")
+            self._schedule(target, rightnow + interval)
+            return
+
+        remaining = self._remaining(target, interval)
+        if remaining > 0:
+            logger.debug(f"[scheduler] {target} not due for another {remaining} seconds")
+            self._schedule(target, rightnow + remaining)
+            return
+
+        self._running.add(target)
+        self._worker.status.running_background_tasks = True
+        self._worker.hass.loop.create_task(self._refresh(target))
+
+    async def _refresh(self, target):
+        logger.debug(f"[scheduler] Refreshing {target}")
+        try:
+            await self._worker.refresh_target(target)
+        except Exception as e:
+            logger.error(f"[scheduler] Refresh of {target} failed: {str(e)}")
+        finally:
+            self._running.discard(target)
+            self._worker.status.running_background_tasks = bool(self._running)
+            entry = self._targets.get(target)
+            if entry is not None:
+                self._schedule(target, time.monotonic() + self._interval(target, entry))
@@ -0,0 +1,172 @@
+import bisect
+import contextvars
+import logging
+import time
+
+from contextlib import contextmanager
+from homeassistant.util.dt import now
+
+from .quota import mask_key
+from .retry import HASLCircuitOpen
+
+logger = logging.getLogger("custom_components.hasl3.worker.stats")
+
+# Upper bounds (ms) of the latency histogram buckets, growing by half each step from 5 ms to about 2 minutes.
+LATENCY_BOUNDS = [round(5 * 1.5 ** step) for step in range(26)]
+
+# The API call in progress, for the HTTP client to add the response size to or mark as shared.
+_current = contextvars.ContextVar("hasl_api_call", default=None)
+
+
+def count_bytes(size):
+    """Add the size of a response to the API call it was made for."""
+    call = _current.get()
+    if call is not None:
+        call.counters.bytes += size
+
+
+def share_call():
+    """Mark the API call in progress as sharing the response of an identical request in flight."""
+    call = _current.get()
+    if call is not None:
+        call.shared = True
+
+
+def error_code(error):
+    """The API or HTTP error code of a failed call, or the type of the exception."""
+    if isinstance(error.__cause__, HASLCircuitOpen):
+        return "circuit_open"
+    code = getattr(error, 'code', None)
+    return str(code) if code is not None else type(error).__name__
+
+
+class HASLLatencyHistogram(object):
+    """Call durations in fixed, exponentially growing buckets, so percentiles cost no sorting."""
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.total = 0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BOUNDS, seconds * 1000)] += 1
+        self.total += 1
+
+    def percentile(self, percent):
+        """Upper bound in ms of the bucket holding the percentile, None without calls."""
+        if self.total == 0:
+            return None
+        rank = self.total * percent / 100
+        seen = 0
+        for (bucket, count) in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BOUNDS[min(bucket, len(LATENCY_BOUNDS) - 1)]
+        return None
+
+
+class HASLApiCall(object):
+    """One API call of the worker, see HASLApiStats.call."""
+
+    __slots__ = ('counters', 'shared')
+
+    def __init__(self, counters):
+        self.counters = counters
+        self.shared = False
+
+
+class HASLApiCounters(object):
+    """Calls made with one API key."""
+
+    __slots__ = ('requests', 'shared', 'failures', 'errors', 'bytes', 'last_success', 'latency')
+
+    def __init__(self):
+        self.requests = 0
+        self.shared = 0
+        self.failures = 0
+        self.errors = {}
+        self.bytes = 0
+        self.last_success = None
+        self.latency = HASLLatencyHistogram()
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'shared': self.shared,
+            'errors': self.failures,
+            'error_codes': dict(self.errors),
+            'bytes': self.bytes,
+            'latency_p50': self.latency.percentile(50),
+            'latency_p95': self.latency.percentile(95),
+            'latency_p99': self.latency.percentile(99),
+            'last_success': self.last_success,
+        }
+
+
+class HASLApiStats(object):
+    """Request counts, errors, latency and response sizes per API and key.
+
+    Calls are counted by the worker around every API request, see HaslWorker.apislot.
+    Responses that were unchanged since the last call count as successful. Calls that
+    shared the response of an identical request in flight only count as shared, so
+    requests, errors and latency match the requests actually sent.
+    """
+
+    def __init__(self):
+        self._counters = {}
+
+    def counters(self, apitype, key):
+        name = (apitype, key)
+        if name not in self._counters:
+            self._counters[name] = HASLApiCounters()
+        return self._counters[name]
+
+    @contextmanager
+    def call(self, apitype, key):
+        counters = self.counters(apitype, key)
+        call = HASLApiCall(counters)
+        token = _current.set(call)
+        started = time.monotonic()
+        try:
+            yield call
+        except Exception as e:
+            if call.shared:
+                raise
+            if getattr(e, 'code', None) != 304:
+                counters.failures += 1
+                code = error_code(e)
+                counters.errors[code] = counters.errors.get(code, 0) + 1
+            else:
+                counters.last_success = now()
+            raise
+        else:
+            if not call.shared:
+                counters.last_success = now()
+        finally:
+            if call.shared:
+                counters.shared += 1
+            else:
+                counters.requests += 1
+                counters.latency.record(time.monotonic() - started)
+            _current.reset(token)
+
+    def get(self, apitype, key=None):
+        """The counters of an API key as a dict, None if no call has been made."""
+        counters = self._counters.get((apitype, key))
+        return counters.as_dict() if counters is not None else None
+
+    def status(self):
+        """Counters per API key, for system health."""
+        status = {}
+        for ((apitype, key), counters) in sorted(self._counters.items(), key=str):
+            name = f"Calls {apitype} {mask_key(key)}" if key else f"Calls {apitype}"
+            text = f"{counters.requests} requests ({counters.shared} shared), {counters.failures} errors"
+            if counters.errors:
+                text += " (" + ", ".join(f"{code}: {count}" for (code, count) in sorted(counters.errors.items())) + ")"
+            text += f", p50/p95/p99 {counters.latency.percentile(50)}/{counters.latency.percentile(95)}/{counters.latency.percentile(99)} ms"
+            text += f", {counters.bytes} bytes"
+            if counters.last_success is not None:
+                text += f", last success {counters.last_success.strftime('%Y-%m-%d %H:%M:%S')}"
+            status[name] = text
+        return status
@@ -0,0 +1,13 @@
+from datetime import date, datetime, time
+from functools import lru_cache
+
+
+@lru_cache(maxsize=32)
+def _parse_date(value):
+    # A board only spans a couple of distinct dates, so these are nearly always cached
+    return date.fromisoformat(value)
+
+
+def parse_rr_datetime(datestr, timestr):
+    """Parse a Resrobot date ("2024-03-06") and time ("12:34:00") into a naive datetime."""
+    return datetime.combine(_parse_date(datestr), time.fromisoformat(timestr))
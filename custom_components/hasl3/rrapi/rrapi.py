@@ -1,8 +1,9 @@
 import json
-import httpx
 import time
 import logging
 
+from custom_components.hasl3.haslworker.http import fetch
+
 from .exceptions import (
     RRAPI_Error,
     RRAPI_HTTP_Error,
@@ -20,10 +21,12 @@ from .const import (
 
 logger = logging.getLogger("custom_components.hasl3.rrapi")
 
+
 class rrapi(object):
 
-    def __init__(self, timeout=None):
+    def __init__(self, timeout=None, client=None):
         self._timeout = timeout
+        self._client = client
 
     def version(self):
         return __version__
@@ -31,16 +34,12 @@ class rrapi(object):
     async def _get(self, url, api):
 
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url,
-                                        headers={"User-agent": USER_AGENT},
-                                        follow_redirects=True,
-                                        timeout=self._timeout)
+            resp = await fetch(self._client, url, self._timeout, USER_AGENT)
         except Exception as e:
             error = RRAPI_HTTP_Error(997, f"A HTTP error occured ({api})", str(e))
             logger.debug(e)
             logger.error(error)
-            raise error
+            raise error from e
 
         try:
             jsonResponse = resp.json()
@@ -63,8 +62,8 @@ class rrapi(object):
 
 
 class rrapi_sl(rrapi):
-    def __init__(self, api_token, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, timeout=None, client=None):
+        super().__init__(timeout, client)
         self._api_token = api_token
 
     async def request(self, searchstring):
@@ -90,8 +89,8 @@ class rrapi_sl(rrapi):
 
 
 class rrapi_rrr(rrapi):
-    def __init__(self, api_token, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, timeout=None, client=None):
+        super().__init__(timeout, client)
         self._api_token = api_token
 
     async def request(self, origin, destination):
@@ -101,8 +100,8 @@ class rrapi_rrr(rrapi):
 
 class rrapi_rrd(rrapi):
 
-    def __init__(self, api_token, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, timeout=None, client=None):
+        super().__init__(timeout, client)
         self._api_token = api_token
 
     async def request(self, id):
@@ -111,8 +110,8 @@ class rrapi_rrd(rrapi):
 
 class rrapi_rra(rrapi):
 
-    def __init__(self, api_token, id, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, id, timeout=None, client=None):
+        super().__init__(timeout, client)
         self._api_token = api_token
 
     async def request(self, id):
@@ -1,9 +1,13 @@
 """ SL Platform Sensor """
+import hashlib
 import logging
 import math
 import datetime
 
-from homeassistant.helpers.entity import Entity
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import Entity, EntityCategory
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.util.dt import now
 
@@ -54,11 +58,33 @@ from .const import (
     CONF_SOURCE,
     CONF_DESTINATION,
     STATE_ON,
+    SIGNAL_HASL_UPDATED,
     CONF_TRANSPORT_MODE_LIST
 )
+from .haslworker.records import (
+    board_key,
+    next_record
+)
+from .haslworker.geo import area_from_config
+from .haslworker.quota import mask_key
 
 logger = logging.getLogger(f"custom_components.{DOMAIN}.sensors")
 
+# The API (and the config key holding its API key) each integration type calls, for the statistics sensors.
+API_STATS_SENSORS = {
+    SENSOR_STANDARD: ('ri4', CONF_RI4_KEY),
+    SENSOR_DEVIATION: ('si2', CONF_SI2_KEY),
+    SENSOR_ROUTE: ('rp3', CONF_RP3_KEY),
+    SENSOR_STATUS: ('tl2', CONF_TL2_KEY),
+    SENSOR_VEHICLE_LOCATION: ('fp', None),
+    SENSOR_RRDEP: ('rrd', CONF_RR_KEY),
+    SENSOR_RRARR: ('rra', CONF_RR_KEY),
+    SENSOR_RRROUTE: ('rrr', CONF_RR_KEY),
+}
+
+# Resrobot APIs, the statistics sensors of the others are named after SL.
+RR_APIS = ('rrd', 'rra', 'rrr')
+
 
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     async_add_entities(await setup_hasl_sensor(hass, config))
@@ -79,10 +105,8 @@ async def setup_hasl_sensor(hass, config):
         logger.debug("[setup_hasl_sensor] Setting up RI4 sensors...")
         if config.data[CONF_INTEGRATION_TYPE] == SENSOR_STANDARD:
             if CONF_RI4_KEY in config.data and CONF_SITE_ID in config.data:
-                await worker.assert_ri4(config.data[CONF_RI4_KEY], config.data[CONF_SITE_ID])
+                await worker.assert_ri4(config.data[CONF_RI4_KEY], config.data[CONF_SITE_ID], config.entry_id)
                 sensors.append(HASLDepartureSensor(hass, config, config.data[CONF_SITE_ID]))
-            logger.debug("[setup_hasl_sensor] Force processing RI4 sensors")
-            await worker.process_ri4()
         logger.debug("[setup_hasl_sensor] Completed setting up RI4 sensors")
     except Exception as e:
         logger.error(f"[setup_hasl_sensor] Failed to set up RI4 sensors: {str(e)}")
@@ -92,13 +116,11 @@ async def setup_hasl_sensor(hass, config):
         if config.data[CONF_INTEGRATION_TYPE] == SENSOR_DEVIATION:
             if CONF_SI2_KEY in config.data:
                 for deviationid in ','.join(set(config.data[CONF_DEVIATION_LINES].split(','))).split(','):
-                    await worker.assert_si2_line(config.data[CONF_SI2_KEY], deviationid)
+                    await worker.assert_si2_line(config.data[CONF_SI2_KEY], deviationid, config.entry_id)
                     sensors.append(HASLDeviationSensor(hass, config, CONF_DEVIATION_LINE, deviationid))
                 for deviationid in ','.join(set(config.data[CONF_DEVIATION_STOPS].split(','))).split(','):
-                    await worker.assert_si2_stop(config.data[CONF_SI2_KEY], deviationid)
+                    await worker.assert_si2_stop(config.data[CONF_SI2_KEY], deviationid, config.entry_id)
                     sensors.append(HASLDeviationSensor(hass, config, CONF_DEVIATION_STOP, deviationid))
-            logger.debug("[setup_hasl_sensor] Force processing SI2 sensors")
-            await worker.process_si2()
         logger.debug("[setup_hasl_sensor] Completed setting up SI2 sensors")
     except Exception as e:
         logger.error(f"[setup_hasl_sensor] Failed to set up SI2 sensors: {str(e)}")
@@ -107,10 +129,8 @@ async def setup_hasl_sensor(hass, config):
         logger.debug("[setup_hasl_sensor] Setting up RP3 sensors...")
         if config.data[CONF_INTEGRATION_TYPE] == SENSOR_ROUTE:
             if CONF_RP3_KEY in config.data:
-                await worker.assert_rp3(config.data[CONF_RP3_KEY], config.data[CONF_SOURCE], config.data[CONF_DESTINATION])
+                await worker.assert_rp3(config.data[CONF_RP3_KEY], config.data[CONF_SOURCE], config.data[CONF_DESTINATION], config.entry_id)
                 sensors.append(HASLRouteSensor(hass, config, f"{config.data[CONF_SOURCE]}-{config.data[CONF_DESTINATION]}"))
-            logger.debug("[setup_hasl_sensor] Force processing RP3 sensors")
-            await worker.process_rp3()
         logger.debug("[setup_hasl_sensor] Completed setting up RP3 sensors")
     except Exception as e:
         logger.error(f"[setup_hasl_sensor] Failed to set up RP3 sensors: {str(e)}")
@@ -120,14 +140,12 @@ async def setup_hasl_sensor(hass, config):
         if config.data[CONF_INTEGRATION_TYPE] == SENSOR_STATUS:
             if CONF_ANALOG_SENSORS in config.data:
                 if CONF_TL2_KEY in config.data:
-                    await worker.assert_tl2(config.data[CONF_TL2_KEY])
+                    await worker.assert_tl2(config.data[CONF_TL2_KEY], config.entry_id)
 
                     for sensortype in CONF_TRANSPORT_MODE_LIST:
                         if sensortype in config.data and config.data[sensortype]:
                             sensors.append(HASLTrafficStatusSensor(hass, config, sensortype))
 
-                logger.debug("[setup_hasl_sensor] Force processing TL2 sensors")
-                await worker.process_tl2()
         logger.debug("[setup_hasl_sensor] Completed setting up TL2 sensors")
     except Exception as e:
         logger.error(f"[setup_hasl_sensor] Failed to set up TL2 sensors: {str(e)}")
@@ -135,35 +153,34 @@ async def setup_hasl_sensor(hass, config):
     try:
         logger.debug("[setup_hasl_sensor] Setting up FP sensors...")
         if config.data[CONF_INTEGRATION_TYPE] == SENSOR_VEHICLE_LOCATION:
+            area = area_from_config(config.data)
             if CONF_FP_PT in config.data and config.data[CONF_FP_PT]:
-                await worker.assert_fp("PT")
+                await worker.assert_fp("PT", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'PT'))
             if CONF_FP_RB in config.data and config.data[CONF_FP_RB]:
-                await worker.assert_fp("RB")
+                await worker.assert_fp("RB", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'RB'))
             if CONF_FP_TVB in config.data and config.data[CONF_FP_TVB]:
-                await worker.assert_fp("TVB")
+                await worker.assert_fp("TVB", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'TVB'))
             if CONF_FP_SB in config.data and config.data[CONF_FP_SB]:
-                await worker.assert_fp("SB")
+                await worker.assert_fp("SB", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'SB'))
             if CONF_FP_LB in config.data and config.data[CONF_FP_LB]:
-                await worker.assert_fp("LB")
+                await worker.assert_fp("LB", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'LB'))
             if CONF_FP_SPVC in config.data and config.data[CONF_FP_SPVC]:
-                await worker.assert_fp("SpvC")
+                await worker.assert_fp("SpvC", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'SpvC'))
             if CONF_FP_TB1 in config.data and config.data[CONF_FP_TB1]:
-                await worker.assert_fp("TB1")
+                await worker.assert_fp("TB1", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'TB1'))
             if CONF_FP_TB2 in config.data and config.data[CONF_FP_TB2]:
-                await worker.assert_fp("TB2")
+                await worker.assert_fp("TB2", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'TB2'))
             if CONF_FP_TB2 in config.data and config.data[CONF_FP_TB2]:
-                await worker.assert_fp("TB3")
+                await worker.assert_fp("TB3", config.entry_id, area)
                 sensors.append(HASLVehicleLocationSensor(hass, config, 'TB3'))
-            logger.debug("[setup_hasl_sensor] Force processing FP sensors")
-            await worker.process_fp()
         logger.debug("[setup_hasl_sensor] Completed setting up FP sensors")
     except Exception as e:
         logger.error(f"[setup_hasl_sensor] Failed to set up FP sensors: {str(e)}")
@@ -172,10 +189,8 @@ async def setup_hasl_sensor(hass, config):
         logger.debug("[setup_hasl_sensor] Setting up RRD sensors...")
         if config.data[CONF_INTEGRATION_TYPE] == SENSOR_RRDEP:
             if CONF_RR_KEY in config.data and CONF_SITE_ID in config.data:
-                await worker.assert_rrd(config.data[CONF_RR_KEY], config.data[CONF_SITE_ID])
+                await worker.assert_rrd(config.data[CONF_RR_KEY], config.data[CONF_SITE_ID], config.entry_id)
                 sensors.append(HASLRRDepartureSensor(hass, config, config.data[CONF_SITE_ID]))
-            logger.debug("[setup_hasl_sensor] Force processing RRD sensors")
-            await worker.process_rrd()
         logger.debug("[setup_hasl_sensor] Completed setting up RRD sensors")
     except Exception as e:
         logger.error(f"[setup_hasl_sensor] Failed to set up RRD sensors: {str(e)}")
@@ -184,10 +199,8 @@ async def setup_hasl_sensor(hass, config):
         logger.debug("[setup_hasl_sensor] Setting up RRA sensors...")
         if config.data[CONF_INTEGRATION_TYPE] == SENSOR_RRARR:
             if CONF_RR_KEY in config.data and CONF_SITE_ID in config.data:
-                await worker.assert_rra(config.data[CONF_RR_KEY], config.data[CONF_SITE_ID])
+                await worker.assert_rra(config.data[CONF_RR_KEY], config.data[CONF_SITE_ID], config.entry_id)
                 sensors.append(HASLRRArrivalSensor(hass, config, config.data[CONF_SITE_ID]))
-            logger.debug("[setup_hasl_sensor] Force processing RRA sensors")
-            await worker.process_rra()
         logger.debug("[setup_hasl_sensor] Completed setting up RRA sensors")
     except Exception as e:
         logger.error(f"[setup_hasl_sensor] Failed to set up RRA sensors: {str(e)}")
@@ -196,20 +209,44 @@ async def setup_hasl_sensor(hass, config):
     logger.debug("[setup_hasl_sensor] Setting up RRR sensors...")
     if config.data[CONF_INTEGRATION_TYPE] == SENSOR_RRROUTE:
         if CONF_RR_KEY in config.data:
-            await worker.assert_rrr(config.data[CONF_RR_KEY], config.data[CONF_SOURCE_ID], config.data[CONF_DESTINATION_ID])
+            await worker.assert_rrr(config.data[CONF_RR_KEY], config.data[CONF_SOURCE_ID], config.data[CONF_DESTINATION_ID], config.entry_id)
             sensors.append(HASLRRRouteSensor(hass, config, f"{config.data[CONF_SOURCE_ID]}-{config.data[CONF_DESTINATION_ID]}"))
-        logger.debug("[setup_hasl_sensor] Force processing RRR sensors")
-        await worker.process_rrr()
     logger.debug("[setup_hasl_sensor] Completed setting up RRR sensors")
     #except Exception as e:
     #    logger.error(f"[setup_hasl_sensor] Failed to set up RRR sensors: {str(e)}")
 
+    try:
+        logger.debug("[setup_hasl_sensor] Setting up API statistics sensors...")
+        if config.data[CONF_INTEGRATION_TYPE] in API_STATS_SENSORS:
+            (apitype, keyname) = API_STATS_SENSORS[config.data[CONF_INTEGRATION_TYPE]]
+            if keyname is None or keyname in config.data:
+                key = config.data[keyname] if keyname else None
+                # Entries sharing an API key share its statistics, the first entry set up adds the sensor
+                claims = hass.data[DOMAIN].setdefault("api_stats_sensors", {})
+                if (apitype, key) not in claims:
+                    claims[(apitype, key)] = config.entry_id
+                    sensors.append(HASLApiStatsSensor(hass, config, apitype, key))
+        logger.debug("[setup_hasl_sensor] Completed setting up API statistics sensors")
+    except Exception as e:
+        logger.error(f"[setup_hasl_sensor] Failed to set up API statistics sensors: {str(e)}")
+
     logger.debug("[setup_hasl_sensor] Completed")
     return sensors
 
 
 class HASLDevice(Entity):
     """HASL Device class."""
+
+    # Sensors counting down to a departure also recalculate their state every minute
+    _clock_driven = False
+    _clock_signature = None
+
+    # Board records passing the sensor filters, exported once per board refresh
+    _view = None
+    _view_source = None
+    _view_truncated = False
+    _view_type = 'departures'
+
     @property
     def device_info(self):
         """Return device information about HASL Device."""
@@ -222,6 +259,93 @@ class HASLDevice(Entity):
             "entry_type": DeviceEntryType.SERVICE
         }
 
+    @property
+    def should_poll(self):
+        """No polling, the worker refresh scheduler pushes updates."""
+        return False
+
+    async def async_added_to_hass(self):
+        """Register the sensor target with the worker refresh scheduler."""
+        scheduler = self._worker.getscheduler()
+        (apitype, key, targetid) = self._target
+
+        self.async_on_remove(async_dispatcher_connect(self.hass, SIGNAL_HASL_UPDATED.format(apitype, targetid), self._async_target_updated))
+        if self._clock_driven:
+            self.async_on_remove(async_track_time_interval(self.hass, self._async_clock_tick, datetime.timedelta(minutes=1)))
+
+        scheduler.register(self._target, self.entity_id, self._scan_interval, self._enabled_sensor)
+        self.async_on_remove(lambda: scheduler.unregister(self._target, self.entity_id))
+        self._update_from_worker()
+
+    def filter_record(self, record):
+        return True
+
+    def follows_changes(self, changes):
+        """Whether a change to the lines in changes can show on this sensor."""
+        return True
+
+    def upcoming(self):
+        """The next departure or arrival of clock driven sensors."""
+        return None
+
+    def clock_signature(self):
+        """What the passing time can change on a clock driven sensor, its state and next record."""
+        upcoming = self.upcoming()
+        return (self.state, board_key(upcoming) if upcoming is not None else None)
+
+    def filtered_view(self):
+        """Records on the board passing filter_record, as exported in the attributes.
+
+        The worker replaces the board list on every refresh, so the view is only
+        rebuilt when the list changes and attribute reads just return it. The view
+        is cut to the attribute budget of the worker.
+        """
+        board = self._sensordata["data"]
+        if board is not self._view_source:
+            records = [record.as_dict() for record in board if self.filter_record(record)]
+            (self._view, self._view_truncated) = self._worker.getattributebudget().apply(self._view_type, records)
+            self._view_source = board
+        return self._view
+
+    def budgeted_view(self, listtype, items):
+        """The items cut to the attribute budget, rebuilt only when the list changes."""
+        if items is not self._view_source:
+            (self._view, self._view_truncated) = self._worker.getattributebudget().apply(listtype, items)
+            self._view_source = items
+        return self._view
+
+    async def async_update(self):
+        """Refresh the sensor target at once, e.g. through homeassistant.update_entity."""
+        logger.debug(f"[async_update] Refreshing {self._target}")
+        try:
+            await self._worker.refresh_target(self._target)
+        except:
+            logger.debug("[async_update] Error occurred during update")
+        self._update_from_worker()
+
+    @callback
+    def _async_target_updated(self, changes=None):
+        if changes is not None and not self.follows_changes(changes):
+            return
+        self._async_worker_updated()
+
+    @callback
+    def _async_worker_updated(self, *args):
+        self._update_from_worker()
+        self.async_write_ha_state()
+        if self._clock_driven:
+            self._clock_signature = self.clock_signature()
+
+    @callback
+    def _async_clock_tick(self, *args):
+        """Write the state once a minute, unless nothing it shows changed since the last write."""
+        self._update_from_worker()
+        signature = self.clock_signature()
+        if signature == self._clock_signature:
+            return
+        self._clock_signature = signature
+        self.async_write_ha_state()
+
 
 class HASLRouteSensor(HASLDevice):
     """HASL Train Location Sensor class."""
@@ -236,27 +360,11 @@ class HASLRouteSensor(HASLDevice):
         self._sensordata = []
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("rp3", config.data[CONF_RP3_KEY], self._trip)
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-
-        if self._worker.data.rp3[self._trip]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.rp3[self._trip]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_rp3()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
-
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.rp3[self._trip]
-        logger.debug("[async_update] Completed")
-        return
 
     @property
     def unique_id(self):
@@ -308,14 +416,15 @@ class HASLRouteSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Success"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
         val['refresh_enabled'] = self._worker.checksensorstate(self._enabled_sensor, STATE_ON)
         try:
             val['attribution'] = self._sensordata["attribution"]
-            val['trips'] = self._sensordata["trips"]
+            val['trips'] = self.budgeted_view('trips', self._sensordata["trips"])
+            val['truncated'] = self._view_truncated
             val['transfers'] = self._sensordata["transfers"]
             val['price'] = self._sensordata["price"]
             val['time'] = self._sensordata["time"]
@@ -361,27 +470,11 @@ class HASLRRRouteSensor(HASLDevice):
         self._sensordata = []
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("rrr", config.data[CONF_RR_KEY], self._trip)
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-
-        if self._worker.data.rrr[self._trip]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.rrr[self._trip]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_rrr()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
-
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.rrr[self._trip]
-        logger.debug("[async_update] Completed")
-        return
 
     @property
     def unique_id(self):
@@ -433,14 +526,15 @@ class HASLRRRouteSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Success"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
         val['refresh_enabled'] = self._worker.checksensorstate(self._enabled_sensor, STATE_ON)
         try:
             val['attribution'] = self._sensordata["attribution"]
-            val['trips'] = self._sensordata["trips"]
+            val['trips'] = self.budgeted_view('trips', self._sensordata["trips"])
+            val['truncated'] = self._view_truncated
             val['transfers'] = self._sensordata["transfers"]
             val['time'] = self._sensordata["time"]
             val['duration'] = self._sensordata["duration"]
@@ -477,6 +571,8 @@ class HASLRRRouteSensor(HASLDevice):
 class HASLDepartureSensor(HASLDevice):
     """HASL Departure Sensor class."""
 
+    _clock_driven = True
+
     def __init__(self, hass, config, siteid):
         """Initialize."""
 
@@ -503,31 +599,19 @@ class HASLDepartureSensor(HASLDevice):
         self._sensordata = None
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("ri4", config.data[CONF_RI4_KEY], self._siteid)
 
         if (self._lines==''):
             self._lines = []
         if (not isinstance(self._lines,list)):
             self._lines = self._lines.split(',')
+        self._lines = frozenset(self._lines)
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-        if self._worker.data.ri4[self._siteid]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.ri4[self._siteid]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_ri4()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
-
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.ri4[self._siteid]
 
-        logger.debug("[async_update] Performing calculations")
+        logger.debug("[update_from_worker] Performing calculations")
         if f"stop_{self._siteid}" in self._worker.data.si2:
             if "data" in self._worker.data.si2[f"stop_{self._siteid}"]:
                 self._sensordata["deviations"] = self._worker.data.si2[f"stop_{self._siteid}"]["data"]
@@ -541,9 +625,6 @@ class HASLDepartureSensor(HASLDevice):
         else:
             self._last_updated = now().strftime('%Y-%m-%d %H:%M:%S')
 
-        logger.debug("[async_update] Completed")
-        return
-
     @property
     def unique_id(self):
         """Return a unique ID to use for this sensor."""
@@ -567,7 +648,7 @@ class HASLDepartureSensor(HASLDevice):
             if not next_departure:
                 return '-'
 
-            delta = next_departure['expected'] - datetime.datetime.now()
+            delta = next_departure.expected - datetime.datetime.now()
             expected_minutes = math.floor(delta.total_seconds() / 60)
             return expected_minutes
 
@@ -577,7 +658,7 @@ class HASLDepartureSensor(HASLDevice):
             if not next_departure:
                 return '-'
 
-            expected = next_departure['expected'].strftime('%H:%M:%S')
+            expected = next_departure.expected.strftime('%H:%M:%S')
             return expected
 
         # If the sensor should return the number of deviations.
@@ -585,7 +666,7 @@ class HASLDepartureSensor(HASLDevice):
             return len(self._sensordata["deviations"])
 
         if sensorproperty == 'updated':
-            return self._sensordata["last_updated"]
+            return self._sensordata.get("last_updated", '-')
 
         # Fail-safe
         return '-'
@@ -594,22 +675,32 @@ class HASLDepartureSensor(HASLDevice):
         if not self._sensordata:
             return None
 
-        now = datetime.datetime.now()
         if "data" in self._sensordata:
-            for departure in self._sensordata["data"]:
-                if departure['expected'] > now:
-                    return departure
+            return next_record(self._sensordata, datetime.datetime.now())
         return None
 
+    def upcoming(self):
+        return self.nextDeparture()
+
+    def clock_signature(self):
+        # The deviations of the stop are refreshed separately and only picked up here
+        return (super().clock_signature(), self._sensordata["deviations"])
+
     def filter_direction(self, departure):
         if self._direction == 0:
             return True
-        return departure["direction"] == self._direction
+        return departure.direction == self._direction
 
     def filter_lines(self, departure):
         if not self._lines or len(self._lines) == 0:
             return True
-        return departure["line"] in self._lines
+        return departure.line in self._lines
+
+    def follows_changes(self, changes):
+        return not self._lines or not self._lines.isdisjoint(changes)
+
+    def filter_record(self, departure):
+        return self.filter_direction(departure) and self.filter_lines(departure)
 
     @property
     def icon(self):
@@ -648,7 +739,7 @@ class HASLDepartureSensor(HASLDevice):
         # Format the next expected time.
         next_departure = self.nextDeparture()
         if next_departure:
-            expected_time = next_departure['expected']
+            expected_time = next_departure.expected
             delta = expected_time - datetime.datetime.now()
             expected_minutes = math.floor(delta.total_seconds() / 60)
             expected_time = expected_time.strftime('%H:%M:%S')
@@ -663,7 +754,7 @@ class HASLDepartureSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Ok"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
@@ -672,13 +763,10 @@ class HASLDepartureSensor(HASLDevice):
         if val['api_result'] != "Ok":
             return val
 
-        departures = self._sensordata["data"]
-        departures = list(filter(self.filter_direction, departures))
-        departures = list(filter(self.filter_lines, departures))
-
         try:
             val['attribution'] = self._sensordata["attribution"]
-            val['departures'] = departures
+            val['departures'] = self.filtered_view()
+            val['truncated'] = self._view_truncated
             val['deviations'] = self._sensordata["deviations"]
             val['last_refresh'] = self._sensordata["last_updated"]
             val['next_departure_minutes'] = expected_minutes
@@ -693,6 +781,8 @@ class HASLDepartureSensor(HASLDevice):
 class HASLRRDepartureSensor(HASLDevice):
     """HASL Departure Sensor class."""
 
+    _clock_driven = True
+
     def __init__(self, hass, config, siteid):
         """Initialize."""
 
@@ -718,33 +808,18 @@ class HASLRRDepartureSensor(HASLDevice):
         self._sensordata = None
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("rrd", config.data[CONF_RR_KEY], self._siteid)
 
         if (self._lines==''):
             self._lines = []
         if (not isinstance(self._lines,list)):
             self._lines = self._lines.split(',')
+        self._lines = frozenset(self._lines)
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-        if self._worker.data.rrd[self._siteid]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.rrd[self._siteid]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_rrd()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
-
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.rrd[self._siteid]
 
-        logger.debug("[async_update] Completed")
-        return
-
     @property
     def unique_id(self):
         """Return a unique ID to use for this sensor."""
@@ -770,7 +845,7 @@ class HASLRRDepartureSensor(HASLDevice):
 
             adjustedDateTime = now()
             adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
-            delta = next_departure['expected'] - adjustedDateTime
+            delta = next_departure.expected - adjustedDateTime
             expected_minutes = math.floor(delta.total_seconds() / 60)
             return expected_minutes
 
@@ -780,11 +855,11 @@ class HASLRRDepartureSensor(HASLDevice):
             if not next_departure:
                 return '-'
 
-            expected = next_departure['expected'].strftime('%H:%M:%S')
+            expected = next_departure.expected.strftime('%H:%M:%S')
             return expected
 
         if sensorproperty == 'updated':
-            return self._sensordata["last_updated"]
+            return self._sensordata.get("last_updated", '-')
 
         # Fail-safe
         return '-'
@@ -793,23 +868,28 @@ class HASLRRDepartureSensor(HASLDevice):
         if not self._sensordata:
             return None
 
-        adjustedDateTime = now()
-        adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
         if "data" in self._sensordata:
-            for departure in self._sensordata["data"]:
-                if departure['expected'] > adjustedDateTime:
-                    return departure
+            return next_record(self._sensordata, now().replace(tzinfo=None))
         return None
 
+    def upcoming(self):
+        return self.nextDeparture()
+
     def filter_direction(self, departure):
         if self._direction == 0:
             return True
-        return departure["direction"] == self._direction
+        return departure.direction == self._direction
 
     def filter_lines(self, departure):
         if not self._lines or len(self._lines) == 0:
             return True
-        return departure["line"] in self._lines
+        return departure.line in self._lines
+
+    def follows_changes(self, changes):
+        return not self._lines or not self._lines.isdisjoint(changes)
+
+    def filter_record(self, departure):
+        return self.filter_direction(departure) and self.filter_lines(departure)
 
     @property
     def icon(self):
@@ -850,7 +930,7 @@ class HASLRRDepartureSensor(HASLDevice):
         if next_departure:
             adjustedDateTime = now()
             adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
-            expected_time = next_departure['expected']
+            expected_time = next_departure.expected
             delta = expected_time - adjustedDateTime
             expected_minutes = math.floor(delta.total_seconds() / 60)
             expected_time = expected_time.strftime('%H:%M:%S')
@@ -865,7 +945,7 @@ class HASLRRDepartureSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Ok"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
@@ -874,13 +954,10 @@ class HASLRRDepartureSensor(HASLDevice):
         if val['api_result'] != "Ok":
             return val
 
-        departures = self._sensordata["data"]
-        departures = list(filter(self.filter_direction, departures))
-        departures = list(filter(self.filter_lines, departures))
-
         try:
             val['attribution'] = self._sensordata["attribution"]
-            val['departures'] = departures
+            val['departures'] = self.filtered_view()
+            val['truncated'] = self._view_truncated
             val['last_refresh'] = self._sensordata["last_updated"]
             val['next_departure_minutes'] = expected_minutes
             val['next_departure_time'] = expected_time
@@ -893,6 +970,9 @@ class HASLRRDepartureSensor(HASLDevice):
 class HASLRRArrivalSensor(HASLDevice):
     """HASL Arrival Sensor class."""
 
+    _clock_driven = True
+    _view_type = 'arrivals'
+
     def __init__(self, hass, config, siteid):
         """Initialize."""
 
@@ -918,32 +998,18 @@ class HASLRRArrivalSensor(HASLDevice):
         self._sensordata = None
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("rra", config.data[CONF_RR_KEY], self._siteid)
 
         if (self._lines==''):
             self._lines = []
         if (not isinstance(self._lines,list)):
             self._lines = self._lines.split(',')
+        self._lines = frozenset(self._lines)
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-        if self._worker.data.rrd[self._siteid]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.rra[self._siteid]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_rra()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.rra[self._siteid]
 
-        logger.debug("[async_update] Completed")
-        return
-
     @property
     def unique_id(self):
         """Return a unique ID to use for this sensor."""
@@ -969,7 +1035,7 @@ class HASLRRArrivalSensor(HASLDevice):
 
             adjustedDateTime = now()
             adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
-            delta = next_arrival['expected'] - adjustedDateTime
+            delta = next_arrival.expected - adjustedDateTime
             expected_minutes = math.floor(delta.total_seconds() / 60)
             return expected_minutes
 
@@ -979,7 +1045,7 @@ class HASLRRArrivalSensor(HASLDevice):
             if not next_arrival:
                 return '-'
 
-            expected = next_arrival['expected'].strftime('%H:%M:%S')
+            expected = next_arrival.expected.strftime('%H:%M:%S')
             return expected
 
         if sensorproperty == 'origin':
@@ -987,12 +1053,12 @@ class HASLRRArrivalSensor(HASLDevice):
             if not next_arrival:
                 return '-'
 
-            origin = next_arrival['origin']
+            origin = next_arrival.origin
             return origin
 
 
         if sensorproperty == 'updated':
-            return self._sensordata["last_updated"]
+            return self._sensordata.get("last_updated", '-')
 
         # Fail-safe
         return '-'
@@ -1001,18 +1067,23 @@ class HASLRRArrivalSensor(HASLDevice):
         if not self._sensordata:
             return None
 
-        adjustedDateTime = now()
-        adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
         if "data" in self._sensordata:
-            for arrival in self._sensordata["data"]:
-                if arrival['expected'] > adjustedDateTime:
-                    return arrival
+            return next_record(self._sensordata, now().replace(tzinfo=None))
         return None
 
+    def upcoming(self):
+        return self.nextArrival()
+
     def filter_lines(self, arrival):
         if not self._lines or len(self._lines) == 0:
             return True
-        return arrival["line"] in self._lines
+        return arrival.line in self._lines
+
+    def follows_changes(self, changes):
+        return not self._lines or not self._lines.isdisjoint(changes)
+
+    def filter_record(self, arrival):
+        return self.filter_lines(arrival)
 
     @property
     def icon(self):
@@ -1053,7 +1124,7 @@ class HASLRRArrivalSensor(HASLDevice):
         if next_arrival:
             adjustedDateTime = now()
             adjustedDateTime = adjustedDateTime.replace(tzinfo=None)
-            expected_time = next_arrival['expected']
+            expected_time = next_arrival.expected
             delta = expected_time - adjustedDateTime
             expected_minutes = math.floor(delta.total_seconds() / 60)
             expected_time = expected_time.strftime('%H:%M:%S')
@@ -1068,7 +1139,7 @@ class HASLRRArrivalSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Ok"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
@@ -1077,12 +1148,10 @@ class HASLRRArrivalSensor(HASLDevice):
         if val['api_result'] != "Ok":
             return val
 
-        arrivals = self._sensordata["data"]
-        arrivals = list(filter(self.filter_lines, arrivals))
-
         try:
             val['attribution'] = self._sensordata["attribution"]
-            val['arrivals'] = arrivals
+            val['arrivals'] = self.filtered_view()
+            val['truncated'] = self._view_truncated
             val['last_refresh'] = self._sensordata["last_updated"]
             val['next_arrival_minutes'] = expected_minutes
             val['next_arrival_time'] = expected_time
@@ -1109,26 +1178,11 @@ class HASLDeviationSensor(HASLDevice):
         self._enabled_sensor
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("si2", config.data[CONF_SI2_KEY], f"{self._deviationtype}_{self._deviationkey}")
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-        if self._worker.data.si2[f"{self._deviationtype}_{self._deviationkey}"]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.si2[f"{self._deviationtype}_{self._deviationkey}"]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_si2()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
-
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.si2[f"{self._deviationtype}_{self._deviationkey}"]
-        logger.debug("[async_update] Completed")
-        return
 
     @property
     def unique_id(self):
@@ -1183,7 +1237,7 @@ class HASLDeviationSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Ok"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
@@ -1213,26 +1267,14 @@ class HASLVehicleLocationSensor(HASLDevice):
         self._sensordata = []
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("fp", None, self._vehicletype)
+        self._area = area_from_config(config.data)
+        self._vehicles = []
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-        if self._worker.data.fp[self._vehicletype]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.fp[self._vehicletype]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_fp()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
-
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.fp[self._vehicletype]
-        logger.debug("[async_update] Completed")
-        return
+        self._vehicles = self._sensordata.get("areas", {}).get(self._area.key, [])
 
     @property
     def unique_id(self):
@@ -1251,7 +1293,7 @@ class HASLVehicleLocationSensor(HASLDevice):
             return 'Unknown'
         else:
             if "data" in self._sensordata:
-                return len(self._sensordata["data"])
+                return len(self._vehicles)
             else:
                 return 'Unknown'
 
@@ -1286,16 +1328,17 @@ class HASLVehicleLocationSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Success"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
         val['refresh_enabled'] = self._worker.checksensorstate(self._enabled_sensor, STATE_ON)
         try:
             val['attribution'] = self._sensordata["attribution"]
-            val['data'] = self._sensordata["data"]
+            val['data'] = self.budgeted_view('vehicles', self._vehicles)
+            val['truncated'] = self._view_truncated
             val['last_refresh'] = self._sensordata["last_updated"]
-            val['vehicle_count'] = len(self._sensordata["data"])
+            val['vehicle_count'] = len(self._vehicles)
         except:
             val['error'] = "NoDataYet"
             logger.debug(f"Data was not available for processing when getting attributes for sensor {self._name}")
@@ -1316,26 +1359,11 @@ class HASLTrafficStatusSensor(HASLDevice):
         self._sensordata = []
         self._scan_interval = self._config.data[CONF_SCAN_INTERVAL] or 300
         self._worker = hass.data[DOMAIN]["worker"]
+        self._target = ("tl2", config.data[CONF_TL2_KEY], config.data[CONF_TL2_KEY])
 
-    async def async_update(self):
-        """Update the sensor."""
-
-        logger.debug("[async_update] Entered")
-        logger.debug(f"[async_update] Processing {self._name}")
-        if self._worker.data.tl2[self._config.data[CONF_TL2_KEY]]["api_lastrun"]:
-            if self._worker.checksensorstate(self._enabled_sensor, STATE_ON):
-                if self._sensordata == [] or self._worker.getminutesdiff(now().strftime('%Y-%m-%d %H:%M:%S'), self._worker.data.tl2[self._config.data[CONF_TL2_KEY]]["api_lastrun"]) > self._config.data[CONF_SCAN_INTERVAL]:
-                    try:
-                        await self._worker.process_tl2()
-                        logger.debug("[async_update] Update processed")
-                    except:
-                        logger.debug("[async_update] Error occurred during update")
-                else:
-                    logger.debug("[async_update] Not due for update, skipping")
-
+    def _update_from_worker(self):
+        """Pick up the latest data for the sensor from the worker."""
         self._sensordata = self._worker.data.tl2[self._config.data[CONF_TL2_KEY]]
-        logger.debug("[async_update] Completed")
-        return
 
     @property
     def unique_id(self):
@@ -1350,7 +1378,7 @@ class HASLTrafficStatusSensor(HASLDevice):
     @property
     def state(self):
         """Return the state of the sensor."""
-        if self._sensordata == []:
+        if self._sensordata == [] or "data" not in self._sensordata:
             return 'Unknown'
         else:
             return self._sensordata["data"][self._sensortype]["status"]
@@ -1397,7 +1425,7 @@ class HASLTrafficStatusSensor(HASLDevice):
         if self._sensordata["api_result"] == "Success":
             val['api_result'] = "Ok"
         else:
-            val['api_result'] = self._sensordata["api_error"]
+            val['api_result'] = self._sensordata.get("api_error", self._sensordata["api_result"])
 
         # Set values of the sensor.
         val['scan_interval'] = self._scan_interval
@@ -1413,3 +1441,88 @@ class HASLTrafficStatusSensor(HASLDevice):
             logger.debug(f"Data was not available for processing when getting attributes for sensor {self._name}")
 
         return val
+
+
+class HASLApiStatsSensor(HASLDevice):
+    """Diagnostic sensor with the call statistics of an API and key, one across all instances.
+
+    The instance that adds it owns it, when that instance is unloaded the sensor goes
+    with it and the next instance set up with the key adds it again.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, hass, config, apitype, key):
+        """Initialize."""
+        self._hass = hass
+        self._config = config
+        self._apitype = apitype
+        self._key = key
+        provider = "RR" if apitype in RR_APIS else "SL"
+        self._name = f"{provider} {apitype.upper()} API Statistics"
+        if key:
+            self._name += f" ({mask_key(key)})"
+        self._worker = hass.data[DOMAIN]["worker"]
+        self._sensordata = None
+        self._written = None
+
+    async def async_added_to_hass(self):
+        """Read the statistics every minute, they are not tied to a scheduler target."""
+        self.async_on_remove(async_track_time_interval(self.hass, self._async_stats_updated, datetime.timedelta(minutes=1)))
+        self.async_on_remove(lambda: self.hass.data[DOMAIN].get("api_stats_sensors", {}).pop((self._apitype, self._key), None))
+        self._update_from_worker()
+
+    async def async_update(self):
+        self._update_from_worker()
+
+    def _update_from_worker(self):
+        """Pick up the latest statistics for the API key from the worker."""
+        self._sensordata = self._worker.getstats().get(self._apitype, self._key)
+
+    @callback
+    def _async_stats_updated(self, *args):
+        self._update_from_worker()
+        # Only write when calls were made since the last write
+        counts = ((self._sensordata or {}).get('requests'), (self._sensordata or {}).get('shared'))
+        if counts != self._written:
+            self._written = counts
+            self.async_write_ha_state()
+
+    @property
+    def unique_id(self):
+        """Return a unique ID to use for this sensor."""
+        # The key itself does not belong in the entity registry
+        keyid = hashlib.sha256(str(self._key).encode()).hexdigest()[:16] if self._key else "keyless"
+        return f"hasl-{self._apitype}-api-statistics-sensor-{keyid}"
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def state(self):
+        """Return the number of calls made."""
+        if self._sensordata is None:
+            return 0
+        return self._sensordata['requests']
+
+    @property
+    def icon(self):
+        return "mdi:api"
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return "requests"
+
+    @property
+    def extra_state_attributes(self):
+        """Attributes."""
+        if self._sensordata is None:
+            return {}
+
+        val = dict(self._sensordata)
+        if val['last_success'] is not None:
+            val['last_success'] = val['last_success'].strftime('%Y-%m-%d %H:%M:%S')
+        return val
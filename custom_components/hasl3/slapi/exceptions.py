@@ -31,3 +31,9 @@ class SLAPI_HTTP_Error(SLAPI_Error):
     """An HTTP-level exception occurred."""
     def __str__(self):
         return "SLAPI_HTTP_Error {0}: {1}".format(self._code, self._message)
+
+
+class SLAPI_Not_Modified(SLAPI_Error):
+    """The response is the same as last time, raised for conditional requests only."""
+    def __str__(self):
+        return "SLAPI_Not_Modified {0}: {1}".format(self._code, self._message)
@@ -1,12 +1,15 @@
 import json
-import httpx
+import re
 import time
 import logging
 
+from custom_components.hasl3.haslworker.http import fetch
+
 from .exceptions import (
     SLAPI_Error,
     SLAPI_HTTP_Error,
-    SLAPI_API_Error
+    SLAPI_API_Error,
+    SLAPI_Not_Modified
 )
 from .const import (
     __version__,
@@ -21,15 +24,80 @@ from .const import (
 
 logger = logging.getLogger("custom_components.hasl3.slapi")
 
+_decoder = json.JSONDecoder()
+_separators = re.compile(r'[\s,]*')
+_whitespace = re.compile(r'\s*')
+_whitespace_bytes = re.compile(rb'\s*')
+
+
+def iter_json_array(document, key):
+    """Yield the elements of the array under key in a JSON object, one at a time.
+
+    Only the top level of the object is walked, the elements are decoded as they
+    are reached, so no decoded copy of the whole document is built.
+    """
+    pos = _whitespace.match(document).end()
+    if document[pos:pos + 1] != '{':
+        raise ValueError("Expected a JSON object")
+    pos += 1
+
+    while True:
+        pos = _separators.match(document, pos).end()
+        if pos >= len(document) or document[pos] == '}':
+            return
+
+        (name, pos) = _decoder.raw_decode(document, pos)
+        pos = _whitespace.match(document, pos).end()
+        if document[pos:pos + 1] != ':':
+            raise ValueError(f"Expected ':' at position {pos}")
+        pos = _whitespace.match(document, pos + 1).end()
+
+        if name != key or document[pos:pos + 1] != '[':
+            # Some other member, skip its value
+            (value, pos) = _decoder.raw_decode(document, pos)
+            continue
+
+        pos += 1
+        while True:
+            pos = _separators.match(document, pos).end()
+            if pos >= len(document) or document[pos] == ']':
+                return
+            (element, pos) = _decoder.raw_decode(document, pos)
+            yield element
+
+
+def fp_trips(content, predicate=None):
+    """Yield the trips in a vehicle location response body passing predicate.
+
+    The API returns its JSON document encoded as a JSON string. That envelope is
+    unwrapped by json.loads straight from the response bytes, so no text copy of
+    the envelope is kept while the document is walked trip by trip.
+    """
+    if isinstance(content, bytes):
+        pos = _whitespace_bytes.match(content).end()
+        if content[pos:pos + 1] == b'"':
+            document = json.loads(content)
+        else:
+            document = content.decode('utf-8')
+    else:
+        pos = _whitespace.match(content).end()
+        document = json.loads(content) if content[pos:pos + 1] == '"' else content
+
+    for trip in iter_json_array(document, 'Trips'):
+        if predicate is None or predicate(trip):
+            yield trip
+
 
 class slapi_fp(object):
-    def __init__(self, timeout=None):
+    def __init__(self, timeout=None, client=None):
         self._timeout = timeout
+        self._client = client
 
     def version(self):
         return __version__
 
-    async def request(self, vehicletype):
+    async def request(self, vehicletype, predicate=None):
+        """The trips of a vehicle type, only those passing predicate if one is given."""
 
         logger.debug("Will call FP API")
         if vehicletype not in ('PT', 'RB', 'TVB', 'SB', 'LB',
@@ -39,24 +107,25 @@ class slapi_fp(object):
                                   "'LB','SpvC','TB1','TB2','TB3'")
 
         try:
-            async with httpx.AsyncClient() as client:
-                request = await client.get(FORDONSPOSITION_URL.format(vehicletype,
-                                                                      time.time()),
-                                           headers={"User-agent": USER_AGENT},
-                                           follow_redirects=True,
-                                           timeout=self._timeout)
+            # cacheControl changes on every call, so coalesce on the vehicle type only
+            request = await fetch(self._client,
+                                  FORDONSPOSITION_URL.format(vehicletype, time.time()),
+                                  self._timeout,
+                                  USER_AGENT,
+                                  key=FORDONSPOSITION_URL.format(vehicletype, ''))
         except Exception as e:
             error = SLAPI_HTTP_Error(997, "An HTTP error occurred (Vehicle Locations)", str(e))
             logger.debug(e)
             logger.error(error)
-            raise error
-
-        response = json.loads(request.json())
+            raise error from e
 
-        result = []
-
-        for trip in response['Trips']:
-            result.append(trip)
+        try:
+            result = list(fp_trips(request.content, predicate))
+        except ValueError as e:
+            error = SLAPI_API_Error(-1, "Could not parse the vehicle locations", str(e))
+            logger.debug(e)
+            logger.error(error)
+            raise error from e
 
         logger.debug("Call completed")
         return result
@@ -64,8 +133,11 @@ class slapi_fp(object):
 
 class slapi(object):
 
-    def __init__(self, timeout=None):
+    def __init__(self, timeout=None, client=None, conditional=False, key=None):
         self._timeout = timeout
+        self._client = client
+        self._conditional = conditional
+        self._key = key
 
     def version(self):
         return __version__
@@ -85,16 +157,17 @@ class slapi(object):
         }
 
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url,
-                                        headers={"User-agent": USER_AGENT},
-                                        follow_redirects=True,
-                                        timeout=self._timeout)
+            resp = await fetch(self._client, url, self._timeout, USER_AGENT,
+                               key=self._key, conditional=self._conditional)
         except Exception as e:
             error = SLAPI_HTTP_Error(997, f"An HTTP error occurred ({api})", str(e))
             logger.debug(e)
             logger.error(error)
-            raise error
+            raise error from e
+
+        if resp.status_code == 304:
+            logger.debug(f"Response unchanged ({api})")
+            raise SLAPI_Not_Modified(304, f"Response unchanged ({api})", url)
 
         try:
             jsonResponse = resp.json()
@@ -144,8 +217,8 @@ class slapi(object):
 
 
 class slapi_pu1(slapi):
-    def __init__(self, api_token, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, timeout=None, client=None):
+        super().__init__(timeout, client)
         self._api_token = api_token
 
     async def request(self, searchstring):
@@ -154,8 +227,8 @@ class slapi_pu1(slapi):
 
 
 class slapi_rp3(slapi):
-    def __init__(self, api_token, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, timeout=None, client=None):
+        super().__init__(timeout, client)
         self._api_token = api_token
 
     async def request(self, origin, destination, orgLat, orgLong, destLat, destLong):
@@ -166,8 +239,8 @@ class slapi_rp3(slapi):
 
 class slapi_ri4(slapi):
 
-    def __init__(self, api_token, window, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, window, timeout=None, client=None):
+        super().__init__(timeout, client)
         self._api_token = api_token
         self._window = window
 
@@ -179,8 +252,8 @@ class slapi_ri4(slapi):
 
 class slapi_si2(slapi):
 
-    def __init__(self, api_token, siteid, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, siteid, timeout=None, client=None, conditional=False, key=None):
+        super().__init__(timeout, client, conditional, key)
         self._api_token = api_token
 
     async def request(self, siteid, lines):
@@ -190,8 +263,8 @@ class slapi_si2(slapi):
 
 
 class slapi_tl2(slapi):
-    def __init__(self, api_token, timeout=None):
-        super().__init__(timeout)
+    def __init__(self, api_token, timeout=None, client=None, conditional=False, key=None):
+        super().__init__(timeout, client, conditional, key)
         self._api_token = api_token
 
     async def request(self):
@@ -1,5 +1,4 @@
 """Provide info to system health."""
-import sys
 import logging
 
 from homeassistant.components import system_health
@@ -14,26 +13,6 @@ from .const import (
 logger = logging.getLogger(f"custom_components.{DOMAIN}.core")
 
 
-def get_size(obj, seen=None):
-    """Recursively finds size of objects"""
-    size = sys.getsizeof(obj)
-    if seen is None:
-        seen = set()
-    obj_id = id(obj)
-    if obj_id in seen:
-        return 0
-
-    seen.add(obj_id)
-    if isinstance(obj, dict):
-        size += sum([get_size(v, seen) for v in obj.values()])
-        size += sum([get_size(k, seen) for k in obj.keys()])
-    elif hasattr(obj, '__dict__'):
-        size += get_size(obj.__dict__, seen)
-    elif hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes, bytearray)):
-        size += sum([get_size(i, seen) for i in obj])
-    return size
-
-
 @callback
 def async_register(
     hass: HomeAssistant, register: system_health.SystemHealthRegistration
@@ -59,9 +38,13 @@ async def system_health_info(hass):
             "Version": HASL_VERSION,
             "Schema": SCHEMA_VERSION,
             "Instances": worker.instances.count(),
-            "Database Size": f"{get_size(worker.data)} bytes",
+            "Database Size": f"{worker.data.memory.total()} bytes",
+            **worker.data.memory.status(),
             "Startup in progress": worker.status.startup_in_progress,
-            "Running tasks": worker.status.running_background_tasks
+            "Running tasks": worker.status.running_background_tasks,
+            **worker.getquota().status(worker.getscheduler().demand()),
+            **worker.getcircuitstatus(),
+            **worker.getstats().status()
         }
         logger.debug("[system_health_info] Information gather succeeded")
         return statusObject
@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import httpx
+
+from custom_components.hasl3.haslworker.http import HASLHttpClient
+
+
+def body(execution_time, deviations):
+    return json.dumps({"StatusCode": 0, "Message": None, "ExecutionTime": execution_time,
+                       "ResponseData": deviations}).encode()
+
+
+def fetch_all(bodies, conditional=True):
+    """The status codes of conditional GETs answered with bodies in turn."""
+    async def run():
+        client = HASLHttpClient()
+        responses = iter(bodies)
+
+        async def handler(request):
+            return httpx.Response(200, content=next(responses))
+
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        statuses = []
+        for i in range(len(bodies)):
+            resp = await client.get("https://api.sl.se/api2/deviations.json", key=("si2", "key", "stop_1"),
+                                    conditional=conditional)
+            statuses.append(resp.status_code)
+        validators = dict(client._validators)
+        await client.aclose()
+        return (statuses, validators)
+
+    return asyncio.run(run())
+
+
+def test_unchanged_payload_with_new_execution_time_is_not_modified():
+    (statuses, validators) = fetch_all([body(12, [{"Header": "a"}]), body(87, [{"Header": "a"}])])
+    assert statuses == [200, 304]
+
+
+def test_changed_payload_is_returned():
+    (statuses, validators) = fetch_all([body(12, [{"Header": "a"}]), body(12, [{"Header": "b"}])])
+    assert statuses == [200, 200]
+
+
+def test_validators_are_only_kept_for_conditional_requests():
+    (statuses, validators) = fetch_all([body(12, []), body(12, [])], conditional=False)
+    assert statuses == [200, 200]
+    assert validators == {}
+
+
+def test_forget_drops_the_validators():
+    client = HASLHttpClient()
+    client._validators[("si2", "key", "stop_1")] = {'etag': None, 'last_modified': None, 'digest': b''}
+    client.forget(("si2", "key", "stop_1"))
+    assert client._validators == {}
+    asyncio.run(client.aclose())